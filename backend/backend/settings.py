@@ -170,8 +170,13 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'if-match',
+    'if-none-match',
 ]
 
+# Let the frontend read the permission matrix ETag (role-permissions GET/PATCH)
+CORS_EXPOSE_HEADERS = ['etag']
+
 # AUTH_USER_MODEL is not set - using default Django User model
 # RidesUser is a regular model connected to existing rides_user table, not a User model
 
@@ -217,6 +222,63 @@ SIMPLE_JWT = {
     'TOKEN_TYPE_CLAIM': 'token_type',
 }
 
+# Token-claim-backed authentication (see frontend/authentication.py)
+# When True, FrontendUserJWTAuthentication builds request.user from the token claims
+# (user_id, is_active, role_id, is_admin, is_superadmin) instead of querying frontend_user per request.
+# Tokens issued before these claims existed fall back to the database lookup.
+FRONTEND_JWT_TRUST_CLAIMS = True
+# Seconds a user's is_active/role_id state is cached per process (refreshed by user_detail on change)
+FRONTEND_USER_CACHE_TTL = 60
+# Seconds a compiled role permission matrix / user->roles mapping is cached (see frontend/permission_cache.py)
+# Permission writes bump Role.permissions_version, so this only bounds staleness across processes.
+PERMISSION_CACHE_TTL = 300
+# Seconds before a cached exact row count (e.g. ride_user_count) is refreshed in the background
+ROW_COUNT_REFRESH_INTERVAL = 300
+# Processes used to hash passwords for bulk user imports (None = one per CPU, see frontend/password_hashing.py)
+PASSWORD_HASH_PROCESSES = None
+# Threads that run single password hashes/verifications (logins, User.save()). Caps the CPU
+# PBKDF2 may take at once; further requests queue, and beyond PASSWORD_HASH_MAX_QUEUE logins get 503.
+# Both are per process and assume gthread workers (gunicorn.conf.py): keep the queue below
+# GUNICORN_THREADS so a login burst always leaves threads free for other endpoints.
+PASSWORD_HASH_THREADS = 4
+PASSWORD_HASH_MAX_QUEUE = 8
+# Seconds a request waits for its hash before giving up with 503
+PASSWORD_HASH_TIMEOUT = 10
+# Opt-in: on successful login, transparently rehash passwords stored with another hasher (or
+# with outdated parameters) to PASSWORD_LOGIN_HASHER (None = first entry of PASSWORD_HASHERS)
+PASSWORD_REHASH_ON_LOGIN = False
+PASSWORD_LOGIN_HASHER = None
+# In-process promo code cache behind /api/promo-codes/validate/ (see frontend/promo_cache.py).
+# Seconds an entry (including "code not found") is trusted; writes invalidate it sooner.
+PROMO_CODE_CACHE_TTL = 60
+PROMO_CODE_CACHE_MAX_ENTRIES = 50000
+# Preload the promo code cache and the zone index (frontend/zone_index.py) in a background
+# thread when the WSGI app starts
+PREWARM_CACHES = True
+# Most coordinates accepted by one POST /api/zones/locate/batch/ call. Binary bodies are 16 bytes
+# per point and must also fit DATA_UPLOAD_MAX_MEMORY_SIZE (2.5 MB by default, ~160k points).
+ZONE_LOCATE_BATCH_MAX_POINTS = 100000
+# Seconds zone search pages (GET /api/auth/zones/?q=) and zone facets are cached; zone writes
+# retire them sooner
+ZONE_SEARCH_CACHE_TTL = 300
+
+# Seconds a process trusts its copy of a cache generation (frontend/generations.py) before
+# re-reading it from the database; bounds how long other workers serve a stale registry/index
+CACHE_GENERATION_CHECK_INTERVAL = 5
+
+# Cache backend used by the in-process caches (auth state, permissions, etc.)
+# Switch to a shared backend (e.g. Redis) to make invalidation visible across gunicorn workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'rudraride-default',
+        'OPTIONS': {
+            # Default is 300 entries; per-user auth/role entries would be culled constantly
+            'MAX_ENTRIES': 20000,
+        },
+    }
+}
+
 # Email Configuration - Real-time Email Delivery
 # IMPORTANT: Choose ONE of the following options:
 
@@ -250,6 +312,15 @@ EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', 'mjdbwjgohrrtxfqh')
 
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER if EMAIL_HOST_USER else 'noreply@rudraadmin.com'  # Default sender email
 
+# Email outbox (frontend/email_outbox.py) - credential emails are queued in frontend_email_outbox
+# and delivered by a bounded pool of worker threads per process over a reused SMTP connection
+EMAIL_OUTBOX_WORKERS = 2  # Worker threads per process
+EMAIL_OUTBOX_BATCH_SIZE = 50  # Emails sent per SMTP session
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5  # Give up (status=failed) after this many attempts
+EMAIL_OUTBOX_RETRY_BASE_SECONDS = 30  # Backoff: 30s, 60s, 120s, ... (capped at 1 hour)
+EMAIL_OUTBOX_POLL_INTERVAL = 30  # Seconds between polls for retries scheduled by earlier failures
+EMAIL_OUTBOX_START_WORKERS = True  # Start the worker pool with the WSGI app (False when a dedicated `process_email_outbox --loop` runs)
+
 # Gmail Configuration Instructions:
 # 1. Enable 2-Step Verification on your Google account (required for app passwords)
 # 2. Go to: https://myaccount.google.com/apppasswords
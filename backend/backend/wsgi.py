@@ -7,10 +7,36 @@ For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/wsgi/
 """
 
+import logging
 import os
+import threading
 
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_wsgi_application()
+
+
+def _prewarm_caches():
+    """Load the checkout promo code cache and the zone index before the first requests arrive"""
+    from django.db import connection
+    from frontend.promo_cache import warm_promo_code_cache
+    from frontend.zone_index import get_zone_index
+    for name, warm in (('Promo code cache', warm_promo_code_cache), ('Zone index', lambda: get_zone_index(wait=True))):
+        try:
+            warm()
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"{name} pre-warm failed: {str(e)}")
+    connection.close()
+
+
+from django.conf import settings  # noqa: E402  (settings are configured once the application exists)
+
+if getattr(settings, 'PREWARM_CACHES', False):
+    threading.Thread(target=_prewarm_caches, name='cache-prewarm', daemon=True).start()
+
+if getattr(settings, 'EMAIL_OUTBOX_START_WORKERS', True):
+    # Deliver emails queued before a restart (pending rows and scheduled retries) right away
+    from frontend.email_outbox import start_workers
+    start_workers()
@@ -1,18 +1,89 @@
 """
 Custom JWT Authentication for FrontendUser model
 This allows JWT tokens to authenticate against the FrontendUser model instead of Django's default User model.
+
+When FRONTEND_JWT_TRUST_CLAIMS is enabled, the user is built from the signed token claims
+(user_id, email, is_active, role_id, is_admin, is_superadmin) instead of querying frontend_user
+on every request. The account state (is_active, role_id) is kept in a short-TTL cache so that
+deactivating a user in user_detail takes effect without waiting for the token to expire.
 """
+from django.conf import settings
+from django.core.cache import cache
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
 from .models import User as FrontendUser
 
 
+# Claims written by admin_login_view / user_login_view that are needed to build a user without the database
+REQUIRED_TOKEN_CLAIMS = ('user_id', 'is_active', 'role_id')
+
+USER_STATE_CACHE_KEY = 'frontend_user_state:{user_id}'
+
+
+class FrontendTokenUser:
+    """
+    Lightweight stand-in for FrontendUser built from validated token claims.
+    Exposes the attributes DRF and our permission classes need without touching the database.
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_id, email=None, is_active=True, role_id=None, is_admin=False, is_superadmin=False):
+        self.id = user_id
+        self.email = email
+        self.is_active = is_active
+        self.role_id = role_id
+        self.is_admin = is_admin
+        self.is_superadmin = is_superadmin
+
+    @property
+    def pk(self):
+        return self.id
+
+    def get_user(self):
+        """Load the full FrontendUser row (only when a view really needs it)"""
+        return FrontendUser.objects.get(id=self.id)
+
+    def __str__(self):
+        return f"{self.email or f'User {self.id}'} (token)"
+
+
+def get_cached_user_state(user_id):
+    """
+    Return {'is_active': bool, 'role_id': str|None} for a user, or None if the user doesn't exist.
+    Served from cache when warm; otherwise reads a single row and caches it for FRONTEND_USER_CACHE_TTL seconds.
+    """
+    key = USER_STATE_CACHE_KEY.format(user_id=user_id)
+    state = cache.get(key)
+    if state is not None:
+        return state or None
+
+    row = FrontendUser.objects.filter(id=user_id).values('is_active', 'role_id').first()
+    # Cache misses too ({}), so unknown ids don't hit the database on every request
+    state = {'is_active': bool(row['is_active']), 'role_id': row['role_id']} if row else {}
+    cache.set(key, state, getattr(settings, 'FRONTEND_USER_CACHE_TTL', 60))
+    return state or None
+
+
+def invalidate_user_state(user):
+    """
+    Refresh the cached account state for a user after is_active/role_id changes.
+    Writes the new state through (instead of deleting) so the change is visible immediately.
+    """
+    key = USER_STATE_CACHE_KEY.format(user_id=user.id)
+    cache.set(
+        key,
+        {'is_active': bool(user.is_active), 'role_id': user.role_id},
+        getattr(settings, 'FRONTEND_USER_CACHE_TTL', 60)
+    )
+
+
 class FrontendUserJWTAuthentication(JWTAuthentication):
     """
     Custom JWT authentication that uses FrontendUser model instead of Django's default User model.
     This is needed because tokens contain user_id from FrontendUser, not from auth_user table.
     """
-    
+
     def get_user(self, validated_token):
         """
         Override to get user from FrontendUser model instead of default User model.
@@ -25,6 +96,12 @@ class FrontendUserJWTAuthentication(JWTAuthentication):
         if user_id is None:
             raise InvalidToken('Token contained no user_id')
 
+        # Fast path: build the user from token claims + cached account state (no frontend_user query)
+        if getattr(settings, 'FRONTEND_JWT_TRUST_CLAIMS', False) and all(
+            claim in validated_token for claim in REQUIRED_TOKEN_CLAIMS
+        ):
+            return self.get_token_user(validated_token, user_id)
+
         try:
             # Look up user in FrontendUser model (frontend_user table)
             user = FrontendUser.objects.get(id=user_id)
@@ -36,3 +113,21 @@ class FrontendUserJWTAuthentication(JWTAuthentication):
 
         return user
 
+    def get_token_user(self, validated_token, user_id):
+        """Build a FrontendTokenUser from claims, applying the cached is_active/role_id state"""
+        state = get_cached_user_state(user_id)
+        if state is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+
+        is_active = bool(validated_token.get('is_active')) and state['is_active']
+        if not is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+
+        return FrontendTokenUser(
+            user_id=user_id,
+            email=validated_token.get('email'),
+            is_active=is_active,
+            role_id=state['role_id'],
+            is_admin=bool(validated_token.get('is_admin', False)),
+            is_superadmin=bool(validated_token.get('is_superadmin', False)),
+        )
@@ -0,0 +1,217 @@
+"""
+Database-backed email outbox with a bounded SMTP worker pool
+
+Request handlers only call enqueue_email(), which inserts a frontend_email_outbox row and wakes
+the workers. A fixed number of worker threads per process (EMAIL_OUTBOX_WORKERS) claim due rows
+with SELECT ... FOR UPDATE SKIP LOCKED, open ONE SMTP connection per batch and send every message
+in the batch over it. Failed sends are retried with exponential backoff up to
+EMAIL_OUTBOX_MAX_ATTEMPTS. The pool is started with the WSGI application (EMAIL_OUTBOX_START_WORKERS)
+and drains whatever is due as soon as it starts, so rows left pending by a restart are delivered
+without waiting for a new email; `python manage.py process_email_outbox` does the same on demand.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Claims older than this are assumed to belong to a dead worker and are retried
+STALE_CLAIM_SECONDS = 600
+
+_wakeup = threading.Event()
+_workers = []
+_workers_lock = threading.Lock()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue_email(subject, body, recipient, from_email=None):
+    """Persist an email to the outbox and wake the worker pool. Returns the EmailOutbox row."""
+    from .models import EmailOutbox
+    email = EmailOutbox.objects.create(
+        recipient=recipient,
+        subject=subject,
+        body=body,
+        from_email=from_email,
+    )
+    _wake_workers_on_commit()
+    return email
+
+
+def enqueue_emails(messages):
+    """
+    Persist many emails with one bulk insert and wake the worker pool.
+    `messages` is an iterable of (subject, body, recipient) tuples.
+    """
+    from .models import EmailOutbox
+    emails = EmailOutbox.objects.bulk_create([
+        EmailOutbox(recipient=recipient, subject=subject, body=body)
+        for subject, body, recipient in messages
+    ])
+    if emails:
+        _wake_workers_on_commit()
+    return emails
+
+
+def _wake_workers_on_commit():
+    """
+    Wake the workers once the new rows are visible to them. The pool is only started here when this
+    process runs it (EMAIL_OUTBOX_START_WORKERS); otherwise `process_email_outbox --loop` delivers.
+    """
+    if _setting('EMAIL_OUTBOX_START_WORKERS', True):
+        transaction.on_commit(start_workers)
+    transaction.on_commit(_wakeup.set)
+
+
+def start_workers():
+    """Start the per-process worker pool (idempotent)"""
+    with _workers_lock:
+        _workers[:] = [worker for worker in _workers if worker.is_alive()]
+        for index in range(len(_workers), _setting('EMAIL_OUTBOX_WORKERS', 2)):
+            worker = threading.Thread(target=_worker_loop, name=f'email-outbox-{index}', daemon=True)
+            worker.start()
+            _workers.append(worker)
+
+
+def _worker_loop():
+    poll_interval = _setting('EMAIL_OUTBOX_POLL_INTERVAL', 30)
+    while True:
+        try:
+            # Drain everything that is due (including rows left by a previous process), then wait
+            while process_outbox_batch():
+                pass
+        except Exception as e:
+            logger.error(f"Email outbox worker error: {str(e)}", exc_info=True)
+        finally:
+            # Don't hold a PgBouncer connection while idle
+            close_old_connections()
+            connection.close()
+        _wakeup.wait(poll_interval)
+        _wakeup.clear()
+
+
+def _claim_batch(batch_size):
+    """Atomically claim up to batch_size due emails for this worker"""
+    from .models import EmailOutbox
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=STALE_CLAIM_SECONDS)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                UPDATE frontend_email_outbox
+                SET status = %s, locked_at = %s, attempts = attempts + 1
+                WHERE id IN (
+                    SELECT id FROM frontend_email_outbox
+                    WHERE (status = %s AND next_attempt_at <= %s)
+                       OR (status = %s AND locked_at < %s)
+                    ORDER BY next_attempt_at
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id
+            """, [
+                EmailOutbox.STATUS_SENDING, now,
+                EmailOutbox.STATUS_PENDING, now,
+                EmailOutbox.STATUS_SENDING, stale_before,
+                batch_size,
+            ])
+            ids = [row[0] for row in cursor.fetchall()]
+    return list(EmailOutbox.objects.filter(id__in=ids).order_by('id'))
+
+
+def _retry_delay(attempts):
+    """Exponential backoff: base * 2^(attempts-1), capped at one hour"""
+    base = _setting('EMAIL_OUTBOX_RETRY_BASE_SECONDS', 30)
+    return min(base * (2 ** max(attempts - 1, 0)), 3600)
+
+
+def _log_send_error(email, error_str):
+    if '535' in error_str or 'BadCredentials' in error_str or 'Username and Password not accepted' in error_str:
+        logger.error(
+            f"❌ Gmail Authentication Failed for {email.recipient}: {error_str}\n"
+            f"   Verify EMAIL_HOST_PASSWORD is a valid 16-character App Password "
+            f"(https://myaccount.google.com/apppasswords) and restart the server."
+        )
+    else:
+        logger.error(f"❌ Failed to deliver email to {email.recipient} (attempt {email.attempts}): {error_str}")
+
+
+def process_outbox_batch(batch_size=None):
+    """
+    Claim and send one batch of due emails over a single SMTP connection.
+    Returns the number of emails claimed (0 when nothing is due).
+    """
+    from .models import EmailOutbox
+    batch_size = batch_size or _setting('EMAIL_OUTBOX_BATCH_SIZE', 50)
+    emails = _claim_batch(batch_size)
+    if not emails:
+        return 0
+
+    max_attempts = _setting('EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+    default_from = settings.DEFAULT_FROM_EMAIL or settings.EMAIL_HOST_USER or 'noreply@rudraadmin.com'
+
+    try:
+        smtp_connection = get_connection(fail_silently=False)
+        smtp_connection.open()
+    except Exception as e:
+        # Couldn't even connect: reschedule the whole batch
+        for email in emails:
+            _mark_failed(email, str(e), max_attempts)
+        _log_send_error(emails[0], str(e))
+        return len(emails)
+
+    try:
+        for email in emails:
+            message = EmailMessage(
+                subject=email.subject,
+                body=email.body,
+                from_email=email.from_email or default_from,
+                to=[email.recipient],
+                connection=smtp_connection,
+            )
+            try:
+                # Same open session for every message in the batch (no new TLS handshake)
+                smtp_connection.send_messages([message])
+            except Exception as e:
+                _log_send_error(email, str(e))
+                _mark_failed(email, str(e), max_attempts)
+                continue
+
+            EmailOutbox.objects.filter(id=email.id).update(
+                status=EmailOutbox.STATUS_SENT,
+                sent_at=timezone.now(),
+                locked_at=None,
+                last_error=None,
+                body='',
+            )
+            logger.info(f"✅ Email delivered successfully to {email.recipient}")
+    finally:
+        smtp_connection.close()
+
+    return len(emails)
+
+
+def _mark_failed(email, error, max_attempts):
+    from .models import EmailOutbox
+    if email.attempts >= max_attempts:
+        # Give up; drop the body so credentials don't linger in the table
+        EmailOutbox.objects.filter(id=email.id).update(
+            status=EmailOutbox.STATUS_FAILED,
+            locked_at=None,
+            last_error=error,
+            body='',
+        )
+        return
+    EmailOutbox.objects.filter(id=email.id).update(
+        status=EmailOutbox.STATUS_PENDING,
+        locked_at=None,
+        last_error=error,
+        next_attempt_at=timezone.now() + timedelta(seconds=_retry_delay(email.attempts)),
+    )
@@ -0,0 +1,52 @@
+"""
+Generation counters shared by every process through the database
+
+In-process caches (schema registry, zone index, ...) remember the generation they were built for
+and rebuild once it changes. bump_generation(name) increments a row of frontend_cache_generation,
+so a change made by one worker or a management command reaches every other process, which the
+default per-process LocMemCache can't do. current_generation(name) re-reads the row at most once
+every CACHE_GENERATION_CHECK_INTERVAL seconds per process: other processes notice a bump within
+that interval, the process that bumped it at once.
+"""
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from .models import CacheGeneration
+
+_checked = {}  # name -> (monotonic time of the last read, generation)
+
+
+def _check_interval():
+    return getattr(settings, 'CACHE_GENERATION_CHECK_INTERVAL', 5)
+
+
+def current_generation(name):
+    """Generation of the named cache (0 until it is first bumped)"""
+    entry = _checked.get(name)
+    now = time.monotonic()
+    if entry is not None and now - entry[0] < _check_interval():
+        return entry[1]
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT generation FROM {CacheGeneration._meta.db_table} WHERE name = %s
+        """, [name])
+        row = cursor.fetchone()
+    generation = row[0] if row else 0
+    _checked[name] = (now, generation)
+    return generation
+
+
+def bump_generation(name):
+    """Invalidate the named cache in every process; returns the new generation"""
+    table = CacheGeneration._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO {table} (name, generation) VALUES (%s, 1)
+            ON CONFLICT (name) DO UPDATE SET generation = {table}.generation + 1
+            RETURNING generation
+        """, [name])
+        generation = cursor.fetchone()[0]
+    _checked[name] = (time.monotonic(), generation)
+    return generation
@@ -0,0 +1,127 @@
+"""
+Django management command to measure login throughput under concurrent clients
+Usage: python manage.py benchmark_login --email admin@example.com --password secret [--url http://127.0.0.1:8000]
+       [--clients 8] [--requests 10] [--endpoint admin|user] [--probe /api/zones/]
+
+Each client thread posts the credentials over HTTP to a running server (gunicorn as deployed, see
+gunicorn.conf.py), so the numbers include the worker model, the per-process hashing pool and the
+503s it answers once PASSWORD_HASH_MAX_QUEUE logins are in flight. With --probe, one more client
+requests that path in a loop during the burst to show whether other endpoints still get served.
+Compare runs with different PASSWORD_HASH_THREADS / PASSWORD_HASH_MAX_QUEUE / GUNICORN_THREADS.
+"""
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from django.core.management.base import BaseCommand, CommandError
+
+LOGIN_PATHS = {
+    'admin': '/api/auth/admin/login/',
+    'user': '/api/user/login/',
+}
+
+
+def _request(url, data=None, timeout=60):
+    """Send one request; returns (status code, seconds taken)"""
+    request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, OSError):
+        status = 'connection error'
+    return status, time.perf_counter() - started
+
+
+def _summary(latencies):
+    latencies = sorted(latencies)
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    return (
+        f'mean {statistics.mean(latencies) * 1000:.1f}, p50 {percentile(0.50):.1f}, '
+        f'p95 {percentile(0.95):.1f}, p99 {percentile(0.99):.1f}, max {latencies[-1] * 1000:.1f}'
+    )
+
+
+class Command(BaseCommand):
+    help = 'Benchmark login throughput and latency with N concurrent HTTP clients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', required=True, help='Email of an existing active user')
+        parser.add_argument('--password', required=True, help='Password of that user')
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Server base URL (default: http://127.0.0.1:8000)')
+        parser.add_argument('--clients', type=int, default=8, help='Concurrent clients (default: 8)')
+        parser.add_argument('--requests', type=int, default=10, help='Logins per client (default: 10)')
+        parser.add_argument(
+            '--endpoint',
+            choices=sorted(LOGIN_PATHS),
+            default='admin',
+            help='Login endpoint to call (default: admin)'
+        )
+        parser.add_argument('--probe', help='Path requested (GET) in a loop during the burst, e.g. /api/zones/locate/?lat=0&lng=0')
+
+    def handle(self, *args, **options):
+        if options['clients'] < 1 or options['requests'] < 1:
+            raise CommandError('--clients and --requests must be at least 1')
+
+        base_url = options['url'].rstrip('/')
+        url = base_url + LOGIN_PATHS[options['endpoint']]
+        payload = json.dumps({'email': options['email'], 'password': options['password']}).encode('utf-8')
+
+        latencies = []
+        status_counts = {}
+        probe_latencies = []
+        probe_status_counts = {}
+        lock = threading.Lock()
+        start_barrier = threading.Barrier(options['clients'])
+        done = threading.Event()
+
+        def client():
+            start_barrier.wait()
+            for _ in range(options['requests']):
+                status, elapsed = _request(url, payload)
+                with lock:
+                    latencies.append(elapsed)
+                    status_counts[status] = status_counts.get(status, 0) + 1
+
+        def probe():
+            while not done.is_set():
+                status, elapsed = _request(base_url + options['probe'])
+                with lock:
+                    probe_latencies.append(elapsed)
+                    probe_status_counts[status] = probe_status_counts.get(status, 0) + 1
+
+        self.stdout.write(f'🚀 {options["clients"]} clients x {options["requests"]} logins against {url}')
+
+        threads = [threading.Thread(target=client) for _ in range(options['clients'])]
+        probe_thread = threading.Thread(target=probe) if options['probe'] else None
+        wall_start = time.perf_counter()
+        if probe_thread is not None:
+            probe_thread.start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - wall_start
+        done.set()
+        if probe_thread is not None:
+            probe_thread.join()
+
+        self.stdout.write(f'Requests: {len(latencies)} in {wall:.2f}s -> {len(latencies) / wall:.1f} logins/s')
+        self.stdout.write(f'Latency ms: {_summary(latencies)}')
+        self.stdout.write(f'Status codes: {dict(sorted(status_counts.items(), key=str))}')
+        if probe_latencies:
+            self.stdout.write(f'Probe {options["probe"]}: {len(probe_latencies)} requests, latency ms: {_summary(probe_latencies)}')
+            self.stdout.write(f'Probe status codes: {dict(sorted(probe_status_counts.items(), key=str))}')
+        if 200 not in status_counts:
+            self.stdout.write(self.style.WARNING('⚠️ No successful logins; check --url/--email/--password'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ Benchmark complete'))
@@ -0,0 +1,148 @@
+"""
+Django management command to load-test promo code redemption
+Usage: python manage.py benchmark_promo_redeem [--clients 50] [--attempts 100] [--max-usage 1000]
+                                               [--slots 16] [--compare] [--reconcile-interval 1]
+
+Creates a temporary promo code, lets N concurrent clients redeem it until it runs out and checks
+that the number of successful redemptions never exceeds max_usage (no overselling).
+With --slots the code uses striped usage counters (see frontend/promo_usage.py) while a background
+thread reconciles them; --compare runs the single-row mode and the striped mode back to back.
+"""
+import threading
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from frontend.models import PromoCode
+from frontend.promo_redemption import PromoCodeRedemptionError, redeem_promo_code
+from frontend.promo_usage import reconcile_promo_usage, set_usage_slots
+
+
+class Command(BaseCommand):
+    help = 'Load-test concurrent promo code redemptions and verify there is no overselling'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=50, help='Concurrent clients (default: 50)')
+        parser.add_argument('--attempts', type=int, default=100, help='Redemptions attempted per client (default: 100)')
+        parser.add_argument('--max-usage', type=int, default=1000, help='max_usage of the test code (default: 1000)')
+        parser.add_argument('--slots', type=int, default=0, help='Striped usage slots (default: 0 = single row)')
+        parser.add_argument(
+            '--compare',
+            action='store_true',
+            help='Run single-row and striped (--slots, default 16) modes back to back'
+        )
+        parser.add_argument(
+            '--reconcile-interval',
+            type=float,
+            default=1.0,
+            help='Seconds between reconciliations while a striped run is going (default: 1)'
+        )
+        parser.add_argument('--keep', action='store_true', help='Keep the temporary promo codes afterwards')
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            modes = [0, options['slots'] or 16]
+        else:
+            modes = [options['slots']]
+
+        results = [self._run(slots, options) for slots in modes]
+
+        if len(results) > 1:
+            single, striped = results
+            self.stdout.write(
+                f'Single row: {single:.0f} redemptions/s, {modes[1]} slots: {striped:.0f} redemptions/s '
+                f'({striped / single:.2f}x)'
+            )
+
+    def _run(self, slots, options):
+        now = timezone.now()
+        promo_code = PromoCode.objects.create(
+            code=f'LOADTEST{uuid.uuid4().hex[:10].upper()}',
+            discount_type=PromoCode.DISCOUNT_TYPE_PERCENTAGE,
+            discount_value=Decimal('10.00'),
+            start_date=now - timedelta(minutes=1),
+            expire_date=now + timedelta(hours=1),
+            max_usage=options['max_usage'],
+        )
+        if slots:
+            set_usage_slots(promo_code.id, slots)
+
+        successes = 0
+        rejected = 0
+        errors = []
+        lock = threading.Lock()
+        start_barrier = threading.Barrier(options['clients'])
+        finished = threading.Event()
+
+        def client():
+            nonlocal successes, rejected
+            try:
+                start_barrier.wait()
+                for _ in range(options['attempts']):
+                    try:
+                        redeem_promo_code(promo_code.code, Decimal('100.00'))
+                    except PromoCodeRedemptionError:
+                        with lock:
+                            rejected += 1
+                        continue
+                    with lock:
+                        successes += 1
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+            finally:
+                connection.close()
+
+        def reconciler():
+            try:
+                while not finished.wait(options['reconcile_interval']):
+                    reconcile_promo_usage(promo_code.id)
+            except Exception as e:
+                with lock:
+                    errors.append(f'reconciler: {e}')
+            finally:
+                connection.close()
+
+        total = options['clients'] * options['attempts']
+        mode = f'{slots} usage slots' if slots else 'single row'
+        self.stdout.write(
+            f'🚀 {options["clients"]} clients x {options["attempts"]} redemptions of {promo_code.code} '
+            f'(max_usage {options["max_usage"]}, {mode})'
+        )
+
+        threads = [threading.Thread(target=client) for _ in range(options['clients'])]
+        reconcile_thread = threading.Thread(target=reconciler) if slots else None
+        started = time.perf_counter()
+        if reconcile_thread:
+            reconcile_thread.start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        finished.set()
+        if reconcile_thread:
+            reconcile_thread.join()
+            reconcile_promo_usage(promo_code.id)
+
+        promo_code.refresh_from_db()
+        self.stdout.write(f'Attempts: {total} in {elapsed:.2f}s -> {total / elapsed:.0f} redemptions/s')
+        self.stdout.write(f'Succeeded: {successes}, rejected: {rejected}, errors: {len(errors)}')
+        self.stdout.write(f'current_usage: {promo_code.current_usage} / {promo_code.max_usage}')
+        if errors:
+            self.stdout.write(self.style.WARNING(f'⚠️ First error: {errors[0]}'))
+
+        oversold = successes > promo_code.max_usage or promo_code.current_usage != successes
+        if not options['keep']:
+            promo_code.delete()
+
+        if oversold:
+            self.stdout.write(self.style.ERROR('❌ Overselling detected'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ No overselling'))
+        return total / elapsed
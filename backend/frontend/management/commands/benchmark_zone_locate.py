@@ -0,0 +1,79 @@
+"""
+Django management command to measure batch point-in-zone throughput
+Usage: python manage.py benchmark_zone_locate [--points 100000] [--repeat 3] [--compare] [--seed 1]
+
+Draws random points over the bounding box of the active zones and classifies them with the
+vectorised batch path (frontend/zone_batch.py), reporting points/sec. --compare also runs the
+per-point index lookup (zone_index.ZoneIndex.locate) over the same points and checks that both
+give the same zone for every point.
+"""
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from frontend.zone_batch import NO_ZONE, classify_points
+from frontend.zone_index import get_zone_index
+
+
+class Command(BaseCommand):
+    help = 'Benchmark batch zone lookups (points/sec)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--points', type=int, default=100000, help='Points per batch (default: 100000)')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed batches (default: 3)')
+        parser.add_argument(
+            '--compare',
+            action='store_true',
+            help='Also time per-point lookups and verify both give the same answers'
+        )
+        parser.add_argument('--seed', type=int, default=1, help='Random seed (default: 1)')
+
+    def handle(self, *args, **options):
+        if options['points'] < 1 or options['repeat'] < 1:
+            raise CommandError('--points and --repeat must be at least 1')
+
+        index = get_zone_index(wait=True)
+        zones = [zone for zones in index.cells.values() for zone in zones] + index.large
+        if not zones:
+            raise CommandError('No active zones with a boundary to benchmark against')
+
+        min_lng = min(zone.bbox[0] for zone in zones)
+        min_lat = min(zone.bbox[1] for zone in zones)
+        max_lng = max(zone.bbox[2] for zone in zones)
+        max_lat = max(zone.bbox[3] for zone in zones)
+        rng = np.random.default_rng(options['seed'])
+        lat = rng.uniform(min_lat, max_lat, options['points'])
+        lng = rng.uniform(min_lng, max_lng, options['points'])
+        self.stdout.write(
+            f'{index.size} zones, {options["points"]} points over '
+            f'[{min_lat:.3f}, {min_lng:.3f}] - [{max_lat:.3f}, {max_lng:.3f}]'
+        )
+
+        classify_points(lat[:1000], lng[:1000], index)  # warm-up (ring arrays)
+        timings = []
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            zone_ids = classify_points(lat, lng, index)
+            timings.append(time.perf_counter() - started)
+        batch_rate = options['points'] / min(timings)
+        matched = int(np.count_nonzero(zone_ids != NO_ZONE))
+        self.stdout.write(
+            f'Batch: {batch_rate:,.0f} points/s (best of {options["repeat"]}, '
+            f'{matched} points inside a zone)'
+        )
+
+        if options['compare']:
+            started = time.perf_counter()
+            expected = []
+            for point_lat, point_lng in zip(lat.tolist(), lng.tolist()):
+                zone = index.locate(point_lat, point_lng)
+                expected.append(zone.zone_id if zone is not None else NO_ZONE)
+            single_rate = options['points'] / (time.perf_counter() - started)
+            mismatches = int(np.count_nonzero(np.asarray(expected, dtype=np.int64) != zone_ids))
+            self.stdout.write(
+                f'Per point: {single_rate:,.0f} points/s, batch is {batch_rate / single_rate:.1f}x faster'
+            )
+            if mismatches:
+                raise CommandError(f'{mismatches} points classified differently by the two paths')
+            self.stdout.write(self.style.SUCCESS('Batch and per-point lookups agree on every point'))
@@ -0,0 +1,45 @@
+"""
+Django management command to deliver queued emails from the outbox
+Usage: python manage.py process_email_outbox [--loop]
+
+Without --loop, sends everything that is currently due and exits (suitable for cron).
+With --loop, runs the outbox worker pool in the foreground as a dedicated mail worker.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from frontend.email_outbox import process_outbox_batch, start_workers
+from frontend.models import EmailOutbox
+
+
+class Command(BaseCommand):
+    help = 'Deliver pending emails from frontend_email_outbox (retries included)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running the worker pool instead of draining once'
+        )
+
+    def handle(self, *args, **options):
+        if options['loop']:
+            self.stdout.write('Starting email outbox workers (Ctrl+C to stop)...')
+            start_workers()
+            try:
+                while True:
+                    time.sleep(60)
+            except KeyboardInterrupt:
+                return
+
+        processed = 0
+        while True:
+            claimed = process_outbox_batch()
+            if not claimed:
+                break
+            processed += claimed
+
+        pending = EmailOutbox.objects.filter(status=EmailOutbox.STATUS_PENDING).count()
+        failed = EmailOutbox.objects.filter(status=EmailOutbox.STATUS_FAILED).count()
+        self.stdout.write(f'Processed {processed} email(s); {pending} pending retry, {failed} failed permanently')
+        self.stdout.write(self.style.SUCCESS('✅ Email outbox drained'))
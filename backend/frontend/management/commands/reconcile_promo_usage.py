@@ -0,0 +1,64 @@
+"""
+Django management command to reconcile striped promo code usage counters
+Usage: python manage.py reconcile_promo_usage [--loop] [--interval 5]
+       python manage.py reconcile_promo_usage --code SAVE20 --slots 16
+
+Folds the per-slot usage counts of codes with usage_slots > 0 into current_usage and splits the
+remaining uses over the slots again (see frontend/promo_usage.py). Run it from cron, or with --loop
+as a small worker; the shorter the interval, the less capacity sits idle in full slots.
+With --code/--slots, switches one code's counting mode (--slots 0 = back to a single row).
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from frontend.models import PromoCode
+from frontend.promo_usage import MAX_USAGE_SLOTS, reconcile_promo_usage, set_usage_slots
+
+
+class Command(BaseCommand):
+    help = 'Fold striped promo code usage slots into current_usage and rebalance their capacity'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep reconciling every --interval seconds')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between passes with --loop (default: 5)')
+        parser.add_argument('--code', help='Promo code to switch to striped counting (use with --slots)')
+        parser.add_argument('--slots', type=int, help=f'Usage slots for --code (0-{MAX_USAGE_SLOTS}, 0 = single row)')
+
+    def handle(self, *args, **options):
+        if options['code'] is not None or options['slots'] is not None:
+            self._set_slots(options['code'], options['slots'])
+            return
+
+        if not options['loop']:
+            result = reconcile_promo_usage()
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ Reconciled {result["codes"]} striped code(s), folded {result["folded"]} use(s)'
+            ))
+            return
+
+        self.stdout.write(f'Reconciling striped promo codes every {options["interval"]}s (Ctrl+C to stop)...')
+        try:
+            while True:
+                result = reconcile_promo_usage()
+                if result['folded']:
+                    self.stdout.write(f'Folded {result["folded"]} use(s) across {result["codes"]} code(s)')
+                # PgBouncer-friendly: don't hold a server connection between passes
+                connection.close()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            return
+
+    def _set_slots(self, code, slots):
+        if code is None or slots is None:
+            raise CommandError('--code and --slots must be given together')
+        promo_code = PromoCode.objects.filter(code__iexact=code).first()
+        if promo_code is None:
+            raise CommandError(f'Promo code "{code}" not found')
+        try:
+            set_usage_slots(promo_code.id, slots)
+        except ValueError as e:
+            raise CommandError(str(e))
+        mode = f'{slots} usage slots' if slots else 'single-row counting'
+        self.stdout.write(self.style.SUCCESS(f'✅ {promo_code.code} now uses {mode}'))
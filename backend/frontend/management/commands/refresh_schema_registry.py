@@ -0,0 +1,36 @@
+"""
+Django management command to refresh the schema registry for unmanaged tables
+Usage: python manage.py refresh_schema_registry [--table rides_user]
+
+Re-reads the table's columns from information_schema (e.g. after a phone column is added or
+renamed on rides_user) and bumps the registry generation in the database, so running workers
+reload it within CACHE_GENERATION_CHECK_INTERVAL seconds.
+"""
+from django.core.management.base import BaseCommand
+from frontend.schema_registry import RIDES_USER_TABLE, refresh_table_schema
+
+
+class Command(BaseCommand):
+    help = 'Refresh the cached column mappings of unmanaged tables (rides_user by default)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--table',
+            default=RIDES_USER_TABLE,
+            help=f'Table to refresh (default: {RIDES_USER_TABLE})'
+        )
+
+    def handle(self, *args, **options):
+        table_name = options['table']
+        schema = refresh_table_schema(table_name)
+
+        if not schema['columns']:
+            self.stdout.write(self.style.WARNING(f'⚠️ Table "{table_name}" not found or has no columns'))
+            return
+
+        self.stdout.write(f'Table: {table_name} ({len(schema["columns"])} columns)')
+        for name, info in schema['columns'].items():
+            nullable = 'NULL' if info['is_nullable'] else 'NOT NULL'
+            self.stdout.write(f'  {name}: {info["data_type"]} {nullable}')
+        self.stdout.write(f'Phone column: {schema["phone_column"] or "(none)"}')
+        self.stdout.write(self.style.SUCCESS(f'✅ Schema registry refreshed for {table_name}'))
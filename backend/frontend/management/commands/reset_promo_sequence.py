@@ -4,6 +4,10 @@ Usage: python manage.py reset_promo_sequence
 
 This command resets the PostgreSQL sequence for frontend_promocode.id
 to the maximum ID + 1, so new records get sequential IDs.
+
+Not needed in normal operation: promo code ids may have gaps and the UI numbers rows with
+display_number (PromoCode.objects.with_display_number()). Only use it to repair a sequence
+that has fallen behind MAX(id), e.g. after rows were inserted with explicit ids.
 """
 from django.core.management.base import BaseCommand
 from django.db import connection
@@ -0,0 +1,44 @@
+"""
+Django management command to expire promo codes
+Usage: python manage.py sweep_promo_codes [--loop] [--interval 60]
+
+Switches active codes that have expired or reached max_usage to 'deactivate' and refreshes
+effective_status (scheduled codes whose start date has passed become active) in one bulk UPDATE
+(see frontend/promo_lifecycle.py). Run it from cron, or with --loop as a small worker.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from frontend.promo_lifecycle import sweep_promo_codes
+
+
+class Command(BaseCommand):
+    help = 'Deactivate expired/exhausted promo codes and refresh their effective_status'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep sweeping every --interval seconds')
+        parser.add_argument('--interval', type=float, default=60, help='Seconds between sweeps with --loop (default: 60)')
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            result = sweep_promo_codes()
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ Deactivated {result["deactivated"]} promo code(s), updated {result["updated"]} in total'
+            ))
+            return
+
+        self.stdout.write(f'Sweeping promo codes every {options["interval"]}s (Ctrl+C to stop)...')
+        try:
+            while True:
+                result = sweep_promo_codes()
+                if result['updated']:
+                    self.stdout.write(
+                        f'Deactivated {result["deactivated"]} promo code(s), updated {result["updated"]} in total'
+                    )
+                # PgBouncer-friendly: don't hold a server connection between sweeps
+                connection.close()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            return
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('frontend', '0045_alter_user_role_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='role',
+            name='permissions_version',
+            field=models.PositiveIntegerField(default=0, help_text='Incremented on every permission change (invalidates cached permission matrices)'),
+        ),
+    ]
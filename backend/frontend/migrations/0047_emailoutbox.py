@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-17 11:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('frontend', '0046_role_permissions_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailOutbox',
+            fields=[
+                ('id', models.BigAutoField(help_text='Primary key', primary_key=True, serialize=False)),
+                ('recipient', models.EmailField(help_text='Recipient email address', max_length=254)),
+                ('subject', models.CharField(help_text='Email subject', max_length=255)),
+                ('body', models.TextField(help_text='Plain text email body (cleared once delivered or given up on, as it may contain credentials)')),
+                ('from_email', models.CharField(blank=True, help_text='Sender address (defaults to DEFAULT_FROM_EMAIL)', max_length=255, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', help_text='Delivery status', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Number of delivery attempts so far')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Earliest time the next delivery attempt may run')),
+                ('locked_at', models.DateTimeField(blank=True, help_text='When a worker claimed this email (stale claims are retried)', null=True)),
+                ('last_error', models.TextField(blank=True, help_text='Error from the last failed attempt', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Timestamp when the email was queued')),
+                ('sent_at', models.DateTimeField(blank=True, help_text='Timestamp when the email was delivered', null=True)),
+            ],
+            options={
+                'verbose_name': 'Email Outbox',
+                'verbose_name_plural': 'Email Outbox',
+                'db_table': 'frontend_email_outbox',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='idx_email_outbox_due')],
+            },
+        ),
+    ]
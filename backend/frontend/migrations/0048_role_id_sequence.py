@@ -0,0 +1,26 @@
+# Generated by Django 6.0 on 2026-10-17 19:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('frontend', '0047_emailoutbox'),
+    ]
+
+    operations = [
+        # Sequence behind frontend.role_ids.allocate_role_id(), seeded with the highest existing R### id
+        migrations.RunSQL(
+            sql="""
+                CREATE SEQUENCE IF NOT EXISTS frontend_role_id_seq START 1;
+                SELECT setval('frontend_role_id_seq', max_number, true)
+                FROM (
+                    SELECT MAX(substring(role_id from '^[Rr]0*([0-9]+)$')::bigint) AS max_number
+                    FROM frontend_role
+                ) existing
+                WHERE max_number IS NOT NULL AND max_number > 0;
+            """,
+            reverse_sql="DROP SEQUENCE IF EXISTS frontend_role_id_seq;",
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-17 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('frontend', '0048_role_id_sequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='promocode',
+            index=models.Index(fields=['-created_at', '-id'], name='idx_promocode_created_desc'),
+        ),
+    ]
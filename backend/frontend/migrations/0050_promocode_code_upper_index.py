@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 20:30
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('frontend', '0049_promocode_created_desc_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='promocode',
+            index=models.Index(django.db.models.functions.text.Upper('code'), name='idx_promocode_code_upper'),
+        ),
+    ]
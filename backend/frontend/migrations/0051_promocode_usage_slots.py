@@ -0,0 +1,35 @@
+# Generated by Django 6.0 on 2026-10-17 22:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('frontend', '0050_promocode_code_upper_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='promocode',
+            name='usage_slots',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Number of usage counter slots redemptions are spread over (0 = count on this row)'),
+        ),
+        migrations.CreateModel(
+            name='PromoCodeUsageSlot',
+            fields=[
+                ('id', models.BigAutoField(help_text='Primary key', primary_key=True, serialize=False)),
+                ('slot', models.PositiveSmallIntegerField(help_text='Slot number (0 .. usage_slots - 1)')),
+                ('capacity', models.PositiveIntegerField(default=0, help_text='Uses this slot may hand out until the next reconciliation')),
+                ('used', models.PositiveIntegerField(default=0, help_text='Uses handed out by this slot since the last reconciliation')),
+                ('promo_code', models.ForeignKey(help_text='Promo code this counter slot belongs to', on_delete=django.db.models.deletion.CASCADE, related_name='usage_slot_rows', to='frontend.promocode')),
+            ],
+            options={
+                'verbose_name': 'Promo Code Usage Slot',
+                'verbose_name_plural': 'Promo Code Usage Slots',
+                'db_table': 'frontend_promo_code_usage_slots',
+                'unique_together': {('promo_code', 'slot')},
+            },
+        ),
+    ]
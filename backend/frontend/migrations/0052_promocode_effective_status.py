@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-17 23:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('frontend', '0051_promocode_usage_slots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='promocode',
+            name='effective_status',
+            field=models.CharField(choices=[('active', 'Active'), ('scheduled', 'Scheduled'), ('expired', 'Expired'), ('exhausted', 'Usage Limit Reached'), ('deactivate', 'Deactivate')], default='active', help_text='Status taking the date window and usage limit into account', max_length=20),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE frontend_promocode SET effective_status = CASE
+                    WHEN expire_date < now() THEN 'expired'
+                    WHEN current_usage >= max_usage THEN 'exhausted'
+                    WHEN status <> 'active' THEN 'deactivate'
+                    WHEN start_date > now() THEN 'scheduled'
+                    ELSE 'active'
+                END
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='promocode',
+            index=models.Index(fields=['effective_status', 'expire_date'], name='idx_promocode_effective'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 6.0 on 2026-10-18 09:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('frontend', '0052_promocode_effective_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='zone',
+            name='boundary',
+            field=models.TextField(blank=True, help_text='Zone boundary as WKT: POLYGON((lon1 lat1, lon2 lat2, ..., lon1 lat1))', null=True),
+        ),
+        migrations.AddField(
+            model_name='zone',
+            name='min_lng',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='zone',
+            name='min_lat',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='zone',
+            name='max_lng',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='zone',
+            name='max_lat',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='zone',
+            index=models.Index(fields=['min_lng', 'max_lng', 'min_lat', 'max_lat'], name='idx_zone_bbox'),
+        ),
+    ]
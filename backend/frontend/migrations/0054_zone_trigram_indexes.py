@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-18 11:40
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('frontend', '0053_zone_boundary'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='zone',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('zone_name'), name='gin_trgm_ops'), name='idx_zone_name_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='zone',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('country'), name='gin_trgm_ops'), name='idx_zone_country_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='zone',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('state'), name='gin_trgm_ops'), name='idx_zone_state_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='zone',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('city'), name='gin_trgm_ops'), name='idx_zone_city_trgm'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-19 10:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('frontend', '0054_zone_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheGeneration',
+            fields=[
+                ('name', models.CharField(help_text="Cache name (e.g. 'zone_index')", max_length=100, primary_key=True, serialize=False)),
+                ('generation', models.BigIntegerField(default=0, help_text='Incremented whenever the cached data changes')),
+            ],
+            options={
+                'verbose_name': 'Cache Generation',
+                'verbose_name_plural': 'Cache Generations',
+                'db_table': 'frontend_cache_generation',
+            },
+        ),
+    ]
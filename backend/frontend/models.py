@@ -1,14 +1,27 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.conf import settings
 from django.core.validators import MinValueValidator
-from django.contrib.auth.hashers import make_password
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
+from django.db.models.functions import Upper
+from django.utils import timezone
 from decimal import Decimal
 
 User = settings.AUTH_USER_MODEL
 
 
+class RidesUserQuerySet(models.QuerySet):
+    def with_phone_number(self):
+        """Annotate phone_number from whichever phone column rides_user has (see schema_registry)"""
+        from django.db.models.expressions import RawSQL
+        from .schema_registry import get_rides_user_phone_column
+        phone_column = get_rides_user_phone_column()
+        if phone_column:
+            return self.annotate(phone_number=RawSQL(f'"rides_user"."{phone_column}"', []))
+        return self.annotate(phone_number=models.Value(None, output_field=models.CharField()))
+
+
 class RidesUser(models.Model):
     """Model to connect to existing rides_user table with actual column structure"""
     # Primary key
@@ -20,9 +33,8 @@ class RidesUser(models.Model):
     
     # User information fields
     name = models.CharField(max_length=255, blank=True, null=True)  # Full name
-    # Phone number field removed - column doesn't exist in database
-    # If phone number column exists with different name, add it back with db_column parameter
-    # Example: phone_number = models.CharField(max_length=20, blank=True, null=True, db_column='phone')
+    # Phone number field removed - the column name differs between environments
+    # Use RidesUser.objects.with_phone_number() to select it via the schema registry
     email = models.EmailField(blank=True, null=True)  # Email address
     dob = models.DateField(blank=True, null=True)  # Date of birth
     
@@ -39,6 +51,8 @@ class RidesUser(models.Model):
     custom_user_id = models.CharField(max_length=255, blank=True, null=True)  # Custom user ID
     deleted_at = models.DateTimeField(blank=True, null=True)  # Soft delete timestamp
     
+    objects = RidesUserQuerySet.as_manager()
+    
     class Meta:
         managed = False  # Don't let Django manage this table (it already exists)
         db_table = 'rides_user'  # Connect to existing table name
@@ -177,6 +191,39 @@ class AdminProfile(models.Model):
         return self.role in [self.ROLE_ADMIN, self.ROLE_SUPERADMIN]
 
 
+class PromoCodeQuerySet(models.QuerySet):
+    def with_display_number(self):
+        """
+        Annotate display_number: the row's position (1 = newest) in the filtered list.
+        Computed with ROW_NUMBER() at read time, so ids can have gaps (the id sequence is never
+        reset) while the UI still shows gap-free numbering.
+        """
+        from django.db.models import F, Window
+        from django.db.models.functions import RowNumber
+        return self.annotate(
+            display_number=Window(RowNumber(), order_by=[F('created_at').desc(), F('id').desc()])
+        )
+    
+    def with_total_count(self):
+        """Annotate total_count: rows matching the filters (COUNT(*) OVER ()), so a page carries its total"""
+        from django.db.models import Count, Window
+        return self.annotate(total_count=Window(Count('id')))
+    
+    def deactivate(self):
+        """Bulk-deactivate, keeping effective_status as expired/exhausted where that still applies"""
+        from django.db.models import Case, F, Value, When
+        from django.db.models.functions import Now
+        return self.update(
+            updated_at=Now(),
+            status=PromoCode.STATUS_DEACTIVATE,
+            effective_status=Case(
+                When(expire_date__lt=Now(), then=Value(PromoCode.EFFECTIVE_STATUS_EXPIRED)),
+                When(current_usage__gte=F('max_usage'), then=Value(PromoCode.EFFECTIVE_STATUS_EXHAUSTED)),
+                default=Value(PromoCode.EFFECTIVE_STATUS_DEACTIVATE),
+            ),
+        )
+
+
 class PromoCode(models.Model):
     """PromoCode model for discount codes"""
     
@@ -198,6 +245,21 @@ class PromoCode(models.Model):
         (STATUS_DEACTIVATE, 'Deactivate'),
     ]
     
+    # Effective status choices (status combined with the date window and usage, see promo_lifecycle.py)
+    EFFECTIVE_STATUS_ACTIVE = 'active'
+    EFFECTIVE_STATUS_SCHEDULED = 'scheduled'
+    EFFECTIVE_STATUS_EXPIRED = 'expired'
+    EFFECTIVE_STATUS_EXHAUSTED = 'exhausted'
+    EFFECTIVE_STATUS_DEACTIVATE = 'deactivate'
+    
+    EFFECTIVE_STATUS_CHOICES = [
+        (EFFECTIVE_STATUS_ACTIVE, 'Active'),
+        (EFFECTIVE_STATUS_SCHEDULED, 'Scheduled'),
+        (EFFECTIVE_STATUS_EXPIRED, 'Expired'),
+        (EFFECTIVE_STATUS_EXHAUSTED, 'Usage Limit Reached'),
+        (EFFECTIVE_STATUS_DEACTIVATE, 'Deactivate'),
+    ]
+    
     # Promo code (unique identifier)
     code = models.CharField(
         max_length=50, 
@@ -240,6 +302,12 @@ class PromoCode(models.Model):
         help_text="Current number of times this promo code has been used"
     )
     
+    # Striped usage counting for hot codes (see promo_usage.py)
+    usage_slots = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Number of usage counter slots redemptions are spread over (0 = count on this row)"
+    )
+    
     # Status
     status = models.CharField(
         max_length=20, 
@@ -248,10 +316,20 @@ class PromoCode(models.Model):
         help_text="Status of the promo code"
     )
     
+    # Maintained on save, by redemptions and by the sweep_promo_codes command, so lists can filter in SQL
+    effective_status = models.CharField(
+        max_length=20,
+        choices=EFFECTIVE_STATUS_CHOICES,
+        default=EFFECTIVE_STATUS_ACTIVE,
+        help_text="Status taking the date window and usage limit into account"
+    )
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = PromoCodeQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "Promo Code"
         verbose_name_plural = "Promo Codes"
@@ -259,11 +337,48 @@ class PromoCode(models.Model):
         indexes = [
             models.Index(fields=['code']),
             models.Index(fields=['status', 'start_date', 'expire_date']),
+            # Serves the list order and the display_number window
+            models.Index(fields=['-created_at', '-id'], name='idx_promocode_created_desc'),
+            # Case-insensitive code lookups (code__iexact, bulk generation de-duplication)
+            models.Index(Upper('code'), name='idx_promocode_code_upper'),
+            # ?effective_status= list filter and the sweeper's relabelling of codes past their expiry
+            models.Index(fields=['effective_status', 'expire_date'], name='idx_promocode_effective'),
         ]
     
     def __str__(self):
         return f"{self.code} - {self.get_discount_type_display()} {self.discount_value}"
     
+    def save(self, *args, **kwargs):
+        self.effective_status = self.compute_effective_status(usage=self.usage_including_slots())
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'effective_status' not in update_fields:
+            kwargs['update_fields'] = list(update_fields) + ['effective_status']
+        super().save(*args, **kwargs)
+    
+    def usage_including_slots(self):
+        """current_usage plus the uses striped slots handed out since the last reconciliation"""
+        if not (self.pk and self.usage_slots):
+            return self.current_usage
+        pending = self.usage_slot_rows.aggregate(total=models.Sum('used'))['total'] or 0
+        return self.current_usage + pending
+    
+    def compute_effective_status(self, now=None, usage=None):
+        """
+        Effective status right now (same rules as promo_lifecycle.EFFECTIVE_STATUS_SQL).
+        `usage` defaults to current_usage.
+        """
+        now = now or timezone.now()
+        usage = self.current_usage if usage is None else usage
+        if now > self.expire_date:
+            return self.EFFECTIVE_STATUS_EXPIRED
+        if usage >= self.max_usage:
+            return self.EFFECTIVE_STATUS_EXHAUSTED
+        if self.status != self.STATUS_ACTIVE:
+            return self.EFFECTIVE_STATUS_DEACTIVATE
+        if now < self.start_date:
+            return self.EFFECTIVE_STATUS_SCHEDULED
+        return self.EFFECTIVE_STATUS_ACTIVE
+    
     @property
     def is_valid(self):
         """Check if promo code is currently valid"""
@@ -334,6 +449,45 @@ class PromoCode(models.Model):
         return max(0, round(final_amount, 2))
 
 
+class PromoCodeUsageSlot(models.Model):
+    """
+    One stripe of a promo code's usage counter (see promo_usage.py)
+    Table name: frontend_promo_code_usage_slots
+    Redemptions of a striped code increment a random slot instead of PromoCode.current_usage;
+    each slot may only hand out `capacity` uses, and the capacities add up to the uses that were
+    left at the last reconciliation, so the code can never be redeemed more than max_usage times.
+    """
+    id = models.BigAutoField(
+        primary_key=True,
+        help_text="Primary key"
+    )
+    promo_code = models.ForeignKey(
+        PromoCode,
+        on_delete=models.CASCADE,
+        related_name='usage_slot_rows',
+        help_text="Promo code this counter slot belongs to"
+    )
+    slot = models.PositiveSmallIntegerField(
+        help_text="Slot number (0 .. usage_slots - 1)"
+    )
+    capacity = models.PositiveIntegerField(
+        default=0,
+        help_text="Uses this slot may hand out until the next reconciliation"
+    )
+    used = models.PositiveIntegerField(
+        default=0,
+        help_text="Uses handed out by this slot since the last reconciliation"
+    )
+    
+    class Meta:
+        db_table = 'frontend_promo_code_usage_slots'
+        verbose_name = "Promo Code Usage Slot"
+        verbose_name_plural = "Promo Code Usage Slots"
+        unique_together = [['promo_code', 'slot']]
+    
+    def __str__(self):
+        return f"{self.promo_code_id} slot {self.slot}: {self.used}/{self.capacity}"
+
 class Zone(models.Model):
     """
     Zone Management model for defining geographic zones
@@ -381,6 +535,19 @@ class Zone(models.Model):
         help_text="Status of the zone: True for active, False for inactive"
     )
     
+    # Boundary used by point-in-zone lookups (see zone_index.py)
+    boundary = models.TextField(
+        blank=True,
+        null=True,
+        help_text="Zone boundary as WKT: POLYGON((lon1 lat1, lon2 lat2, ..., lon1 lat1))"
+    )
+    
+    # Bounding box of `boundary`, maintained on save (SQL prefilter for lookups)
+    min_lng = models.FloatField(blank=True, null=True)
+    min_lat = models.FloatField(blank=True, null=True)
+    max_lng = models.FloatField(blank=True, null=True)
+    max_lat = models.FloatField(blank=True, null=True)
+    
     created_at = models.DateTimeField(
         auto_now_add=True,
         help_text="Timestamp when the zone was created"
@@ -402,12 +569,34 @@ class Zone(models.Model):
             models.Index(fields=['city']),
             models.Index(fields=['status']),
             models.Index(fields=['priority']),
+            models.Index(fields=['min_lng', 'max_lng', 'min_lat', 'max_lat'], name='idx_zone_bbox'),
+            # Trigram indexes on UPPER(column) serve the zone list search/filters: icontains
+            # compiles to UPPER(column) LIKE UPPER('%...%') (pg_trgm)
+            GinIndex(OpClass(Upper('zone_name'), name='gin_trgm_ops'), name='idx_zone_name_trgm'),
+            GinIndex(OpClass(Upper('country'), name='gin_trgm_ops'), name='idx_zone_country_trgm'),
+            GinIndex(OpClass(Upper('state'), name='gin_trgm_ops'), name='idx_zone_state_trgm'),
+            GinIndex(OpClass(Upper('city'), name='gin_trgm_ops'), name='idx_zone_city_trgm'),
         ]
     
     def __str__(self):
         status_text = "Active" if self.status else "Inactive"
         return f"{self.zone_name} - {status_text}"
     
+    def set_bounding_box(self):
+        """Recompute min/max lng/lat from `boundary` (save() does this; bulk_create() callers must)"""
+        from .zone_index import parse_wkt_polygon, ring_bbox
+        if self.boundary:
+            self.min_lng, self.min_lat, self.max_lng, self.max_lat = ring_bbox(parse_wkt_polygon(self.boundary))
+        else:
+            self.min_lng = self.min_lat = self.max_lng = self.max_lat = None
+    
+    def save(self, *args, **kwargs):
+        self.set_bounding_box()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'boundary' in update_fields:
+            kwargs['update_fields'] = list(update_fields) + ['min_lng', 'min_lat', 'max_lng', 'max_lat']
+        super().save(*args, **kwargs)
+    
     @property
     def is_active(self):
         """Check if zone is active"""
@@ -475,12 +664,14 @@ class User(models.Model):
         return f"{self.name} - {self.email}"
     
     def save(self, *args, **kwargs):
+        # Hashing runs on the bounded password hashing pool (see password_hashing.py)
+        from .password_hashing import hash_password, is_password_hashed
         # Hash password if it's not already hashed
-        if self.password and not self.password.startswith('pbkdf2_'):
-            self.password = make_password(self.password)
+        if self.password and not is_password_hashed(self.password):
+            self.password = hash_password(self.password)
         # Hash confirm_password if it's not already hashed
-        if self.confirm_password and not self.confirm_password.startswith('pbkdf2_'):
-            self.confirm_password = make_password(self.confirm_password)
+        if self.confirm_password and not is_password_hashed(self.confirm_password):
+            self.confirm_password = hash_password(self.confirm_password)
         super().save(*args, **kwargs)
 
     def get_roles(self):
@@ -488,37 +679,29 @@ class User(models.Model):
 
         Priority:
         - If user has entries in `frontend_user_roles` (UserRole), use those.
-        - Otherwise, fall back to the `role_id` column on the `frontend_user` table.
+        - Otherwise, fall back to the `role_id` column on the `frontend_user` table
+          ('1', 'R001', 'r001' and 'R1' all resolve to the same role).
         This does not persist any changes; it's a read-only helper.
         """
-        from django.db.models import Q
-        # Try explicit assignments via UserRole
-        roles_qs = Role.objects.filter(user_roles__user_id=self.id, user_roles__is_active=True).distinct()
-        if roles_qs.exists():
-            return roles_qs
+        return Role.objects.filter(role_id__in=self.get_role_ids())
 
-        # Fallback to role_id stored on user (may be numeric PK or role_id string)
-        if self.role_id is None:
-            return Role.objects.none()
-
-        # Try matching primary key or role_id (case-insensitive)
-        return Role.objects.filter(Q(role_id__iexact=str(self.role_id)) | Q(role_id=str(self.role_id)))
+    def get_role_ids(self):
+        """Return the role_ids for this user (same priority as get_roles(), cached per user)"""
+        from .permission_cache import get_user_role_ids
+        return get_user_role_ids(self)
 
     def get_permissions(self):
         """Return permissions mapping for this user's roles.
 
         Format: { page_path: { permission_type: bool, ... }, ... }
-        Merges permissions across multiple roles if present.
+        Merges permissions across multiple roles if present (allowed if any role allows it).
+        Served from the per-role permission matrix cache (see permission_cache.py).
         """
-        perms = {}
-        roles = self.get_roles()
-        if not roles.exists():
-            return perms
-
-        perms_qs = RolePermission.objects.filter(role__in=roles)
-        for rp in perms_qs:
-            perms.setdefault(rp.page_path, {})[rp.permission_type] = bool(rp.is_allowed)
-        return perms
+        from .permission_cache import get_permissions_for_roles
+        role_ids = self.get_role_ids()
+        if not role_ids:
+            return {}
+        return get_permissions_for_roles(role_ids)
 
 
 class Role(models.Model):
@@ -557,6 +740,10 @@ class Role(models.Model):
         default=True,
         help_text="Whether this role is active"
     )
+    permissions_version = models.PositiveIntegerField(
+        default=0,
+        help_text="Incremented on every permission change (invalidates cached permission matrices)"
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         help_text="Creation timestamp"
@@ -718,9 +905,184 @@ class UserRole(models.Model):
         return f"{self.user.username} - {self.role.role_id} ({self.role.name}) - {status}"
 
 
+class EmailOutbox(models.Model):
+    """
+    Outbox of emails waiting to be delivered by the SMTP worker pool (see email_outbox.py)
+    Table name: frontend_email_outbox
+    Rows survive worker restarts; failed sends are retried with exponential backoff.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    
+    id = models.BigAutoField(
+        primary_key=True,
+        help_text="Primary key"
+    )
+    recipient = models.EmailField(
+        help_text="Recipient email address"
+    )
+    subject = models.CharField(
+        max_length=255,
+        help_text="Email subject"
+    )
+    body = models.TextField(
+        help_text="Plain text email body (cleared once delivered or given up on, as it may contain credentials)"
+    )
+    from_email = models.CharField(
+        max_length=255,
+        blank=True,
+        null=True,
+        help_text="Sender address (defaults to DEFAULT_FROM_EMAIL)"
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        help_text="Delivery status"
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of delivery attempts so far"
+    )
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="Earliest time the next delivery attempt may run"
+    )
+    locked_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="When a worker claimed this email (stale claims are retried)"
+    )
+    last_error = models.TextField(
+        blank=True,
+        null=True,
+        help_text="Error from the last failed attempt"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="Timestamp when the email was queued"
+    )
+    sent_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="Timestamp when the email was delivered"
+    )
+    
+    class Meta:
+        db_table = 'frontend_email_outbox'
+        verbose_name = "Email Outbox"
+        verbose_name_plural = "Email Outbox"
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='idx_email_outbox_due'),
+        ]
+    
+    def __str__(self):
+        return f"{self.recipient} - {self.subject} ({self.status})"
+
+
+class CacheGeneration(models.Model):
+    """
+    Generation counters of the in-process caches (see generations.py)
+    Table name: frontend_cache_generation
+    Bumping a row makes every process rebuild the cache it names, whatever cache backend is used.
+    """
+    name = models.CharField(
+        max_length=100,
+        primary_key=True,
+        help_text="Cache name (e.g. 'zone_index')"
+    )
+    generation = models.BigIntegerField(
+        default=0,
+        help_text="Incremented whenever the cached data changes"
+    )
+    
+    class Meta:
+        db_table = 'frontend_cache_generation'
+        verbose_name = "Cache Generation"
+        verbose_name_plural = "Cache Generations"
+    
+    def __str__(self):
+        return f"{self.name}: {self.generation}"
+
+
 # Signal to sync name in RolePermission when Role name is updated
 @receiver(post_save, sender=Role)
 def sync_role_permissions_name(sender, instance, **kwargs):
     """Update name in all related RolePermission records when role name changes"""
+    from .permission_cache import bump_role_version
     RolePermission.objects.filter(role=instance).update(name=instance.name)
+    bump_role_version(instance.role_id)
+
+
+# Signal to rebuild the role alias table when roles are added, renamed or removed
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def invalidate_role_alias_cache(sender, instance, **kwargs):
+    """Forget the cached role alias table used by resolve_role_id()"""
+    from .permission_cache import invalidate_role_aliases
+    invalidate_role_aliases()
+
+
+# Signals to drop a user's cached role_ids when their role assignments change
+@receiver(post_save, sender=UserRole)
+@receiver(post_delete, sender=UserRole)
+def invalidate_user_role_cache(sender, instance, **kwargs):
+    """Forget cached role_ids when a UserRole assignment is added, changed or removed"""
+    from .permission_cache import invalidate_user_roles
+    invalidate_user_roles(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_role_cache_on_save(sender, instance, **kwargs):
+    """Forget cached role_ids when frontend_user.role_id may have changed"""
+    from .permission_cache import invalidate_user_roles
+    invalidate_user_roles(instance.id)
+
+
+# Signals to drop a promo code from the checkout lookup cache when it is saved or deleted
+@receiver(pre_save, sender=PromoCode)
+def remember_stored_promo_code(sender, instance, update_fields=None, **kwargs):
+    """Note the code currently in the database, so a rename also forgets the old code's entry"""
+    instance._stored_code = None
+    if instance.pk and (update_fields is None or 'code' in update_fields):
+        instance._stored_code = PromoCode.objects.filter(pk=instance.pk).values_list('code', flat=True).first()
+
+
+@receiver(post_save, sender=PromoCode)
+@receiver(post_delete, sender=PromoCode)
+def invalidate_promo_code_cache(sender, instance, **kwargs):
+    """Forget the cached copy used by promo_cache.validate_and_quote()"""
+    from .promo_cache import invalidate_promo_code
+    invalidate_promo_code(instance.code)
+    stored_code = getattr(instance, '_stored_code', None)
+    if stored_code and stored_code != instance.code:
+        invalidate_promo_code(stored_code)
+
+
+@receiver(post_save, sender=PromoCode)
+def rebalance_promo_usage_slots(sender, instance, created, **kwargs):
+    """Re-split a striped code's remaining uses after its max_usage/current_usage may have changed"""
+    if instance.usage_slots:
+        from .promo_usage import reconcile_promo_usage
+        reconcile_promo_usage(instance.pk)
+
 
+# Signals to rebuild the point-in-zone index (and retire cached zone search pages) when zones
+# are added, changed or removed
+@receiver(post_save, sender=Zone)
+@receiver(post_delete, sender=Zone)
+def invalidate_zone_index_cache(sender, instance, **kwargs):
+    """Bump the zone index generation once the write is committed (see zone_index.py, zone_search.py)"""
+    from django.db import transaction
+    from .zone_index import invalidate_zone_index
+    transaction.on_commit(invalidate_zone_index)
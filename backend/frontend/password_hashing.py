@@ -0,0 +1,205 @@
+"""
+Password hashing helpers
+
+PBKDF2 is deliberately slow (~100-300ms per password).
+
+- hash_password() / verify_password() run single hashes (User.save(), logins) on a dedicated,
+  bounded thread pool (PASSWORD_HASH_THREADS). hashlib releases the GIL while hashing, so the
+  pool caps how much CPU password work may take at once, and a login burst queues there
+  (up to PASSWORD_HASH_MAX_QUEUE, then PasswordHashingBusy) instead of starving other endpoints.
+  The caps are per process: they only protect other endpoints because gunicorn runs threaded
+  workers (gunicorn.conf.py) with more threads than PASSWORD_HASH_MAX_QUEUE.
+  get_hashing_metrics() reports queue depth and wait/run times.
+- hash_passwords() spreads bulk hashing (user imports) over a process pool. The pool uses the
+  'spawn' start method so child processes never inherit the parent's open database connections.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, make_password
+
+logger = logging.getLogger(__name__)
+
+
+# Below this many passwords the pool start-up cost outweighs the parallelism
+PROCESS_POOL_THRESHOLD = 16
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when too many password hashes are already queued (callers should answer 503)"""
+
+
+def is_password_hashed(value):
+    """True if value is an encoded hash for one of the configured PASSWORD_HASHERS"""
+    if not value:
+        return False
+    try:
+        identify_hasher(value)
+    except ValueError:
+        return False
+    return True
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_metrics_lock = threading.Lock()
+_metrics = {
+    'submitted': 0,
+    'completed': 0,
+    'rejected': 0,
+    'timed_out': 0,
+    'rehashed': 0,
+    'in_flight': 0,
+    'total_wait_ms': 0.0,
+    'total_run_ms': 0.0,
+    'max_wait_ms': 0.0,
+}
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'PASSWORD_HASH_THREADS', 4),
+                    thread_name_prefix='password-hash',
+                )
+    return _executor
+
+
+def _run_bounded(func, *args):
+    """Run func(*args) on the hashing pool, waiting for the result; enforces the queue cap"""
+    max_queue = getattr(settings, 'PASSWORD_HASH_MAX_QUEUE', 64)
+    with _metrics_lock:
+        if _metrics['in_flight'] >= max_queue:
+            _metrics['rejected'] += 1
+            raise PasswordHashingBusy('Too many password operations in progress')
+        _metrics['in_flight'] += 1
+        _metrics['submitted'] += 1
+
+    submitted_at = time.monotonic()
+
+    def timed():
+        started_at = time.monotonic()
+        try:
+            return func(*args)
+        finally:
+            finished_at = time.monotonic()
+            wait_ms = (started_at - submitted_at) * 1000
+            with _metrics_lock:
+                _metrics['in_flight'] -= 1
+                _metrics['completed'] += 1
+                _metrics['total_wait_ms'] += wait_ms
+                _metrics['total_run_ms'] += (finished_at - started_at) * 1000
+                _metrics['max_wait_ms'] = max(_metrics['max_wait_ms'], wait_ms)
+
+    try:
+        future = _get_executor().submit(timed)
+    except Exception:
+        with _metrics_lock:
+            _metrics['in_flight'] -= 1
+        raise
+    try:
+        return future.result(timeout=getattr(settings, 'PASSWORD_HASH_TIMEOUT', 10))
+    except FutureTimeoutError:
+        cancelled = future.cancel()
+        with _metrics_lock:
+            _metrics['timed_out'] += 1
+            if cancelled:
+                # Still queued: timed() will never run to release its slot
+                _metrics['in_flight'] -= 1
+        raise PasswordHashingBusy('Timed out waiting for password hashing')
+
+
+def hash_password(raw_password, hasher='default'):
+    """make_password() on the bounded hashing pool"""
+    return _run_bounded(make_password, raw_password, None, hasher)
+
+
+def verify_password(raw_password, encoded, user_id=None):
+    """
+    check_password() on the bounded hashing pool.
+
+    When PASSWORD_REHASH_ON_LOGIN is enabled and the password is correct but stored with a
+    different hasher than PASSWORD_LOGIN_HASHER (or the hasher asks for an update, e.g. more
+    iterations), the frontend_user row identified by user_id is rehashed transparently.
+    """
+    if not encoded:
+        return False
+    is_correct = _run_bounded(check_password, raw_password, encoded)
+    if is_correct and user_id is not None and getattr(settings, 'PASSWORD_REHASH_ON_LOGIN', False):
+        try:
+            _rehash_if_needed(raw_password, encoded, user_id)
+        except Exception as e:
+            # Never fail a login because of a rehash problem
+            logger.warning(f"Password rehash failed for user {user_id}: {str(e)}")
+    return is_correct
+
+
+def _rehash_if_needed(raw_password, encoded, user_id):
+    target_algorithm = getattr(settings, 'PASSWORD_LOGIN_HASHER', None) or 'default'
+    target_hasher = get_hasher(target_algorithm)
+    current_hasher = identify_hasher(encoded)
+    if current_hasher.algorithm == target_hasher.algorithm and not target_hasher.must_update(encoded):
+        return
+
+    from .models import User as FrontendUser
+    new_encoded = hash_password(raw_password, target_hasher.algorithm)
+    # update() instead of save(): the value is already hashed and nothing else should change.
+    # Only replace the hash we verified against, in case the password changed meanwhile.
+    updated = FrontendUser.objects.filter(id=user_id, password=encoded).update(password=new_encoded)
+    if updated:
+        with _metrics_lock:
+            _metrics['rehashed'] += 1
+
+
+def get_hashing_metrics():
+    """Snapshot of the hashing pool counters (averages in milliseconds)"""
+    with _metrics_lock:
+        snapshot = dict(_metrics)
+    completed = snapshot['completed'] or 1
+    snapshot['avg_wait_ms'] = round(snapshot['total_wait_ms'] / completed, 2)
+    snapshot['avg_run_ms'] = round(snapshot['total_run_ms'] / completed, 2)
+    snapshot['threads'] = getattr(settings, 'PASSWORD_HASH_THREADS', 4)
+    snapshot['max_queue'] = getattr(settings, 'PASSWORD_HASH_MAX_QUEUE', 64)
+    return snapshot
+
+
+def _init_hash_worker():
+    """Configure Django in a spawned worker (only settings/hashers are used, never the database)"""
+    import django
+    django.setup()
+
+
+def hash_passwords(raw_passwords):
+    """
+    Hash a list of raw passwords with the default hasher, preserving order.
+    Values that are already hashes are returned unchanged (same rule as User.save()).
+    """
+    raw_passwords = list(raw_passwords)
+    to_hash = [index for index, raw in enumerate(raw_passwords) if raw and not is_password_hashed(raw)]
+    hashed = list(raw_passwords)
+
+    max_workers = getattr(settings, 'PASSWORD_HASH_PROCESSES', None) or os.cpu_count() or 1
+    if len(to_hash) < PROCESS_POOL_THRESHOLD or max_workers <= 1:
+        for index in to_hash:
+            hashed[index] = make_password(raw_passwords[index])
+        return hashed
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_hash_worker,
+    ) as executor:
+        chunksize = max(1, len(to_hash) // (max_workers * 4))
+        results = executor.map(make_password, [raw_passwords[index] for index in to_hash], chunksize=chunksize)
+        for index, value in zip(to_hash, results):
+            hashed[index] = value
+    return hashed
@@ -0,0 +1,244 @@
+"""
+Cached permission matrices for RBAC.
+
+Each role's permissions are compiled once into {page_path: {permission_type: bool}} and cached
+under the role's 'role_permissions:{role_id}' generation (generations.py). Writers bump
+Role.permissions_version (the matrix ETag) and, once committed, that generation, so every process
+stops reading the old matrix within CACHE_GENERATION_CHECK_INTERVAL seconds; stale entries simply
+expire.
+User -> role_id resolution (UserRole assignments, falling back to frontend_user.role_id) is cached
+as well, so a warm login or permission check needs no queries at all.
+
+frontend_user.role_id is stored inconsistently ('1', 'R001', 'r001', 'R1'); resolve_role_id() maps
+any of these to the canonical frontend_role.role_id using an alias table built once from frontend_role.
+"""
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from .generations import bump_generation, current_generation
+
+
+GENERATION_NAME = 'role_permissions:{role_id}'
+MATRIX_CACHE_KEY = 'role_perms_matrix:{role_id}:{generation}'
+USER_ROLES_CACHE_KEY = 'user_role_ids:{user_id}'
+ROLE_ALIAS_CACHE_KEY = 'role_alias_table'
+
+ROLE_NUMBER_RE = re.compile(r'^R?0*(\d+)$')
+
+
+def _cache_ttl():
+    return getattr(settings, 'PERMISSION_CACHE_TTL', 300)
+
+
+def get_role_permissions(role_id):
+    """
+    Return the compiled permission matrix for a role.
+
+    Format: { page_path: { permission_type: bool, ... }, ... }
+    The returned dict is shared with the cache - copy it before mutating.
+    """
+    # Read before the rows: a write committed after this point bumps past it, so rows loaded
+    # here are never cached under a generation newer than they are
+    generation = current_generation(GENERATION_NAME.format(role_id=role_id))
+    key = MATRIX_CACHE_KEY.format(role_id=role_id, generation=generation)
+    matrix = cache.get(key)
+    if matrix is not None:
+        return matrix
+
+    # Raw SQL because frontend_role_permissions has a composite PK and no id column
+    matrix = {}
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT page_path, permission_type, is_allowed
+            FROM frontend_role_permissions
+            WHERE role_id = %s
+        """, [role_id])
+        for page_path, permission_type, is_allowed in cursor.fetchall():
+            matrix.setdefault(page_path, {})[permission_type] = bool(is_allowed)
+
+    cache.set(key, matrix, _cache_ttl())
+    return matrix
+
+
+def get_permissions_for_roles(role_ids):
+    """Merge the matrices of several roles (a permission is allowed if any role allows it)"""
+    role_ids = list(role_ids)
+    if len(role_ids) == 1:
+        return {page: dict(perms) for page, perms in get_role_permissions(role_ids[0]).items()}
+
+    merged = {}
+    for role_id in role_ids:
+        for page_path, perms in get_role_permissions(role_id).items():
+            page_perms = merged.setdefault(page_path, {})
+            for permission_type, is_allowed in perms.items():
+                page_perms[permission_type] = page_perms.get(permission_type, False) or is_allowed
+    return merged
+
+
+def bump_role_version(role_id):
+    """
+    Invalidate a role's cached matrix by incrementing its permissions_version (and its cache
+    generation once committed). Call this after any write to frontend_role_permissions for the role.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            UPDATE frontend_role
+            SET permissions_version = permissions_version + 1
+            WHERE role_id = %s
+            RETURNING permissions_version
+        """, [role_id])
+        row = cursor.fetchone()
+
+    # Bump only once the permission rows are committed,
+    # otherwise another request could cache the old rows under the new generation
+    transaction.on_commit(lambda: bump_generation(GENERATION_NAME.format(role_id=role_id)))
+    return row[0] if row is not None else None
+
+
+def role_permissions_etag(role_id, version):
+    """ETag of a role's permission matrix; changes whenever permissions_version is bumped"""
+    return f'"{role_id}-v{version}"'
+
+
+def role_alias_key(value):
+    """
+    Normalise a role reference for alias lookup.
+    '1', '001', 'R1', 'r001' and 'R001' all map to '1'; anything else is upper-cased.
+    """
+    value = str(value).strip().upper()
+    match = ROLE_NUMBER_RE.match(value)
+    return str(int(match.group(1))) if match else value
+
+
+def is_admin_role(role_id):
+    """True for the superadmin (1) and admin (2) roles in any spelling: 2, '2', 'R002', 'r2', ..."""
+    return role_id is not None and role_alias_key(role_id) in ('1', '2')
+
+
+def is_superadmin_role(role_id):
+    """True for the superadmin role (1) in any spelling: 1, '1', 'R001', 'r1', ..."""
+    return role_id is not None and role_alias_key(role_id) == '1'
+
+
+def get_role_alias_table():
+    """
+    Return {'names': {role_id: name}, 'aliases': {alias_key: role_id}} built from frontend_role (cached).
+    Exact role_ids are preferred over aliases, and 'R###' ids win alias collisions (e.g. '1' vs 'R001').
+    """
+    table = cache.get(ROLE_ALIAS_CACHE_KEY)
+    if table is not None:
+        return table
+
+    from .models import Role
+    names = dict(Role.objects.values_list('role_id', 'name'))
+    aliases = {}
+    # Sorted so 'R001' is registered before '1' and keeps the alias on collision
+    for role_id in sorted(names, key=lambda rid: (not rid.upper().startswith('R'), rid)):
+        aliases.setdefault(role_alias_key(role_id), role_id)
+
+    table = {'names': names, 'aliases': aliases}
+    cache.set(ROLE_ALIAS_CACHE_KEY, table, _cache_ttl())
+    return table
+
+
+def resolve_role_id(value):
+    """Return the canonical frontend_role.role_id for '1'/'R001'/'r001'/'R1'-style references, or None"""
+    if value is None or str(value).strip() == '':
+        return None
+    table = get_role_alias_table()
+    value = str(value).strip()
+    if value in table['names']:
+        return value
+    return table['aliases'].get(role_alias_key(value))
+
+
+def get_role_name(role_id):
+    """Return the name of a canonical role_id from the alias table (no query when warm)"""
+    return get_role_alias_table()['names'].get(role_id)
+
+
+def invalidate_role_aliases():
+    """Forget the alias table (call when roles are created, renamed or deleted)"""
+    cache.delete(ROLE_ALIAS_CACHE_KEY)
+
+
+def get_user_role_ids(user):
+    """
+    Return the role_ids for a user (cached).
+
+    Priority matches User.get_roles():
+    - Active UserRole assignments, if any (newest role first)
+    - Otherwise the role frontend_user.role_id resolves to (see resolve_role_id)
+    """
+    return get_role_ids_for_users([user]).get(user.id, [])
+
+
+def get_role_ids_for_users(users):
+    """
+    Return {user_id: [role_id, ...]} for many users with at most one query.
+
+    `users` may be FrontendUser instances or dicts with 'id' and 'role_id'.
+    Cached entries are reused; the rest are loaded with a single UserRole query and
+    the role_id fallback is resolved from the alias table.
+    """
+    role_refs = {}
+    for user in users:
+        if isinstance(user, dict):
+            user_id, role_id = user.get('id'), user.get('role_id')
+        else:
+            user_id, role_id = user.id, user.role_id
+        if user_id is not None:
+            role_refs[user_id] = role_id
+
+    keys = {USER_ROLES_CACHE_KEY.format(user_id=user_id): user_id for user_id in role_refs}
+    result = {keys[key]: role_ids for key, role_ids in cache.get_many(list(keys)).items()}
+    missing = [user_id for user_id in role_refs if user_id not in result]
+    if not missing:
+        return result
+
+    from .models import UserRole
+    assigned = {}
+    rows = (
+        UserRole.objects.filter(user_id__in=missing, is_active=True)
+        .order_by('-role__created_at')
+        .values_list('user_id', 'role_id')
+    )
+    for user_id, role_id in rows:
+        role_ids = assigned.setdefault(user_id, [])
+        if role_id not in role_ids:
+            role_ids.append(role_id)
+
+    fresh = {}
+    for user_id in missing:
+        role_ids = assigned.get(user_id)
+        if not role_ids:
+            canonical_role_id = resolve_role_id(role_refs[user_id])
+            role_ids = [canonical_role_id] if canonical_role_id else []
+        fresh[user_id] = role_ids
+
+    cache.set_many(
+        {USER_ROLES_CACHE_KEY.format(user_id=user_id): role_ids for user_id, role_ids in fresh.items()},
+        _cache_ttl()
+    )
+    result.update(fresh)
+    return result
+
+
+def get_role_names_for_users(users):
+    """
+    Return {user_id: role_name} for many users (name of the first role, or None).
+    Intended to be passed to UserSerializer / UserLoginSerializer as context['role_names'].
+    """
+    names = get_role_alias_table()['names']
+    return {
+        user_id: (names.get(role_ids[0]) if role_ids else None)
+        for user_id, role_ids in get_role_ids_for_users(users).items()
+    }
+
+
+def invalidate_user_roles(user_id):
+    """Forget the cached role_ids for a user (call when UserRole rows or frontend_user.role_id change)"""
+    cache.delete(USER_ROLES_CACHE_KEY.format(user_id=user_id))
@@ -0,0 +1,172 @@
+"""
+In-process read-through cache of promo codes for checkout-time validation
+
+validate_and_quote(code, amount) answers fare-quote validation from memory: entries are keyed by
+the normalised (upper-case) code and hold an unsaved PromoCode instance (discount fields, date
+window, usage), so quotes use exactly PromoCode.calculate_discount()/apply_discount(). Unknown
+codes are cached as misses too, so a mistyped code doesn't hit the database on every quote.
+
+Entries live for PROMO_CODE_CACHE_TTL seconds. Writes call invalidate_promo_code() /
+invalidate_all_promo_codes(); invalidation bumps the 'promo_code_cache' generation (generations.py)
+so other processes drop their copies within CACHE_GENERATION_CHECK_INTERVAL seconds. warm_promo_code_cache() preloads
+the currently valid codes (called from wsgi.py at startup).
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils import timezone
+
+from .generations import bump_generation, current_generation
+from .models import PromoCode
+from .promo_redemption import (
+    REASON_EXHAUSTED, REASON_EXPIRED, REASON_INACTIVE, REASON_NOT_FOUND, REASON_NOT_STARTED
+)
+
+logger = logging.getLogger(__name__)
+
+GENERATION_NAME = 'promo_code_cache'
+
+CACHED_FIELDS = (
+    'id', 'code', 'discount_type', 'discount_value', 'start_date', 'expire_date',
+    'max_usage', 'current_usage', 'status', 'usage_slots',
+)
+
+_MISSING = object()
+
+_entries = OrderedDict()  # normalised code -> (expires_at, PromoCode or None)
+_entries_lock = threading.Lock()
+_generation = [None]
+
+
+def _ttl():
+    return getattr(settings, 'PROMO_CODE_CACHE_TTL', 60)
+
+
+def _max_entries():
+    return getattr(settings, 'PROMO_CODE_CACHE_MAX_ENTRIES', 50000)
+
+
+def normalize_code(code):
+    return str(code or '').strip().upper()
+
+
+def _check_generation():
+    """Drop every local entry if another process invalidated since we last looked"""
+    generation = current_generation(GENERATION_NAME)
+    if generation != _generation[0]:
+        with _entries_lock:
+            _entries.clear()
+            _generation[0] = generation
+
+
+def _store(key, promo_code):
+    with _entries_lock:
+        _entries[key] = (time.monotonic() + _ttl(), promo_code)
+        _entries.move_to_end(key)
+        while len(_entries) > _max_entries():
+            _entries.popitem(last=False)
+
+
+def _load(key):
+    row = PromoCode.objects.filter(code__iexact=key).values(*CACHED_FIELDS).first()
+    return PromoCode(**row) if row else None
+
+
+def get_promo_code(code):
+    """Return the (possibly slightly stale) PromoCode for a code, or None if it doesn't exist"""
+    key = normalize_code(code)
+    _check_generation()
+    entry = _entries.get(key, _MISSING)
+    if entry is not _MISSING and entry[0] > time.monotonic():
+        return entry[1]
+    promo_code = _load(key)
+    _store(key, promo_code)
+    return promo_code
+
+
+def validate_and_quote(code, amount=None):
+    """
+    Validate a promo code for checkout and quote the discount (PromoCode.calculate_discount semantics).
+    Does not consume a use - redemption goes through promo_redemption.redeem_promo_code().
+
+    Returns {'valid', 'reason', 'code', 'discount_type', 'discount_value', 'remaining_usage',
+             'amount', 'discount', 'final_amount'}
+    """
+    promo_code = get_promo_code(code)
+    if promo_code is None:
+        return {'valid': False, 'reason': REASON_NOT_FOUND, 'code': normalize_code(code)}
+
+    now = timezone.now()
+    reason = None
+    if promo_code.status != PromoCode.STATUS_ACTIVE:
+        reason = REASON_INACTIVE
+    elif now < promo_code.start_date:
+        reason = REASON_NOT_STARTED
+    elif now > promo_code.expire_date:
+        reason = REASON_EXPIRED
+    elif promo_code.current_usage >= promo_code.max_usage:
+        reason = REASON_EXHAUSTED
+
+    quote = {
+        'valid': reason is None,
+        'reason': reason,
+        'code': promo_code.code,
+        'discount_type': promo_code.discount_type,
+        'discount_value': promo_code.discount_value,
+        'remaining_usage': promo_code.remaining_usage,
+        'amount': amount,
+        'discount': None,
+        'final_amount': None,
+    }
+    if reason is None and amount is not None:
+        quote['discount'] = promo_code.calculate_discount(amount)
+        quote['final_amount'] = promo_code.apply_discount(amount)
+    return quote
+
+
+def record_usage(code, current_usage):
+    """Keep the cached usage in step after a redemption in this process (no invalidation needed)"""
+    key = normalize_code(code)
+    entry = _entries.get(key)
+    if entry is not None and entry[1] is not None:
+        entry[1].current_usage = current_usage
+
+
+def invalidate_promo_code(code):
+    """Forget one code after a write (other processes drop their whole local cache)"""
+    generation = bump_generation(GENERATION_NAME)
+    with _entries_lock:
+        if _generation[0] != generation - 1:
+            # We had missed an earlier invalidation as well
+            _entries.clear()
+        _entries.pop(normalize_code(code), None)
+        _generation[0] = generation
+
+
+def invalidate_all_promo_codes():
+    """Forget every cached code (bulk updates, bulk creation)"""
+    generation = bump_generation(GENERATION_NAME)
+    with _entries_lock:
+        _entries.clear()
+        _generation[0] = generation
+
+
+def warm_promo_code_cache():
+    """Preload the codes that are active and not yet expired (most recent first, up to the cache size)"""
+    started = time.monotonic()
+    rows = (
+        PromoCode.objects
+        .filter(status=PromoCode.STATUS_ACTIVE, expire_date__gte=timezone.now())
+        .order_by('-created_at')
+        .values(*CACHED_FIELDS)[:_max_entries()]
+    )
+    _check_generation()
+    count = 0
+    for row in rows.iterator(chunk_size=2000):
+        _store(normalize_code(row['code']), PromoCode(**row))
+        count += 1
+    logger.info(f"Promo code cache warmed with {count} codes in {time.monotonic() - started:.2f}s")
+    return count
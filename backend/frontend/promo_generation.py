@@ -0,0 +1,107 @@
+"""
+Bulk promo code generation
+
+generate_promo_codes() draws random candidates from a template (prefix + `length` characters of
+`alphabet`), drops the ones that already exist with ONE set-based lookup per round against the
+UPPER(code) index, and inserts the rest in chunks with INSERT ... ON CONFLICT (code) DO NOTHING
+RETURNING. Candidates lost to a concurrent insert are simply redrawn in the next round.
+"""
+import random
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import PromoCode
+
+
+# Unambiguous characters (no 0/O, 1/I/L) so codes can be typed from print
+DEFAULT_ALPHABET = 'ABCDEFGHJKMNPQRSTUVWXYZ23456789'
+INSERT_CHUNK_SIZE = 5000
+# Rounds of drawing replacements for codes that turned out to exist already
+MAX_ROUNDS = 10
+
+INSERT_COLUMNS = (
+    'code', 'discount_type', 'discount_value', 'start_date', 'expire_date',
+    'max_usage', 'current_usage', 'usage_slots', 'status', 'effective_status', 'created_at', 'updated_at',
+)
+
+
+class PromoCodeSpaceExhausted(Exception):
+    """Not enough unused codes left for the template (use a longer code or larger alphabet)"""
+
+
+def code_space_size(alphabet, length):
+    return len(alphabet) ** length
+
+
+def _existing_codes(candidates):
+    """Return the subset of candidates (upper-case) that already exist, case-insensitively"""
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT UPPER(code) FROM {PromoCode._meta.db_table}
+            WHERE UPPER(code) = ANY(%s)
+        """, [candidates])
+        return {row[0] for row in cursor.fetchall()}
+
+
+def _insert_chunk(codes, fields, now):
+    """Insert codes sharing the same discount fields; returns [(id, code)] for the rows inserted"""
+    effective_status = PromoCode(current_usage=0, **fields).compute_effective_status(now)
+    row_values = [
+        fields['discount_type'], fields['discount_value'], fields['start_date'], fields['expire_date'],
+        fields['max_usage'], 0, 0, fields['status'], effective_status, now, now,
+    ]
+    placeholders = ', '.join(['(' + ', '.join(['%s'] * len(INSERT_COLUMNS)) + ')'] * len(codes))
+    params = []
+    for code in codes:
+        params.append(code)
+        params.extend(row_values)
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO {PromoCode._meta.db_table} ({', '.join(INSERT_COLUMNS)})
+            VALUES {placeholders}
+            ON CONFLICT (code) DO NOTHING
+            RETURNING id, code
+        """, params)
+        return cursor.fetchall()
+
+
+def generate_promo_codes(prefix, length, count, fields, alphabet=DEFAULT_ALPHABET, chunk_size=INSERT_CHUNK_SIZE):
+    """
+    Create `count` new unique promo codes in one transaction and return [(id, code)] in insert order.
+
+    fields: discount_type, discount_value, start_date, expire_date, max_usage, status
+    Raises PromoCodeSpaceExhausted (nothing is saved) if the template can't yield enough unused codes.
+    """
+    prefix = prefix.upper()
+    alphabet = ''.join(dict.fromkeys(alphabet.upper()))
+    rng = random.SystemRandom()
+    now = timezone.now()
+    created = []
+
+    with transaction.atomic():
+        for _ in range(MAX_ROUNDS):
+            missing = count - len(created)
+            if missing <= 0:
+                break
+
+            candidates = set()
+            # Bounded draw so an almost-full code space can't loop forever
+            for _ in range(missing * 4):
+                candidates.add(prefix + ''.join(rng.choices(alphabet, k=length)))
+                if len(candidates) == missing:
+                    break
+            candidates = list(candidates)
+
+            existing = _existing_codes(candidates)
+            candidates = [code for code in candidates if code not in existing]
+
+            for start in range(0, len(candidates), chunk_size):
+                created.extend(_insert_chunk(candidates[start:start + chunk_size], fields, now))
+
+        if len(created) < count:
+            raise PromoCodeSpaceExhausted(
+                f'Could only find {len(created)} unused codes out of {count} requested for prefix "{prefix}" '
+                f'and length {length}. Use a longer code or a larger alphabet.'
+            )
+    return created
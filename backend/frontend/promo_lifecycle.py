@@ -0,0 +1,75 @@
+"""
+Promo code lifecycle sweeper
+
+A code's `status` is what an admin set; whether it can actually be used also depends on the date
+window and usage limit. sweep_promo_codes() (run periodically: manage.py sweep_promo_codes) flips
+active codes that have expired or reached max_usage to 'deactivate' and keeps `effective_status`
+(active / scheduled / expired / exhausted / deactivate) up to date, all in one bulk UPDATE driven
+by the (status, start_date, expire_date) index, so list endpoints can filter in SQL.
+
+PromoCode.save() and redemptions keep effective_status current between sweeps; the sweeper only
+has to catch the transitions caused by the clock.
+"""
+from django.db import connection, transaction
+
+from .models import PromoCode
+from .promo_cache import invalidate_all_promo_codes
+from .promo_usage import reconcile_promo_usage
+
+
+# Same rules as PromoCode.compute_effective_status()
+EFFECTIVE_STATUS_SQL = f"""
+    CASE
+        WHEN expire_date < now() THEN '{PromoCode.EFFECTIVE_STATUS_EXPIRED}'
+        WHEN current_usage >= max_usage THEN '{PromoCode.EFFECTIVE_STATUS_EXHAUSTED}'
+        WHEN status <> '{PromoCode.STATUS_ACTIVE}' THEN '{PromoCode.EFFECTIVE_STATUS_DEACTIVATE}'
+        WHEN start_date > now() THEN '{PromoCode.EFFECTIVE_STATUS_SCHEDULED}'
+        ELSE '{PromoCode.EFFECTIVE_STATUS_ACTIVE}'
+    END
+"""
+
+
+def sweep_promo_codes():
+    """
+    Deactivate expired/exhausted codes and refresh effective_status.
+    Returns {'deactivated': codes flipped to 'deactivate', 'updated': rows touched in total}.
+    """
+    # Striped codes only know their usage once their slots are folded in
+    reconcile_promo_usage()
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"""
+            WITH due AS (
+                SELECT id, status AS previous_status FROM {PromoCode._meta.db_table}
+                WHERE (
+                    status = %(active)s
+                    AND (expire_date < now() OR current_usage >= max_usage
+                         OR (effective_status = %(scheduled)s AND start_date <= now()))
+                ) OR (
+                    -- Anything else past its expiry and not labelled expired yet (deactivated or
+                    -- exhausted codes the sweeper flipped earlier)
+                    effective_status <> %(expired)s AND expire_date < now()
+                )
+                FOR UPDATE
+            )
+            UPDATE {PromoCode._meta.db_table} AS promo
+            SET status = CASE
+                    WHEN promo.status = %(active)s AND (expire_date < now() OR current_usage >= max_usage)
+                    THEN %(deactivate)s ELSE promo.status
+                END,
+                effective_status = {EFFECTIVE_STATUS_SQL},
+                updated_at = now()
+            FROM due
+            WHERE promo.id = due.id
+            RETURNING due.previous_status <> promo.status
+        """, {
+            'active': PromoCode.STATUS_ACTIVE,
+            'deactivate': PromoCode.STATUS_DEACTIVATE,
+            'scheduled': PromoCode.EFFECTIVE_STATUS_SCHEDULED,
+            'expired': PromoCode.EFFECTIVE_STATUS_EXPIRED,
+        })
+        rows = cursor.fetchall()
+
+    if rows:
+        invalidate_all_promo_codes()
+    return {'deactivated': sum(1 for (flipped,) in rows if flipped), 'updated': len(rows)}
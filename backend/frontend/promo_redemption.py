@@ -0,0 +1,169 @@
+"""
+Promo code redemption
+
+redeem_promo_code() validates and consumes one use of a code in a single conditional
+UPDATE ... RETURNING: the status, date window and usage limit are checked by the same statement
+that increments current_usage, so concurrent redemptions of a hot code can never oversell it
+(the row lock serialises the increments; the losers simply match no row). Only a failed
+redemption costs a second query, to tell the caller why.
+
+Codes with usage_slots > 0 are counted on striped slot rows instead (see promo_usage.py): the
+conditional UPDATE then claims a random slot that still has capacity, skipping slots that other
+redemptions hold locked.
+"""
+from decimal import Decimal
+
+from django.db import connection
+
+from .models import PromoCode, PromoCodeUsageSlot
+
+
+REASON_NOT_FOUND = 'not_found'
+REASON_INACTIVE = 'inactive'
+REASON_NOT_STARTED = 'not_started'
+REASON_EXPIRED = 'expired'
+REASON_EXHAUSTED = 'usage_limit_reached'
+
+RETURNING_COLUMNS = (
+    'id', 'code', 'discount_type', 'discount_value', 'start_date', 'expire_date',
+    'max_usage', 'current_usage', 'status', 'usage_slots',
+)
+
+
+class PromoCodeRedemptionError(Exception):
+    """The code could not be redeemed; `reason` is one of the REASON_* constants"""
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason
+
+
+def _lookup(code):
+    """Current state of a code: (status, not_started, expired, exhausted, striped), or None"""
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT p.status, p.start_date > now(), p.expire_date < now(),
+                   p.current_usage + COALESCE(
+                       (SELECT SUM(s.used) FROM {PromoCodeUsageSlot._meta.db_table} s
+                        WHERE s.promo_code_id = p.id), 0
+                   ) >= p.max_usage,
+                   p.usage_slots > 0
+            FROM {PromoCode._meta.db_table} p
+            WHERE UPPER(p.code) = UPPER(%s)
+        """, [code])
+        return cursor.fetchone()
+
+
+def _failure_reason(row):
+    """Explain why the conditional UPDATE matched nothing"""
+    if row is None:
+        return PromoCodeRedemptionError(REASON_NOT_FOUND, 'Promo code not found.')
+    status, not_started, expired, exhausted, _ = row
+    if status != PromoCode.STATUS_ACTIVE:
+        return PromoCodeRedemptionError(REASON_INACTIVE, 'Promo code is not active.')
+    if not_started:
+        return PromoCodeRedemptionError(REASON_NOT_STARTED, 'Promo code is not valid yet.')
+    if expired:
+        return PromoCodeRedemptionError(REASON_EXPIRED, 'Promo code has expired.')
+    if exhausted:
+        return PromoCodeRedemptionError(REASON_EXHAUSTED, 'Promo code usage limit has been reached.')
+    # Valid again by the time we looked (e.g. max_usage was raised meanwhile, or a striped
+    # code's slots are full until the next reconciliation)
+    return PromoCodeRedemptionError(REASON_EXHAUSTED, 'Promo code could not be redeemed. Please try again.')
+
+
+def _redeem_row(code):
+    """Increment current_usage of a single-row code; returns its RETURNING_COLUMNS or None"""
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE {PromoCode._meta.db_table}
+            SET current_usage = current_usage + 1,
+                effective_status = CASE WHEN current_usage + 1 >= max_usage THEN %s ELSE effective_status END,
+                updated_at = now()
+            WHERE UPPER(code) = UPPER(%s)
+              AND status = %s
+              AND now() BETWEEN start_date AND expire_date
+              AND current_usage < max_usage
+              AND usage_slots = 0
+            RETURNING {', '.join(RETURNING_COLUMNS)}
+        """, [PromoCode.EFFECTIVE_STATUS_EXHAUSTED, code, PromoCode.STATUS_ACTIVE])
+        return cursor.fetchone()
+
+
+def _redeem_slot(code, skip_locked=True):
+    """
+    Increment a random slot of a striped code that still has capacity; returns RETURNING_COLUMNS
+    (current_usage includes the slot counts as of this statement) or None
+
+    With skip_locked=False the statement waits for a locked slot instead. A slot that is full
+    once its lock is granted stays locked while the next one is tried, so waiting redemptions
+    take slots in slot order (the order reconciliation locks them in) to avoid deadlocks.
+    """
+    slot_table = PromoCodeUsageSlot._meta.db_table
+    promo_table = PromoCode._meta.db_table
+    columns = ', '.join(
+        'p.current_usage + slot_totals.used + 1' if column == 'current_usage' else f'p.{column}'
+        for column in RETURNING_COLUMNS
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            WITH picked AS (
+                SELECT s.id FROM {slot_table} s
+                JOIN {promo_table} p ON p.id = s.promo_code_id
+                WHERE UPPER(p.code) = UPPER(%s)
+                  AND p.status = %s
+                  AND now() BETWEEN p.start_date AND p.expire_date
+                  AND p.usage_slots > 0
+                  AND s.used < s.capacity
+                ORDER BY {'random()' if skip_locked else 's.slot'}
+                LIMIT 1
+                FOR UPDATE OF s{' SKIP LOCKED' if skip_locked else ''}
+            )
+            UPDATE {slot_table} AS claimed
+            SET used = claimed.used + 1
+            FROM picked, {promo_table} p,
+                 LATERAL (SELECT SUM(used) AS used FROM {slot_table} WHERE promo_code_id = p.id) slot_totals
+            WHERE claimed.id = picked.id AND p.id = claimed.promo_code_id
+            RETURNING {columns}
+        """, [code, PromoCode.STATUS_ACTIVE])
+        return cursor.fetchone()
+
+
+def _is_striped(code):
+    """Cheap guess of the counting mode from the checkout cache (verified on failure)"""
+    from .promo_cache import get_promo_code
+    promo_code = get_promo_code(code)
+    return promo_code is not None and promo_code.usage_slots > 0
+
+
+def redeem_promo_code(code, amount=None):
+    """
+    Consume one use of `code` (case-insensitive).
+
+    Returns {'promo_code': PromoCode (post-increment state), 'amount', 'discount', 'final_amount'}
+    (the amounts are None when no amount is given). For striped codes current_usage is
+    approximate (slots updated concurrently may not be counted yet).
+    Raises PromoCodeRedemptionError.
+    """
+    striped = _is_striped(code)
+    row = _redeem_slot(code) if striped else _redeem_row(code)
+
+    if row is None:
+        state = _lookup(code)
+        if state is not None and state[4] != striped:
+            # The counting mode changed since it was cached
+            striped = state[4]
+            row = _redeem_slot(code) if striped else _redeem_row(code)
+        elif striped and state is not None and state[0] == PromoCode.STATUS_ACTIVE and not any(state[1:4]):
+            # Every slot with capacity left was locked by another redemption; wait for one
+            row = _redeem_slot(code, skip_locked=False)
+        if row is None:
+            raise _failure_reason(state)
+
+    promo_code = PromoCode(**dict(zip(RETURNING_COLUMNS, row)))
+    result = {'promo_code': promo_code, 'amount': None, 'discount': None, 'final_amount': None}
+    if amount is not None:
+        amount = Decimal(amount)
+        result['amount'] = amount
+        result['discount'] = promo_code.calculate_discount(amount)
+        result['final_amount'] = promo_code.apply_discount(amount)
+    return result
@@ -0,0 +1,121 @@
+"""
+Striped usage counters for hot promo codes
+
+By default a redemption increments PromoCode.current_usage, so every redemption of one viral code
+queues on the same row lock. With usage_slots = N the code's remaining uses are split over N
+PromoCodeUsageSlot rows instead: a redemption increments a random slot that still has room (see
+promo_redemption.redeem_promo_code), so up to N redemptions can commit in parallel.
+
+Admission stays conservative: a slot only hands out `capacity` uses, and reconcile_promo_usage()
+sets the capacities so that they add up to max_usage - current_usage. It runs periodically
+(manage.py reconcile_promo_usage --loop), folds the slot counts into current_usage and spreads the
+remaining uses evenly again, so the code can never be redeemed more than max_usage times.
+"""
+from django.db import connection, transaction
+
+from .models import PromoCode, PromoCodeUsageSlot
+from .promo_cache import invalidate_promo_code
+
+
+MAX_USAGE_SLOTS = 64
+
+
+def _slot_capacities(remaining, slots):
+    """Split `remaining` uses over `slots` slots as evenly as possible"""
+    base, extra = divmod(max(0, remaining), slots)
+    return [base + (1 if slot < extra else 0) for slot in range(slots)]
+
+
+def _reconcile_locked(cursor, promo_code_id):
+    """Fold and rebalance one code; the caller holds the transaction. Returns the uses folded."""
+    promo_table = PromoCode._meta.db_table
+    slot_table = PromoCodeUsageSlot._meta.db_table
+
+    cursor.execute(f"""
+        SELECT max_usage, current_usage, usage_slots FROM {promo_table}
+        WHERE id = %s
+        FOR UPDATE
+    """, [promo_code_id])
+    row = cursor.fetchone()
+    if row is None:
+        return 0
+    max_usage, current_usage, usage_slots = row
+
+    # Locking every slot waits for in-flight redemptions and holds new ones off until we commit.
+    # Slots are locked in slot order, like blocking redemptions do, so the two can't deadlock.
+    cursor.execute(f"""
+        SELECT COALESCE(SUM(used), 0) FROM (
+            SELECT used FROM {slot_table} WHERE promo_code_id = %s ORDER BY slot FOR UPDATE
+        ) AS locked_slots
+    """, [promo_code_id])
+    folded = cursor.fetchone()[0]
+    current_usage += folded
+
+    cursor.execute(f"""
+        UPDATE {promo_table}
+        SET current_usage = %s,
+            effective_status = CASE WHEN %s >= max_usage THEN %s ELSE effective_status END
+        WHERE id = %s
+    """, [current_usage, current_usage, PromoCode.EFFECTIVE_STATUS_EXHAUSTED, promo_code_id])
+    cursor.execute(f"""
+        DELETE FROM {slot_table} WHERE promo_code_id = %s AND slot >= %s
+    """, [promo_code_id, usage_slots])
+
+    if usage_slots:
+        capacities = _slot_capacities(max_usage - current_usage, usage_slots)
+        placeholders = ', '.join(['(%s, %s, %s, 0)'] * usage_slots)
+        params = []
+        for slot, capacity in enumerate(capacities):
+            params.extend([promo_code_id, slot, capacity])
+        cursor.execute(f"""
+            INSERT INTO {slot_table} (promo_code_id, slot, capacity, used)
+            VALUES {placeholders}
+            ON CONFLICT (promo_code_id, slot) DO UPDATE SET capacity = EXCLUDED.capacity, used = 0
+        """, params)
+    return folded
+
+
+def reconcile_promo_usage(promo_code_id=None):
+    """
+    Fold slot counts into current_usage and redistribute the remaining uses over the slots.
+
+    Reconciles one code, or every striped code when promo_code_id is None (one short
+    transaction per code). Returns {'codes': codes reconciled, 'folded': uses folded}.
+    """
+    if promo_code_id is None:
+        promo_code_ids = list(
+            PromoCode.objects.filter(usage_slots__gt=0).values_list('id', flat=True)
+        )
+        # Codes that were switched back to single-row counting with uses still in their slots
+        promo_code_ids += list(
+            PromoCodeUsageSlot.objects.filter(promo_code__usage_slots=0)
+            .values_list('promo_code_id', flat=True).distinct()
+        )
+    else:
+        promo_code_ids = [promo_code_id]
+
+    folded = 0
+    for code_id in promo_code_ids:
+        with transaction.atomic(), connection.cursor() as cursor:
+            folded += _reconcile_locked(cursor, code_id)
+    return {'codes': len(promo_code_ids), 'folded': folded}
+
+
+def set_usage_slots(promo_code_id, slots):
+    """
+    Switch a code to striped counting over `slots` slots (0 = back to counting on the row).
+    The mode change and the reconciliation happen in one transaction, so no use is lost or
+    double-counted while redemptions are running.
+    """
+    if not 0 <= slots <= MAX_USAGE_SLOTS:
+        raise ValueError(f'usage_slots must be between 0 and {MAX_USAGE_SLOTS}')
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE {PromoCode._meta.db_table} SET usage_slots = %s, updated_at = now()
+            WHERE id = %s
+        """, [slots, promo_code_id])
+        if cursor.rowcount == 0:
+            raise PromoCode.DoesNotExist(f'Promo code {promo_code_id} does not exist')
+        _reconcile_locked(cursor, promo_code_id)
+
+    invalidate_promo_code(PromoCode.objects.values_list('code', flat=True).get(id=promo_code_id))
@@ -0,0 +1,50 @@
+"""
+Role id allocation (R001, R002, ...)
+
+New role ids come from the frontend_role_id_seq Postgres sequence (see migration 0048), so
+allocating one is a single nextval() that never hands the same number to two concurrent
+requests. Roles created with an explicit R### id advance the sequence past that number, so
+the allocator never collides with them. reserve_role_id() runs in its own short transaction under
+an advisory lock (concurrent reservations can't move the sequence backwards); call it before
+opening the transaction that creates the role, so nothing waits on that transaction.
+"""
+import re
+
+from django.db import connection, transaction
+
+
+ROLE_ID_SEQUENCE = 'frontend_role_id_seq'
+
+# pg_advisory_xact_lock() key serializing reserve_role_id()
+ROLE_ID_LOCK_KEY = 480048
+
+ROLE_ID_RE = re.compile(r'^[Rr]0*(\d+)$')
+
+
+def format_role_id(number):
+    return f"R{number:03d}"
+
+
+def allocate_role_id():
+    """Return the next free role id (e.g. 'R007')"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT nextval(%s)", [ROLE_ID_SEQUENCE])
+        return format_role_id(cursor.fetchone()[0])
+
+
+def reserve_role_id(role_id):
+    """
+    Make sure allocate_role_id() never returns an explicitly chosen id such as 'R015'
+    (moves the sequence forward if needed; ids not in R### form are ignored).
+    Call outside transaction.atomic(): inside one the lock would be held until the caller commits.
+    """
+    match = ROLE_ID_RE.match(str(role_id or ''))
+    if not match:
+        return
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", [ROLE_ID_LOCK_KEY])
+        cursor.execute(f"""
+            SELECT setval(%s, %s)
+            FROM {ROLE_ID_SEQUENCE}
+            WHERE %s > CASE WHEN is_called THEN last_value ELSE last_value - 1 END
+        """, [ROLE_ID_SEQUENCE, int(match.group(1)), int(match.group(1))])
@@ -0,0 +1,89 @@
+"""
+Row counting service for large tables (e.g. rides_user)
+
+- Estimated counts come from pg_class.reltuples (a catalog lookup, no table scan).
+- Exact counts are cached with an `as_of` timestamp. A read that finds the value older than
+  ROW_COUNT_REFRESH_INTERVAL seconds starts a background recount and is served the cached value
+  meanwhile, so tables nobody asks about are never scanned.
+"""
+import logging
+from threading import Thread
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+COUNT_CACHE_KEY = 'row_count:{table}'
+REFRESH_LOCK_KEY = 'row_count_refreshing:{table}'
+
+
+def _refresh_interval():
+    return getattr(settings, 'ROW_COUNT_REFRESH_INTERVAL', 300)
+
+
+def get_estimated_count(table_name):
+    """
+    Return the planner's row estimate for a table (pg_class.reltuples), or None when there is no
+    usable estimate (callers fall back to the exact count).
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT reltuples::bigint
+            FROM pg_class
+            WHERE oid = to_regclass(%s)
+        """, [table_name])
+        row = cursor.fetchone()
+    # reltuples is -1 (PostgreSQL 14+) or 0 (older versions) for tables that were never
+    # vacuumed/analyzed; a table that really is empty costs nothing to count exactly
+    if not row or row[0] is None or row[0] <= 0:
+        return None
+    return int(row[0])
+
+
+def _count_rows(table_name):
+    """Run the exact COUNT(*) and cache it with the time it was taken"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM "{table_name}"')
+        count = cursor.fetchone()[0]
+    entry = {'count': count, 'as_of': timezone.now()}
+    # Keep the value well past the refresh interval so readers always have something to serve
+    cache.set(COUNT_CACHE_KEY.format(table=table_name), entry, _refresh_interval() * 10)
+    return entry
+
+
+def _refresh_in_background(table_name):
+    """Recount in a daemon thread; only one refresh per table runs at a time"""
+    lock_key = REFRESH_LOCK_KEY.format(table=table_name)
+    if not cache.add(lock_key, True, max(_refresh_interval(), 60)):
+        return
+
+    def refresh():
+        try:
+            _count_rows(table_name)
+        except Exception as e:
+            logger.error(f"Failed to refresh row count for {table_name}: {str(e)}")
+        finally:
+            cache.delete(lock_key)
+            # Thread-local connection: close it so it isn't leaked
+            connection.close()
+
+    Thread(target=refresh, daemon=True).start()
+
+
+def get_exact_count(table_name):
+    """
+    Return {'count': int, 'as_of': datetime} for a table.
+    Served from cache; a stale value triggers a background refresh. Only the very first call
+    (nothing cached yet) counts synchronously.
+    """
+    entry = cache.get(COUNT_CACHE_KEY.format(table=table_name))
+    if entry is None:
+        return _count_rows(table_name)
+
+    age = (timezone.now() - entry['as_of']).total_seconds()
+    if age >= _refresh_interval():
+        _refresh_in_background(table_name)
+    return entry
@@ -0,0 +1,94 @@
+"""
+Schema introspection registry for unmanaged tables (e.g. rides_user)
+
+The column layout of tables we don't own (phone column name, nullability, types) is read from
+information_schema once per process on first use and kept in memory. Refreshing it (see the
+refresh_schema_registry management command) bumps the table's generation in the database (see
+generations.py), so running workers reload it within CACHE_GENERATION_CHECK_INTERVAL seconds.
+"""
+import threading
+
+from django.db import connection
+from django.utils import timezone
+
+from .generations import bump_generation, current_generation
+
+
+RIDES_USER_TABLE = 'rides_user'
+
+# Preferred phone column names, checked before any other *phone*/*mobile* column
+PHONE_COLUMN_CANDIDATES = ('phone_number', 'phone', 'phone_no', 'mobile', 'mobile_number')
+
+GENERATION_NAME = 'schema_registry:{table}'
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _load_table_schema(table_name):
+    """Read a table's columns from information_schema"""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT column_name, data_type, is_nullable
+            FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = %s
+            ORDER BY ordinal_position
+        """, [table_name])
+        rows = cursor.fetchall()
+
+    columns = {
+        column_name: {'data_type': data_type, 'is_nullable': is_nullable == 'YES'}
+        for column_name, data_type, is_nullable in rows
+    }
+
+    phone_column = next((name for name in PHONE_COLUMN_CANDIDATES if name in columns), None)
+    if phone_column is None:
+        phone_column = next(
+            (name for name in columns if 'phone' in name.lower() or 'mobile' in name.lower()),
+            None
+        )
+
+    return {
+        'table': table_name,
+        'columns': columns,
+        'nullable_columns': [name for name, info in columns.items() if info['is_nullable']],
+        'phone_column': phone_column,
+        'loaded_at': timezone.now(),
+    }
+
+
+def get_table_schema(table_name):
+    """
+    Return the cached schema for a table:
+    { 'table', 'columns': {name: {'data_type', 'is_nullable'}}, 'nullable_columns', 'phone_column', 'loaded_at' }
+    """
+    generation = current_generation(GENERATION_NAME.format(table=table_name))
+    entry = _registry.get(table_name)
+    if entry is not None and entry['generation'] == generation:
+        return entry['schema']
+
+    with _registry_lock:
+        entry = _registry.get(table_name)
+        if entry is None or entry['generation'] != generation:
+            entry = {'generation': generation, 'schema': _load_table_schema(table_name)}
+            _registry[table_name] = entry
+    return entry['schema']
+
+
+def refresh_table_schema(table_name):
+    """Reload a table's schema now and make other processes reload it on next access"""
+    generation = bump_generation(GENERATION_NAME.format(table=table_name))
+    with _registry_lock:
+        schema = _load_table_schema(table_name)
+        _registry[table_name] = {'generation': generation, 'schema': schema}
+    return schema
+
+
+def get_rides_user_schema():
+    """Return the cached schema of the unmanaged rides_user table"""
+    return get_table_schema(RIDES_USER_TABLE)
+
+
+def get_rides_user_phone_column():
+    """Return the rides_user column holding the phone number, or None if the table has none"""
+    return get_rides_user_schema()['phone_column']
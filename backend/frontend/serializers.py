@@ -1,5 +1,8 @@
 from rest_framework import serializers
 from .models import UserProfile, PromoCode, AdminProfile, Zone, User as FrontendUser, Role, RolePermission, UserRole
+from .permission_cache import bump_role_version, get_role_names_for_users, is_admin_role, is_superadmin_role
+from .role_ids import allocate_role_id, reserve_role_id
+from .zone_index import parse_wkt_polygon
 from django.contrib.auth import get_user_model
 
 User = get_user_model()  # Django's default User model (auth_user)
@@ -141,10 +144,83 @@ class PromoCodeSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'code', 'discount_type', 'discount_value',
             'start_date', 'expire_date', 'max_usage', 'current_usage',
-            'status', 'is_valid', 'is_expired', 'is_usage_limit_reached',
+            'status', 'effective_status', 'is_valid', 'is_expired', 'is_usage_limit_reached',
             'remaining_usage', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'current_usage', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'current_usage', 'effective_status', 'created_at', 'updated_at']
+    
+    # Model columns each computed field reads (for ?fields= projections that load fewer columns)
+    COMPUTED_FIELD_SOURCES = {
+        'is_valid': ('status', 'start_date', 'expire_date', 'current_usage', 'max_usage'),
+        'is_expired': ('expire_date',),
+        'is_usage_limit_reached': ('current_usage', 'max_usage'),
+        'remaining_usage': ('current_usage', 'max_usage'),
+    }
+    
+    def __init__(self, *args, **kwargs):
+        # Optional projection, e.g. PromoCodeSerializer(promo_codes, many=True, fields=['id', 'code'])
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        self.include_display_number = fields is None or 'display_number' in fields
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+    
+    @classmethod
+    def model_columns_for(cls, fields):
+        """Model fields to load so that the given serializer fields can be rendered"""
+        columns = {'id'}
+        for name in fields:
+            columns.update(cls.COMPUTED_FIELD_SOURCES.get(name, (name,)))
+        columns.discard('display_number')
+        return columns
+    
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Only present when the queryset was annotated with PromoCode.objects.with_display_number()
+        display_number = getattr(instance, 'display_number', None)
+        if display_number is not None and self.include_display_number:
+            data['display_number'] = display_number
+        return data
+
+
+def _validate_promo_discount_value(value):
+    if value <= 0:
+        raise serializers.ValidationError("Discount value must be greater than 0.")
+    return value
+
+
+def _validate_promo_discount_and_dates(data):
+    """Discount value against discount_type, and expire_date after start_date (promo create/generate)"""
+    discount_type = data.get('discount_type')
+    discount_value = data.get('discount_value')
+    
+    # Only validate discount_value if both fields are present
+    if discount_type and discount_value is not None:
+        # Validate discount value based on type
+        if discount_type == PromoCode.DISCOUNT_TYPE_PERCENTAGE:
+            if discount_value > 100:
+                raise serializers.ValidationError({
+                    'discount_value': 'Percentage discount cannot exceed 100%.'
+                })
+            if discount_value < 0:
+                raise serializers.ValidationError({
+                    'discount_value': 'Percentage discount cannot be negative.'
+                })
+        elif discount_type == PromoCode.DISCOUNT_TYPE_FIXED:
+            if discount_value < 0:
+                raise serializers.ValidationError({
+                    'discount_value': 'Fixed discount amount cannot be negative.'
+                })
+    
+    # Validate that expire_date is after start_date (only if both are present)
+    if 'expire_date' in data and 'start_date' in data:
+        if data['expire_date'] <= data['start_date']:
+            raise serializers.ValidationError({
+                'expire_date': 'Expire date must be after start date.'
+            })
+    
+    return data
 
 
 class PromoCodeCreateSerializer(serializers.ModelSerializer):
@@ -185,41 +261,74 @@ class PromoCodeCreateSerializer(serializers.ModelSerializer):
     def validate_discount_value(self, value):
         """Validate discount value based on discount type"""
         # This will be checked in validate() method where we have access to discount_type
-        if value <= 0:
-            raise serializers.ValidationError("Discount value must be greater than 0.")
-        return value
+        return _validate_promo_discount_value(value)
     
     def validate(self, data):
         """Validate discount value and dates"""
-        discount_type = data.get('discount_type')
-        discount_value = data.get('discount_value')
-        
-        # Only validate discount_value if both fields are present
-        if discount_type and discount_value is not None:
-            # Validate discount value based on type
-            if discount_type == PromoCode.DISCOUNT_TYPE_PERCENTAGE:
-                if discount_value > 100:
-                    raise serializers.ValidationError({
-                        'discount_value': 'Percentage discount cannot exceed 100%.'
-                    })
-                if discount_value < 0:
-                    raise serializers.ValidationError({
-                        'discount_value': 'Percentage discount cannot be negative.'
-                    })
-            elif discount_type == PromoCode.DISCOUNT_TYPE_FIXED:
-                if discount_value < 0:
-                    raise serializers.ValidationError({
-                        'discount_value': 'Fixed discount amount cannot be negative.'
-                    })
+        return _validate_promo_discount_and_dates(data)
+
+
+class PromoCodeGenerateSerializer(serializers.Serializer):
+    """
+    Template for bulk promo code generation (POST /api/auth/promo-codes/generate/)
+    Codes are `prefix` + `length` random characters from `alphabet`, all sharing the discount fields.
+    """
+    MAX_COUNT = 100000
+    
+    prefix = serializers.CharField(required=False, allow_blank=True, default='', max_length=20)
+    length = serializers.IntegerField(required=False, default=8, min_value=4, max_value=30)
+    alphabet = serializers.CharField(required=False, min_length=2, max_length=100)
+    count = serializers.IntegerField(min_value=1, max_value=MAX_COUNT)
+    discount_type = serializers.ChoiceField(choices=PromoCode.DISCOUNT_TYPE_CHOICES)
+    discount_value = serializers.DecimalField(max_digits=10, decimal_places=2)
+    start_date = serializers.DateTimeField()
+    expire_date = serializers.DateTimeField()
+    max_usage = serializers.IntegerField(required=False, default=1, min_value=1)
+    status = serializers.ChoiceField(choices=PromoCode.STATUS_CHOICES, required=False, default=PromoCode.STATUS_ACTIVE)
+    
+    def validate_prefix(self, value):
+        if value and not value.isalnum():
+            raise serializers.ValidationError("Prefix may only contain letters and digits.")
+        return value.upper()
+    
+    def validate_alphabet(self, value):
+        alphabet = ''.join(dict.fromkeys(value.upper()))
+        if not alphabet.isalnum() or len(alphabet) < 2:
+            raise serializers.ValidationError("Alphabet must contain at least 2 distinct letters/digits.")
+        return alphabet
+    
+    def validate_discount_value(self, value):
+        return _validate_promo_discount_value(value)
+    
+    def validate(self, data):
+        from .promo_generation import DEFAULT_ALPHABET, code_space_size
+        data = _validate_promo_discount_and_dates(data)
         
-        # Validate that expire_date is after start_date (only if both are present)
-        if 'expire_date' in data and 'start_date' in data:
-            if data['expire_date'] <= data['start_date']:
-                raise serializers.ValidationError({
-                    'expire_date': 'Expire date must be after start date.'
-                })
+        max_code_length = PromoCode._meta.get_field('code').max_length
+        if len(data['prefix']) + data['length'] > max_code_length:
+            raise serializers.ValidationError({
+                'length': f'prefix + length must not exceed {max_code_length} characters.'
+            })
         
-            return data
+        data.setdefault('alphabet', DEFAULT_ALPHABET)
+        # Keep the code space well above the request so random draws rarely collide
+        if code_space_size(data['alphabet'], data['length']) < data['count'] * 10:
+            raise serializers.ValidationError({
+                'length': 'Too few possible codes for this count. Use a longer code or a larger alphabet.'
+            })
+        return data
+
+
+class PromoCodeRedeemSerializer(serializers.Serializer):
+    """Request body for POST /api/promo-codes/redeem/ and /api/promo-codes/validate/"""
+    code = serializers.CharField(max_length=50)
+    amount = serializers.DecimalField(
+        required=False,
+        max_digits=12,
+        decimal_places=2,
+        min_value=0,
+        help_text="Fare amount to compute the discount for (optional)"
+    )
 
 
 class PromoCodeUpdateSerializer(serializers.ModelSerializer):
@@ -316,6 +425,23 @@ class PromoCodeUpdateSerializer(serializers.ModelSerializer):
                 })
         
         return data
+    
+    def update(self, instance, validated_data):
+        """
+        Write only the edited columns. current_usage and usage_slots belong to redemptions
+        (promo_usage.py), so a full-row save could put back counts that moved since the row was read.
+        """
+        from django.db import transaction
+        
+        with transaction.atomic():
+            # Hold off redemptions and compute effective_status from the live usage count
+            live = PromoCode.objects.select_for_update().values('current_usage', 'usage_slots').get(pk=instance.pk)
+            instance.current_usage = live['current_usage']
+            instance.usage_slots = live['usage_slots']
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
 
 
 def validate_wkt_polygon(value):
@@ -338,45 +464,18 @@ def validate_wkt_polygon(value):
     if not value_upper.startswith('POLYGON'):
         raise serializers.ValidationError("Polygon must start with 'POLYGON'.")
     
-    # Extract coordinates using regex
-    # Pattern: POLYGON((lon lat, lon lat, ...))
-    pattern = r'POLYGON\s*\(\s*\(\s*([^)]+)\s*\)\s*\)'
-    match = re.match(pattern, original_value, re.IGNORECASE)
-    
-    if not match:
-        raise serializers.ValidationError("Invalid POLYGON format. Expected: POLYGON((lon1 lat1, lon2 lat2, ...))")
-    
-    coords_str = match.group(1)
-    
-    # Parse coordinates
-    coord_pairs = []
-    for coord_pair in coords_str.split(','):
-        coord_pair = coord_pair.strip()
-        if not coord_pair:
-            continue
-        
-        # Split by whitespace
-        parts = coord_pair.split()
-        if len(parts) != 2:
-            raise serializers.ValidationError(f"Invalid coordinate pair: {coord_pair}. Expected format: 'lon lat'")
-        
-        try:
-            lon = float(parts[0])
-            lat = float(parts[1])
-            
-            # Validate longitude and latitude ranges
-            if not (-180 <= lon <= 180):
-                raise serializers.ValidationError(f"Longitude must be between -180 and 180. Got: {lon}")
-            if not (-90 <= lat <= 90):
-                raise serializers.ValidationError(f"Latitude must be between -90 and 90. Got: {lat}")
-            
-            coord_pairs.append((lon, lat))
-        except ValueError:
-            raise serializers.ValidationError(f"Invalid coordinate values: {coord_pair}. Must be numeric.")
+    # Same parser as the zone index and Zone.set_bounding_box(), so they agree on what is valid
+    try:
+        coord_pairs = parse_wkt_polygon(original_value)
+    except ValueError as e:
+        raise serializers.ValidationError(str(e))
     
-    # Check minimum points (at least 4: 3 unique + closing point)
-    if len(coord_pairs) < 4:
-        raise serializers.ValidationError(f"Polygon must have at least 4 points (3 unique + closing point). Got: {len(coord_pairs)}")
+    # Validate longitude and latitude ranges
+    for lon, lat in coord_pairs:
+        if not (-180 <= lon <= 180):
+            raise serializers.ValidationError(f"Longitude must be between -180 and 180. Got: {lon}")
+        if not (-90 <= lat <= 90):
+            raise serializers.ValidationError(f"Latitude must be between -90 and 90. Got: {lat}")
     
     # Check if polygon is closed (first and last points match)
     first_point = coord_pairs[0]
@@ -394,6 +493,13 @@ def validate_wkt_polygon(value):
     return original_value
 
 
+def _validate_zone_boundary(value):
+    """Validate a zone's WKT polygon (empty clears the boundary)"""
+    if not value:
+        return None
+    return validate_wkt_polygon(value)
+
+
 class ZoneSerializer(serializers.ModelSerializer):
     """Serializer for Zone model"""
     is_active = serializers.ReadOnlyField()
@@ -401,7 +507,7 @@ class ZoneSerializer(serializers.ModelSerializer):
     class Meta:
         model = Zone
         fields = [
-            'zone_id', 'zone_name', 'country', 'state', 'city', 'priority', 'status',
+            'zone_id', 'zone_name', 'country', 'state', 'city', 'priority', 'status', 'boundary',
             'is_active', 'created_at', 'updated_at'
         ]
         read_only_fields = ['zone_id', 'created_at', 'updated_at']
@@ -424,7 +530,7 @@ class ZoneCreateSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Zone
-        fields = ['zone_name', 'country', 'state', 'city', 'priority', 'status']
+        fields = ['zone_name', 'country', 'state', 'city', 'priority', 'status', 'boundary']
         extra_kwargs = {
             'zone_name': {'required': True},
             'country': {'required': False},  # Optional field
@@ -432,6 +538,7 @@ class ZoneCreateSerializer(serializers.ModelSerializer):
             'city': {'required': False},  # Optional field
             'priority': {'required': False},  # Has default in model
             'status': {'required': False},  # Has default in model
+            'boundary': {'required': False},  # WKT POLYGON, needed for /api/zones/locate/
         }
     
     def validate_zone_name(self, value):
@@ -440,6 +547,25 @@ class ZoneCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("A zone with this name already exists.")
         return value
     
+    def validate_boundary(self, value):
+        return _validate_zone_boundary(value)
+    
+
+
+class ZoneImportRowSerializer(ZoneCreateSerializer):
+    """
+    Serializer for validating one row of a bulk zone import (see zones_import)
+    Name uniqueness is checked for the whole batch in one query instead of per row.
+    """
+    
+    class Meta(ZoneCreateSerializer.Meta):
+        extra_kwargs = {
+            **ZoneCreateSerializer.Meta.extra_kwargs,
+            'zone_name': {'required': True, 'validators': []},
+        }
+    
+    def validate_zone_name(self, value):
+        return value.strip()
 
 
 class ZoneUpdateSerializer(serializers.ModelSerializer):
@@ -447,7 +573,7 @@ class ZoneUpdateSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Zone
-        fields = ['zone_name', 'country', 'state', 'city', 'priority', 'status']
+        fields = ['zone_name', 'country', 'state', 'city', 'priority', 'status', 'boundary']
         extra_kwargs = {
             'zone_name': {'required': False},
             'country': {'required': False},
@@ -455,8 +581,12 @@ class ZoneUpdateSerializer(serializers.ModelSerializer):
             'city': {'required': False},
             'priority': {'required': False},
             'status': {'required': False},
+            'boundary': {'required': False},
         }
     
+    def validate_boundary(self, value):
+        return _validate_zone_boundary(value)
+    
     def validate_zone_name(self, value):
         """Validate zone name is unique (excluding current instance)"""
         if value:
@@ -657,26 +787,14 @@ class UserLoginSerializer(serializers.Serializer):
         """Get role name from Role model based on role_id or UserRole assignments"""
         try:
             # Handle both dict and model instance
-            if isinstance(obj, dict):
-                user_id = obj.get("id")
-                role_id = obj.get("role_id")
-                if not user_id:
-                    return None
-                # Get user instance
-                from .models import FrontendUser
-                try:
-                    user = FrontendUser.objects.get(id=user_id)
-                    roles = user.get_roles()
-                    if roles.exists():
-                        return roles.first().name
-                except FrontendUser.DoesNotExist:
-                    return None
-            else:
-                # obj is a model instance
-                roles = obj.get_roles()
-                if roles.exists():
-                    return roles.first().name
-            return None
+            user_id = obj.get("id") if isinstance(obj, dict) else obj.id
+            if not user_id:
+                return None
+            # Batched lookup map from the view, or a single (cached) lookup
+            role_names = self.context.get('role_names')
+            if role_names is None or user_id not in role_names:
+                role_names = get_role_names_for_users([obj])
+            return role_names.get(user_id)
         except Exception:
             return None
 
@@ -708,12 +826,12 @@ class UserSerializer(serializers.ModelSerializer):
     def get_role_name(self, obj):
         """Get role name from Role model based on role_id or UserRole assignments"""
         try:
-            # Use the get_roles() method from the User model
-            roles = obj.get_roles()
-            if roles.exists():
-                # Get the first role's name (if multiple, use the first one)
-                return roles.first().name
-            return None
+            # Lists pass a precomputed {user_id: role_name} map (see users_list);
+            # otherwise look up this user alone (served from the role cache when warm)
+            role_names = self.context.get('role_names')
+            if role_names is None or obj.id not in role_names:
+                role_names = get_role_names_for_users([obj])
+            return role_names.get(obj.id)
         except Exception:
             return None
 
@@ -873,9 +991,8 @@ class UserCreateSerializer(serializers.ModelSerializer):
         
         # If role_id is 1, 2, "1", "2", "R001", etc., create AdminProfile with corresponding role
         # AdminProfile.user requires a Django User instance, not FrontendUser
-        # Convert role_id to string for comparison (handles both string and integer)
-        role_id_str = str(role_id) if role_id is not None else None
-        if role_id_str in ['1', '2', 1, 2]:
+        # Same predicate as the bulk import (views._create_admin_profiles_bulk)
+        if is_admin_role(frontend_user.role_id):
             from .models import AdminProfile
             
             # Generate username from email or use a fallback
@@ -896,7 +1013,7 @@ class UserCreateSerializer(serializers.ModelSerializer):
                 django_user.password = frontend_user.password
                 django_user.is_active = frontend_user.is_active
                 django_user.is_staff = True
-                django_user.is_superuser = (role_id_str in ['1', 1])
+                django_user.is_superuser = is_superadmin_role(frontend_user.role_id)
                 if not django_user.username or django_user.username == '':
                     django_user.username = username
                 django_user.save()
@@ -914,7 +1031,7 @@ class UserCreateSerializer(serializers.ModelSerializer):
                         password=frontend_user.password,  # Already hashed
                         is_active=frontend_user.is_active,
                         is_staff=True,  # Admin users should be staff
-                        is_superuser=(role_id_str in ['1', 1]),  # Superadmin if role_id is 1
+                        is_superuser=is_superadmin_role(frontend_user.role_id),  # Superadmin if role_id is 1
                     )
                 else:
                     # Password is not hashed, use create_user to hash it
@@ -926,11 +1043,11 @@ class UserCreateSerializer(serializers.ModelSerializer):
                         last_name=' '.join(name_parts[1:]) if len(name_parts) > 1 else '',
                         is_active=frontend_user.is_active,
                         is_staff=True,  # Admin users should be staff
-                        is_superuser=(role_id_str in ['1', 1]),  # Superadmin if role_id is 1
+                        is_superuser=is_superadmin_role(frontend_user.role_id),  # Superadmin if role_id is 1
                     )
             
             # Create AdminProfile with Django User instance
-            admin_role = AdminProfile.ROLE_SUPERADMIN if role_id_str in ['1', 1] else AdminProfile.ROLE_ADMIN
+            admin_role = AdminProfile.ROLE_SUPERADMIN if is_superadmin_role(frontend_user.role_id) else AdminProfile.ROLE_ADMIN
             AdminProfile.objects.get_or_create(
                 user=django_user,
                 defaults={
@@ -945,6 +1062,19 @@ class UserCreateSerializer(serializers.ModelSerializer):
         return frontend_user
 
 
+class UserBulkCreateRowSerializer(UserCreateSerializer):
+    """
+    Serializer for validating one row of a bulk user import (see users_bulk_create)
+    Email uniqueness is checked for the whole batch in one query instead of per row.
+    """
+    
+    class Meta(UserCreateSerializer.Meta):
+        extra_kwargs = {
+            **UserCreateSerializer.Meta.extra_kwargs,
+            'email': {'required': True, 'validators': []},
+        }
+
+
 class UserUpdateSerializer(serializers.ModelSerializer):
     """Serializer for updating a user"""
     password = serializers.CharField(
@@ -1057,13 +1187,21 @@ class RoleCreateSerializer(serializers.ModelSerializer):
         model = Role
         fields = ['role_id', 'name', 'description', 'page_permission', 'default_page', 'is_active']
         extra_kwargs = {
-            'role_id': {'required': True},
+            'role_id': {'required': False},  # Allocated from the role_id sequence if omitted
             'name': {'required': True},
             'description': {'required': False},
             'page_permission': {'required': False},
             'default_page': {'required': False},  # Has default in model
         }
     
+    def create(self, validated_data):
+        """Create the role, allocating the next R### role_id if none was given"""
+        if validated_data.get('role_id'):
+            reserve_role_id(validated_data['role_id'])
+        else:
+            validated_data['role_id'] = allocate_role_id()
+        return super().create(validated_data)
+    
     def validate_is_active(self, value):
         """Convert 'active'/'deactive' string to boolean"""
         if value is None or value == '':
@@ -1296,6 +1434,8 @@ class RolePermissionCreateSerializer(serializers.ModelSerializer):
                 ON CONFLICT (role_id, page_path, permission_type) DO NOTHING
             """, [role.role_id, name, page_path, permission_type, is_allowed, now, now])
         
+        bump_role_version(role.role_id)
+        
         # Fetch using raw SQL and create a simple object that can be serialized
         from django.db import connection
         from types import SimpleNamespace
@@ -1498,6 +1638,10 @@ class RolePermissionUpdateSerializer(serializers.ModelSerializer):
                 if rows_updated == 0:
                     logger.warning(f"No rows updated for role_id={original_role_id}, page_path={original_page_path}, permission_type={original_permission_type}")
             
+            bump_role_version(current_role.role_id)
+            if original_role_id and original_role_id != current_role.role_id:
+                bump_role_version(original_role_id)
+            
             # Fetch updated permission using raw SQL to verify it was saved
             with connection.cursor() as cursor:
                 cursor.execute("""
@@ -1687,6 +1831,98 @@ class UserRoleUpdateSerializer(serializers.ModelSerializer):
         return bool(value)
     
 
+def _upsert_role_permissions(role, permissions_data):
+    """
+    Write a {page_path: {permission_type: bool}} matrix for a role with ONE
+    INSERT ... ON CONFLICT (role_id, page_path, permission_type) DO UPDATE ... RETURNING.
+    Returns (created_permissions, updated_permissions) built from the RETURNING rows, in payload order.
+    Raw SQL because frontend_role_permissions has no id column (composite primary key).
+    """
+    from django.db import connection
+    from django.utils import timezone
+    from types import SimpleNamespace
+
+    keys = [
+        (page_path, permission_type, is_allowed)
+        for page_path, perms in permissions_data.items()
+        for permission_type, is_allowed in perms.items()
+    ]
+    if not keys:
+        return [], []
+
+    now = timezone.now()
+    values_sql = ', '.join(['(%s, %s, %s, %s, %s, %s, %s)'] * len(keys))
+    params = []
+    for page_path, permission_type, is_allowed in keys:
+        params.extend([role.role_id, role.name, page_path, permission_type, is_allowed, now, now])
+
+    with connection.cursor() as cursor:
+        # xmax = 0 only for rows this statement inserted (updated rows carry our transaction id)
+        cursor.execute(f"""
+            INSERT INTO frontend_role_permissions
+            (role_id, name, page_path, permission_type, is_allowed, created_at, updated_at)
+            VALUES {values_sql}
+            ON CONFLICT (role_id, page_path, permission_type)
+            DO UPDATE SET is_allowed = EXCLUDED.is_allowed, name = EXCLUDED.name, updated_at = EXCLUDED.updated_at
+            RETURNING role_id, name, page_path, permission_type, is_allowed, created_at, updated_at, (xmax = 0) AS inserted
+        """, params)
+        rows = cursor.fetchall()
+
+    order = {(page_path, permission_type): index for index, (page_path, permission_type, _) in enumerate(keys)}
+    rows.sort(key=lambda row: order[(row[2], row[3])])
+
+    created_permissions = []
+    updated_permissions = []
+    for row in rows:
+        perm = SimpleNamespace()
+        perm.role = role
+        perm.name = row[1]
+        perm.page_path = row[2]
+        perm.permission_type = row[3]
+        perm.is_allowed = row[4]
+        perm.created_at = row[5]
+        perm.updated_at = row[6]
+        if row[7]:
+            created_permissions.append(perm)
+        else:
+            updated_permissions.append(perm)
+    return created_permissions, updated_permissions
+
+
+def _validate_permission_matrix(value):
+    """Validate a {page_path: {permission_type: bool}} permissions structure"""
+    if not isinstance(value, dict):
+        raise serializers.ValidationError("Permissions must be a dictionary.")
+    
+    # All valid permission types based on JSON format
+    valid_permission_types = [
+        'view', 'create', 'edit', 'delete', 
+        'assign', 'approve', 'block', 'refund', 
+        'reply', 'resolve', 'send'
+    ]
+    
+    for page_path, perms in value.items():
+        if not isinstance(page_path, str):
+            raise serializers.ValidationError(f"Page path must be a string. Got: {type(page_path)}")
+        
+        if not isinstance(perms, dict):
+            raise serializers.ValidationError(f"Permissions for '{page_path}' must be a dictionary.")
+        
+        for perm_type, perm_value in perms.items():
+            if perm_type not in valid_permission_types:
+                raise serializers.ValidationError(
+                    f"Invalid permission type '{perm_type}' for page '{page_path}'. "
+                    f"Valid types: {', '.join(valid_permission_types)}"
+                )
+            
+            if not isinstance(perm_value, bool):
+                raise serializers.ValidationError(
+                    f"Permission value for '{perm_type}' on '{page_path}' must be a boolean. Got: {type(perm_value)}"
+                )
+    
+    return value
+
+
 class RoleWithPermissionsCreateSerializer(serializers.Serializer):
     """Serializer for creating a role with permissions in one request"""
     name = serializers.CharField(
@@ -1755,87 +1991,25 @@ class RoleWithPermissionsCreateSerializer(serializers.Serializer):
     
     def create(self, validated_data):
         """Create role and all its permissions"""
-        # Generate role_id automatically (R001, R002, etc.)
-        # Try to find the maximum numeric part of role_ids
-        max_number = 0
-        existing_roles = Role.objects.all()
-        
-        for role in existing_roles:
-            role_id = role.role_id
-            # Check if role_id matches pattern R### or R##
-            if role_id.startswith('R') and len(role_id) > 1:
-                try:
-                    # Extract numeric part
-                    num_part = role_id[1:]
-                    num = int(num_part)
-                    if num > max_number:
-                        max_number = num
-                except ValueError:
-                    continue
-        
-        # Generate next role_id
-        role_id_number = max_number + 1
-        role_id = f"R{role_id_number:03d}"
-        
-        # Ensure role_id is unique (in case of conflicts)
-        while Role.objects.filter(role_id=role_id).exists():
-            role_id_number += 1
-            role_id = f"R{role_id_number:03d}"
-        
-        # Create the role
-        role = Role.objects.create(
-            role_id=role_id,
-            name=validated_data['name'],
-            description=validated_data.get('description', ''),
-            default_page=validated_data.get('defaultPage', '/'),
-            is_active=True
-        )
+        from django.db import transaction
         
-        # Create permissions
-        permissions_data = validated_data['permissions']
-        created_permissions = []
+        # Next role_id from the sequence (R001, R002, etc.)
+        role_id = allocate_role_id()
         
-        for page_path, perms in permissions_data.items():
-            for permission_type, is_allowed in perms.items():
-                # Create permission for both true and false values so they appear in database
-                # Use raw SQL to create/update permission to avoid id field issues
-                from django.db import connection
-                from django.utils import timezone
-                
-                now = timezone.now()
-                with connection.cursor() as cursor:
-                    # Try to insert, update if exists
-                    cursor.execute("""
-                        INSERT INTO frontend_role_permissions 
-                        (role_id, name, page_path, permission_type, is_allowed, created_at, updated_at)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (role_id, page_path, permission_type) 
-                        DO UPDATE SET is_allowed = EXCLUDED.is_allowed, name = EXCLUDED.name, updated_at = EXCLUDED.updated_at
-                    """, [role.role_id, role.name, page_path, permission_type, is_allowed, now, now])
-                
-                # Fetch using raw SQL to avoid id field
-                from django.db import connection
-                from types import SimpleNamespace
-                
-                with connection.cursor() as cursor:
-                    cursor.execute("""
-                        SELECT rp.role_id, rp.name, rp.page_path, rp.permission_type, 
-                               rp.is_allowed, rp.created_at, rp.updated_at
-                        FROM frontend_role_permissions rp
-                        WHERE rp.role_id = %s AND rp.page_path = %s AND rp.permission_type = %s
-                    """, [role.role_id, page_path, permission_type])
-                    row = cursor.fetchone()
-                    
-                    if row:
-                        perm = SimpleNamespace()
-                        perm.role = role
-                        perm.name = row[1]
-                        perm.page_path = row[2]
-                        perm.permission_type = row[3]
-                        perm.is_allowed = row[4]
-                        perm.created_at = row[5]
-                        perm.updated_at = row[6]
-                        created_permissions.append(perm)
+        with transaction.atomic():
+            role = Role.objects.create(
+                role_id=role_id,
+                name=validated_data['name'],
+                description=validated_data.get('description', ''),
+                default_page=validated_data.get('defaultPage', '/'),
+                is_active=True
+            )
+            
+            # Create permissions (both true and false values so they appear in database)
+            created, updated = _upsert_role_permissions(role, validated_data['permissions'])
+            created_permissions = created + updated
+            
+            bump_role_version(role.role_id)
         
         return {
             'role': role,
@@ -1900,37 +2074,7 @@ class RolePermissionsBulkUpdateSerializer(serializers.Serializer):
         return data
     
     def validate_permissions(self, value):
-        """Validate permissions structure"""
-        if not isinstance(value, dict):
-            raise serializers.ValidationError("Permissions must be a dictionary.")
-        
-        # All valid permission types based on JSON format
-        valid_permission_types = [
-            'view', 'create', 'edit', 'delete', 
-            'assign', 'approve', 'block', 'refund', 
-            'reply', 'resolve', 'send'
-        ]
-        
-        for page_path, perms in value.items():
-            if not isinstance(page_path, str):
-                raise serializers.ValidationError(f"Page path must be a string. Got: {type(page_path)}")
-            
-            if not isinstance(perms, dict):
-                raise serializers.ValidationError(f"Permissions for '{page_path}' must be a dictionary.")
-            
-            for perm_type, perm_value in perms.items():
-                if perm_type not in valid_permission_types:
-                    raise serializers.ValidationError(
-                        f"Invalid permission type '{perm_type}' for page '{page_path}'. "
-                        f"Valid types: {', '.join(valid_permission_types)}"
-                    )
-                
-                if not isinstance(perm_value, bool):
-                    raise serializers.ValidationError(
-                        f"Permission value for '{perm_type}' on '{page_path}' must be a boolean. Got: {type(perm_value)}"
-                    )
-        
-        return value
+        return _validate_permission_matrix(value)
     
     def create(self, validated_data):
         """Create or update permissions for a role (creates role if it doesn't exist, auto-generates role_id if not provided)"""
@@ -1941,273 +2085,44 @@ class RolePermissionsBulkUpdateSerializer(serializers.Serializer):
         role_id = validated_data.get('role_id')
         role_created = False
         
-        # Auto-generate role_id if not provided
+        # Auto-generate role_id if not provided (next R### from the sequence); an explicit one is
+        # reserved up front, outside the transaction (a no-op if the sequence is already past it)
         if not role_id:
-            # Generate role_id automatically (R001, R002, etc.)
-            max_number = 0
-            existing_roles = Role.objects.all()
-            
-            for role in existing_roles:
-                role_id_str = role.role_id
-                # Check if role_id matches pattern R### or R##
-                if role_id_str.startswith('R') and len(role_id_str) > 1:
-                    try:
-                        # Extract numeric part
-                        num_part = role_id_str[1:]
-                        num = int(num_part)
-                        if num > max_number:
-                            max_number = num
-                    except ValueError:
-                        continue
-            
-            # Generate next role_id
-            role_id_number = max_number + 1
-            role_id = f"R{role_id_number:03d}"
-            
-            # Ensure role_id is unique (in case of conflicts)
-            while Role.objects.filter(role_id=role_id).exists():
-                role_id_number += 1
-                role_id = f"R{role_id_number:03d}"
-        
-        # Get or create the role
-        role, role_created = Role.objects.get_or_create(
-            role_id=role_id,
-            defaults={
-                'name': validated_data.get('name', f'Role {role_id}'),
-                'description': validated_data.get('description', ''),
-                'default_page': validated_data.get('defaultPage', '/'),
-                'is_active': True
-            }
-        )
-        
-        # If role already exists, update optional fields if provided
-        if not role_created:
-            if 'name' in validated_data:
-                role.name = validated_data['name']
-            if 'description' in validated_data:
-                role.description = validated_data.get('description', '')
-            if 'defaultPage' in validated_data:
-                role.default_page = validated_data.get('defaultPage', '/')
-            role.save()
-        
-        permissions_data = validated_data['permissions']
-        created_permissions = []
-        updated_permissions = []
-        deleted_permissions = []
-        
-        # Get all existing permissions for this role using raw SQL
-        from django.db import connection
-        from types import SimpleNamespace
+            role_id = allocate_role_id()
+        else:
+            reserve_role_id(role_id)
         
-        existing_perms_dict = {}
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT rp.role_id, rp.name, rp.page_path, rp.permission_type, 
-                       rp.is_allowed, rp.created_at, rp.updated_at
-                FROM frontend_role_permissions rp
-                WHERE rp.role_id = %s
-            """, [role.role_id])
-            rows = cursor.fetchall()
+        with transaction.atomic():
+            # Get or create the role
+            role, role_created = Role.objects.get_or_create(
+                role_id=role_id,
+                defaults={
+                    'name': validated_data.get('name', f'Role {role_id}'),
+                    'description': validated_data.get('description', ''),
+                    'default_page': validated_data.get('defaultPage', '/'),
+                    'is_active': True
+                }
+            )
+            # If role already exists, update optional fields if provided
+            if not role_created:
+                if 'name' in validated_data:
+                    role.name = validated_data['name']
+                if 'description' in validated_data:
+                    role.description = validated_data.get('description', '')
+                if 'defaultPage' in validated_data:
+                    role.default_page = validated_data.get('defaultPage', '/')
+                role.save()
             
-            for row in rows:
-                perm = SimpleNamespace()
-                perm.role = role
-                perm.name = row[1]
-                perm.page_path = row[2]
-                perm.permission_type = row[3]
-                perm.is_allowed = row[4]
-                perm.created_at = row[5]
-                perm.updated_at = row[6]
-                key = (perm.page_path, perm.permission_type)
-                existing_perms_dict[key] = perm
-        
-        # Process permissions from payload
-        processed_perms = set()
-        from django.db import connection, transaction
-        from django.utils import timezone
-        from types import SimpleNamespace
-        import logging
-        logger = logging.getLogger(__name__)
-        
-        # Use atomic transaction to ensure all changes are committed
-        # Using savepoint=True to ensure proper transaction handling with PgBouncer
-        with transaction.atomic(using='default'):
-            for page_path, perms in permissions_data.items():
-                for permission_type, is_allowed in perms.items():
-                    key = (page_path, permission_type)
-                    processed_perms.add(key)
-                    
-                    # Create or update permission using raw SQL for reliable saving
-                    now = timezone.now()
-                    was_existing = key in existing_perms_dict
-                    perm_obj = existing_perms_dict.get(key)
-                    
-                    try:
-                        # Use raw SQL with explicit transaction handling for PgBouncer compatibility
-                        logger.info(f"Updating permission: role_id={role.role_id}, page_path={page_path}, permission_type={permission_type}, is_allowed={is_allowed}")
-                        
-                        with connection.cursor() as cursor:
-                            # First try UPDATE
-                            cursor.execute("""
-                                UPDATE frontend_role_permissions 
-                                SET is_allowed = %s,
-                                    name = %s,
-                                    updated_at = %s
-                                WHERE role_id = %s 
-                                  AND page_path = %s 
-                                  AND permission_type = %s
-                            """, [is_allowed, role.name, now, role.role_id, page_path, permission_type])
-                            
-                            rows_updated = cursor.rowcount
-                            logger.info(f"UPDATE rows affected: {rows_updated} for role_id={role.role_id}")
-                            
-                            # If no rows updated, INSERT new permission
-                            if rows_updated == 0:
-                                logger.info(f"Inserting new permission for role_id={role.role_id}")
-                                cursor.execute("""
-                                    INSERT INTO frontend_role_permissions 
-                                    (role_id, name, page_path, permission_type, is_allowed, created_at, updated_at)
-                                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                                """, [role.role_id, role.name, page_path, permission_type, is_allowed, now, now])
-                                rows_inserted = cursor.rowcount
-                                logger.info(f"INSERT rows affected: {rows_inserted}")
-                        
-                        # Fetch the saved permission to verify it was saved correctly (within same transaction)
-                        with connection.cursor() as cursor:
-                            cursor.execute("""
-                                SELECT rp.role_id, rp.name, rp.page_path, rp.permission_type, 
-                                       rp.is_allowed, rp.created_at, rp.updated_at
-                                FROM frontend_role_permissions rp
-                                WHERE rp.role_id = %s AND rp.page_path = %s AND rp.permission_type = %s
-                            """, [role.role_id, page_path, permission_type])
-                            row = cursor.fetchone()
-                            
-                            if row:
-                                perm = SimpleNamespace()
-                                perm.role = role
-                                perm.name = row[1]
-                                perm.page_path = row[2]
-                                perm.permission_type = row[3]
-                                perm.is_allowed = row[4]
-                                perm.created_at = row[5]
-                                perm.updated_at = row[6]
-                                
-                                # Verify the value was actually saved correctly
-                                if perm.is_allowed != is_allowed:
-                                    logger.error(f"❌ Value mismatch! Expected {is_allowed}, got {perm.is_allowed} for role_id={role.role_id}, {page_path}/{permission_type}")
-                                    # Force update one more time
-                                    with connection.cursor() as fix_cursor:
-                                        fix_cursor.execute("""
-                                            UPDATE frontend_role_permissions 
-                                            SET is_allowed = %s, updated_at = %s
-                                            WHERE role_id = %s AND page_path = %s AND permission_type = %s
-                                        """, [is_allowed, timezone.now(), role.role_id, page_path, permission_type])
-                                        if fix_cursor.rowcount > 0:
-                                            logger.info(f"✅ Fixed value mismatch for role_id={role.role_id}")
-                                            perm.is_allowed = is_allowed
-                                else:
-                                    logger.info(f"✅ Permission saved correctly: role_id={role.role_id}, {page_path}/{permission_type} = {perm.is_allowed}")
-                                
-                                # Add to appropriate list
-                                if was_existing:
-                                    if perm_obj and perm_obj.is_allowed != is_allowed:
-                                        updated_permissions.append(perm)
-                                    else:
-                                        updated_permissions.append(perm)
-                                else:
-                                    created_permissions.append(perm)
-                            else:
-                                logger.error(f"❌ Permission not found after save for role_id={role.role_id}, {page_path}/{permission_type}")
-                                raise Exception(f"Failed to save permission: role_id={role.role_id}, {page_path}/{permission_type}")
-                        
-                        # Add to appropriate list based on whether it existed before
-                        if was_existing:
-                            # Check if value actually changed
-                            if perm_obj and perm_obj.is_allowed != is_allowed:
-                                updated_permissions.append(perm)
-                            else:
-                                # Value didn't change, but still include in updated list for response
-                                updated_permissions.append(perm)
-                        else:
-                            created_permissions.append(perm)
-                            
-                    except Exception as e:
-                        logger.error(f"❌ Error saving permission {page_path}/{permission_type}: {str(e)}", exc_info=True)
-                        # Fallback to raw SQL if ORM fails
-                        try:
-                            logger.warning(f"Falling back to raw SQL for {page_path}/{permission_type}")
-                            with connection.cursor() as cursor:
-                                # Try UPDATE first
-                                cursor.execute("""
-                                    UPDATE frontend_role_permissions 
-                                    SET is_allowed = %s,
-                                        name = %s,
-                                        updated_at = %s
-                                    WHERE role_id = %s 
-                                      AND page_path = %s 
-                                      AND permission_type = %s
-                                """, [is_allowed, role.name, now, role.role_id, page_path, permission_type])
-                                
-                                rows_updated = cursor.rowcount
-                                
-                                # If no rows were updated, INSERT the new permission
-                                if rows_updated == 0:
-                                    cursor.execute("""
-                                        INSERT INTO frontend_role_permissions 
-                                        (role_id, name, page_path, permission_type, is_allowed, created_at, updated_at)
-                                        VALUES (%s, %s, %s, %s, %s, %s, %s)
-                                    """, [role.role_id, role.name, page_path, permission_type, is_allowed, now, now])
-                                
-                                # Fetch to verify
-                                cursor.execute("""
-                                    SELECT rp.role_id, rp.name, rp.page_path, rp.permission_type, 
-                                           rp.is_allowed, rp.created_at, rp.updated_at
-                                    FROM frontend_role_permissions rp
-                                    WHERE rp.role_id = %s AND rp.page_path = %s AND rp.permission_type = %s
-                                """, [role.role_id, page_path, permission_type])
-                                row = cursor.fetchone()
-                                
-                                if row:
-                                    perm = SimpleNamespace()
-                                    perm.role = role
-                                    perm.name = row[1]
-                                    perm.page_path = row[2]
-                                    perm.permission_type = row[3]
-                                    perm.is_allowed = row[4]
-                                    perm.created_at = row[5]
-                                    perm.updated_at = row[6]
-                                    
-                                    if was_existing:
-                                        updated_permissions.append(perm)
-                                    else:
-                                        created_permissions.append(perm)
-                                else:
-                                    raise Exception(f"Failed to save permission: {page_path}/{permission_type}")
-                        except Exception as fallback_error:
-                            logger.error(f"❌ Raw SQL fallback also failed: {str(fallback_error)}", exc_info=True)
-                            raise  # Re-raise to ensure transaction rollback
-        
-        # Delete permissions that are not in the payload (optional - you can comment this out if you don't want to delete)
-        # for key, perm in existing_perms_dict.items():
-        #     if key not in processed_perms:
-        #         perm.delete()
-        #         deleted_permissions.append(perm)
-        
-        # Transaction commits automatically when exiting the atomic block above
-        # Close connection to ensure PgBouncer sees the committed transaction
-        connection.close()
-        
-        # Reopen connection and verify all permissions were saved
-        logger.info(f"Transaction committed. Verifying {len(created_permissions) + len(updated_permissions)} permissions were saved to database...")
+            # Permissions not in the payload are kept (nothing is deleted)
+            created_permissions, updated_permissions = _upsert_role_permissions(role, validated_data['permissions'])
+            deleted_permissions = []
+            
+            bump_role_version(role.role_id)
         
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT COUNT(*) 
-                FROM frontend_role_permissions 
-                WHERE role_id = %s
-            """, [role.role_id])
-            total_count = cursor.fetchone()[0]
-            logger.info(f"✅ Total permissions in database for role {role.role_id}: {total_count}")
+        logger.info(
+            f"✅ Saved permissions for role_id={role.role_id}: "
+            f"{len(created_permissions)} created, {len(updated_permissions)} updated"
+        )
         
         return {
             'role': role,
@@ -2218,6 +2133,180 @@ class RolePermissionsBulkUpdateSerializer(serializers.Serializer):
         }
 
 
+class PermissionMatrixConflict(Exception):
+    """The role's permission matrix changed since the client read it (If-Match mismatch)"""
+    def __init__(self, current_etag):
+        super().__init__('Permission matrix has been modified')
+        self.current_etag = current_etag
+
+
+class RolePermissionsPatchSerializer(serializers.Serializer):
+    """
+    Serializer for PATCHing a role's permission matrix.
+    Accepts a (full or partial) matrix and/or JSON-patch style operations, diffs them against the
+    stored matrix and writes only the cells that actually change.
+
+    operations: [{"op": "replace"|"add"|"remove", "path": "/~1users/view", "value": true}, ...]
+    `path` is a JSON pointer (page_path with "/" escaped as "~1"); "page_path" + "permission_type"
+    may be given instead.
+    """
+    VALID_PERMISSION_TYPES = [
+        'view', 'create', 'edit', 'delete',
+        'assign', 'approve', 'block', 'refund',
+        'reply', 'resolve', 'send'
+    ]
+    VALID_OPS = ('add', 'replace', 'remove')
+
+    name = serializers.CharField(required=False, max_length=255)
+    description = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    defaultPage = serializers.CharField(required=False, max_length=255)
+    permissions = serializers.DictField(
+        required=False,
+        child=serializers.DictField(
+            child=serializers.BooleanField()
+        ),
+        help_text="Matrix {'/path': {'view': true, ...}}; cells not listed are left unchanged"
+    )
+    operations = serializers.ListField(
+        required=False,
+        child=serializers.DictField(),
+        help_text="JSON-patch style operations on single cells"
+    )
+
+    def validate_permissions(self, value):
+        return _validate_permission_matrix(value)
+
+    def validate_operations(self, value):
+        """Normalise operations to (op, page_path, permission_type, value) tuples"""
+        operations = []
+        for index, operation in enumerate(value):
+            op = operation.get('op')
+            if op not in self.VALID_OPS:
+                raise serializers.ValidationError(f"Operation {index}: 'op' must be one of {', '.join(self.VALID_OPS)}.")
+
+            if 'path' in operation:
+                # JSON pointer: "/<page_path with / escaped as ~1>/<permission_type>"
+                tokens = str(operation['path']).split('/')
+                if len(tokens) != 3 or tokens[0] != '':
+                    raise serializers.ValidationError(
+                        f"Operation {index}: 'path' must look like '/~1users/view' (page path with '/' escaped as '~1')."
+                    )
+                page_path, permission_type = [token.replace('~1', '/').replace('~0', '~') for token in tokens[1:]]
+            else:
+                page_path = operation.get('page_path')
+                permission_type = operation.get('permission_type')
+            if not isinstance(page_path, str) or not page_path:
+                raise serializers.ValidationError(f"Operation {index}: page path is required.")
+            if permission_type not in self.VALID_PERMISSION_TYPES:
+                raise serializers.ValidationError(
+                    f"Operation {index}: invalid permission type '{permission_type}'. "
+                    f"Valid types: {', '.join(self.VALID_PERMISSION_TYPES)}"
+                )
+
+            is_allowed = operation.get('value')
+            if op != 'remove' and not isinstance(is_allowed, bool):
+                raise serializers.ValidationError(f"Operation {index}: 'value' must be a boolean.")
+            operations.append((op, page_path, permission_type, is_allowed))
+        return operations
+
+    def validate(self, data):
+        if not any(field in data for field in ('permissions', 'operations', 'name', 'description', 'defaultPage')):
+            raise serializers.ValidationError(
+                'Provide "permissions", "operations", "name", "description" and/or "defaultPage" to change.'
+            )
+        name = data.get('name')
+        if name and Role.objects.filter(name__iexact=name).exclude(role_id=self.instance.role_id).exists():
+            raise serializers.ValidationError({'name': 'A role with this name already exists.'})
+        return data
+
+    def update(self, instance, validated_data):
+        """
+        Apply the diff to role `instance`. context['if_match'] (optional) is the ETag the client
+        last read; a mismatch raises PermissionMatrixConflict.
+        Returns {'role', 'changed_permissions', 'removed_permissions', 'permissions_version'}.
+        """
+        from django.db import connection, transaction
+        from .permission_cache import role_permissions_etag
+
+        role = instance
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                # Lock the role row so concurrent PATCHes diff against each other's results
+                cursor.execute("""
+                    SELECT permissions_version FROM frontend_role WHERE role_id = %s FOR UPDATE
+                """, [role.role_id])
+                current_version = cursor.fetchone()[0]
+
+                if_match = self.context.get('if_match')
+                current_etag = role_permissions_etag(role.role_id, current_version)
+                if if_match and if_match != '*' and current_etag not in [tag.strip() for tag in if_match.split(',')]:
+                    raise PermissionMatrixConflict(current_etag)
+
+                cursor.execute("""
+                    SELECT page_path, permission_type, is_allowed
+                    FROM frontend_role_permissions
+                    WHERE role_id = %s
+                """, [role.role_id])
+                stored = {(row[0], row[1]): row[2] for row in cursor.fetchall()}
+
+            # Desired end state of every touched cell (None = remove); later operations win
+            desired = {}
+            for page_path, perms in (validated_data.get('permissions') or {}).items():
+                for permission_type, is_allowed in perms.items():
+                    desired[(page_path, permission_type)] = is_allowed
+            for op, page_path, permission_type, is_allowed in validated_data.get('operations') or []:
+                desired[(page_path, permission_type)] = None if op == 'remove' else is_allowed
+
+            to_upsert = {}
+            to_remove = []
+            for key, is_allowed in desired.items():
+                if is_allowed is None:
+                    if key in stored:
+                        to_remove.append(key)
+                elif stored.get(key) != is_allowed:
+                    to_upsert.setdefault(key[0], {})[key[1]] = is_allowed
+
+            changed_fields = []
+            for field, attr in (('name', 'name'), ('description', 'description'), ('defaultPage', 'default_page')):
+                if field in validated_data and validated_data[field] != getattr(role, attr):
+                    setattr(role, attr, validated_data[field])
+                    changed_fields.append(attr)
+            if changed_fields:
+                # Only the edited columns: a full save would write back a stale permissions_version
+                role.save(update_fields=changed_fields + ['updated_at'])
+
+            changed_permissions = []
+            if to_upsert:
+                created, updated = _upsert_role_permissions(role, to_upsert)
+                changed_permissions = created + updated
+
+            if to_remove:
+                with connection.cursor() as cursor:
+                    placeholders = ', '.join(['(%s, %s)'] * len(to_remove))
+                    cursor.execute(f"""
+                        DELETE FROM frontend_role_permissions
+                        WHERE role_id = %s AND (page_path, permission_type) IN ({placeholders})
+                    """, [role.role_id] + [value for key in to_remove for value in key])
+
+            new_version = current_version
+            if changed_fields:
+                # Role's post_save signal (sync_role_permissions_name) already bumped it, once: the
+                # row is locked
+                new_version = current_version + 1
+            elif to_upsert or to_remove:
+                new_version = bump_role_version(role.role_id)
+
+        return {
+            'role': role,
+            'changed_permissions': changed_permissions,
+            'removed_permissions': [
+                {'page_path': page_path, 'permission_type': permission_type, 'previous': stored[(page_path, permission_type)]}
+                for page_path, permission_type in to_remove
+            ],
+            'permissions_version': new_version,
+        }
+
+
 class RoleWithPermissionsUpdateSerializer(serializers.Serializer):
     """Serializer for updating a role with all its permissions in one request"""
     role_id = serializers.CharField(
@@ -2315,6 +2404,9 @@ class RoleWithPermissionsUpdateSerializer(serializers.Serializer):
         role_id = validated_data['role_id']
         role_created = False
         
+        # In case the role gets created below; outside the transaction (no-op for existing roles)
+        reserve_role_id(role_id)
+        
         # Use atomic transaction to ensure all changes are committed
         with transaction.atomic(using='default'):
             # Get or create the role
@@ -2359,166 +2451,16 @@ class RoleWithPermissionsUpdateSerializer(serializers.Serializer):
             if name_updated:
                 RolePermission.objects.filter(role=role).update(name=role.name)
                 logger.info(f"✅ Synced role name to permissions: role_id={role.role_id}")
-        
-        # Update permissions if provided (still inside transaction if permissions are being updated)
-        created_permissions = []
-        updated_permissions = []
-        deleted_permissions = []
-        
-        if 'permissions' in validated_data and validated_data['permissions'] is not None:
-            permissions_data = validated_data['permissions']
-            
-            # Get all existing permissions for this role using raw SQL
-            from django.db import connection
-            from types import SimpleNamespace
             
-            existing_perms_dict = {}
-            with connection.cursor() as cursor:
-                cursor.execute("""
-                    SELECT rp.role_id, rp.name, rp.page_path, rp.permission_type, 
-                           rp.is_allowed, rp.created_at, rp.updated_at
-                    FROM frontend_role_permissions rp
-                    WHERE rp.role_id = %s
-                """, [role.role_id])
-                rows = cursor.fetchall()
-                
-                for row in rows:
-                    perm = SimpleNamespace()
-                    perm.role = role
-                    perm.name = row[1]
-                    perm.page_path = row[2]
-                    perm.permission_type = row[3]
-                    perm.is_allowed = row[4]
-                    perm.created_at = row[5]
-                    perm.updated_at = row[6]
-                    key = (perm.page_path, perm.permission_type)
-                    existing_perms_dict[key] = perm
-            
-            # Process permissions from payload
-            processed_perms = set()
-            for page_path, perms in permissions_data.items():
-                for permission_type, is_allowed in perms.items():
-                    key = (page_path, permission_type)
-                    processed_perms.add(key)
-                    
-                    now = timezone.now()
-                    was_existing = key in existing_perms_dict
-                    perm_obj = existing_perms_dict.get(key)
-                    
-                    try:
-                        # Use Django ORM update_or_create for better transaction handling with PgBouncer
-                        logger.info(f"Processing permission: role_id={role.role_id}, page_path={page_path}, permission_type={permission_type}, is_allowed={is_allowed}")
-                        
-                        perm_instance, created = RolePermission.objects.update_or_create(
-                            role=role,
-                            page_path=page_path,
-                            permission_type=permission_type,
-                            defaults={
-                                'is_allowed': is_allowed,
-                                'name': role.name,
-                                'updated_at': now,
-                            }
-                        )
-                        
-                        # Force save to ensure it's committed
-                        perm_instance.save()
-                        
-                        if created:
-                            logger.info(f"✅ Created new permission: {page_path}/{permission_type} = {is_allowed}")
-                        else:
-                            logger.info(f"✅ Updated existing permission: {page_path}/{permission_type} = {is_allowed}")
-                        
-                        # Create SimpleNamespace object for response (matching raw SQL format)
-                        perm = SimpleNamespace()
-                        perm.role = role
-                        perm.name = perm_instance.name
-                        perm.page_path = perm_instance.page_path
-                        perm.permission_type = perm_instance.permission_type
-                        perm.is_allowed = perm_instance.is_allowed
-                        perm.created_at = perm_instance.created_at
-                        perm.updated_at = perm_instance.updated_at
-                        
-                        # Verify the value was actually saved correctly
-                        if perm.is_allowed != is_allowed:
-                            logger.error(f"❌ Value mismatch! Expected {is_allowed}, got {perm.is_allowed} for {page_path}/{permission_type}")
-                            # Force update again
-                            perm_instance.is_allowed = is_allowed
-                            perm_instance.save()
-                            perm.is_allowed = is_allowed
-                        else:
-                            logger.info(f"✅ Permission verified: {page_path}/{permission_type} = {perm.is_allowed}")
-                        
-                        # Add to appropriate list based on whether it existed before
-                        if was_existing:
-                            if perm_obj and perm_obj.is_allowed != is_allowed:
-                                updated_permissions.append(perm)
-                            else:
-                                updated_permissions.append(perm)
-                        else:
-                            created_permissions.append(perm)
-                            
-                    except Exception as e:
-                        logger.error(f"❌ Error saving permission {page_path}/{permission_type}: {str(e)}", exc_info=True)
-                        # Fallback to raw SQL if ORM fails
-                        try:
-                            logger.warning(f"Falling back to raw SQL for {page_path}/{permission_type}")
-                            with connection.cursor() as cursor:
-                                # Try UPDATE first
-                                cursor.execute("""
-                                    UPDATE frontend_role_permissions 
-                                    SET is_allowed = %s,
-                                        name = %s,
-                                        updated_at = %s
-                                    WHERE role_id = %s 
-                                      AND page_path = %s 
-                                      AND permission_type = %s
-                                """, [is_allowed, role.name, now, role.role_id, page_path, permission_type])
-                                
-                                rows_updated = cursor.rowcount
-                                
-                                # If no rows were updated, INSERT the new permission
-                                if rows_updated == 0:
-                                    cursor.execute("""
-                                        INSERT INTO frontend_role_permissions 
-                                        (role_id, name, page_path, permission_type, is_allowed, created_at, updated_at)
-                                        VALUES (%s, %s, %s, %s, %s, %s, %s)
-                                    """, [role.role_id, role.name, page_path, permission_type, is_allowed, now, now])
-                                
-                                # Fetch to verify
-                                cursor.execute("""
-                                    SELECT rp.role_id, rp.name, rp.page_path, rp.permission_type, 
-                                           rp.is_allowed, rp.created_at, rp.updated_at
-                                    FROM frontend_role_permissions rp
-                                    WHERE rp.role_id = %s AND rp.page_path = %s AND rp.permission_type = %s
-                                """, [role.role_id, page_path, permission_type])
-                                row = cursor.fetchone()
-                                
-                                if row:
-                                    perm = SimpleNamespace()
-                                    perm.role = role
-                                    perm.name = row[1]
-                                    perm.page_path = row[2]
-                                    perm.permission_type = row[3]
-                                    perm.is_allowed = row[4]
-                                    perm.created_at = row[5]
-                                    perm.updated_at = row[6]
-                                    
-                                    if was_existing:
-                                        updated_permissions.append(perm)
-                                    else:
-                                        created_permissions.append(perm)
-                                else:
-                                    raise Exception(f"Failed to save permission: {page_path}/{permission_type}")
-                        except Exception as fallback_error:
-                            logger.error(f"❌ Raw SQL fallback also failed: {str(fallback_error)}", exc_info=True)
-                            raise  # Re-raise to ensure transaction rollback
+            # Update permissions if provided (same transaction as the role; permissions not in
+            # the payload are kept)
+            created_permissions = []
+            updated_permissions = []
+            deleted_permissions = []
+            if validated_data.get('permissions') is not None:
+                created_permissions, updated_permissions = _upsert_role_permissions(role, validated_data['permissions'])
             
-            # Optionally delete permissions that are not in the payload
-            # Uncomment the code below if you want to delete permissions not in the payload
-            # for key, perm in existing_perms_dict.items():
-            #     if key not in processed_perms:
-            #         perm.delete()
-            #         deleted_permissions.append(perm)
+            bump_role_version(role.role_id)
         
         # Refresh from database after transaction commits (outside the atomic block)
         role.refresh_from_db()
@@ -1,3 +1,568 @@
-from django.test import TestCase
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth.models import User as DjangoUser
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .generations import current_generation
+from .models import AdminProfile, PromoCode, Role, Zone
+from .promo_lifecycle import EFFECTIVE_STATUS_SQL, sweep_promo_codes
+from .promo_redemption import REASON_EXHAUSTED, PromoCodeRedemptionError, redeem_promo_code
+from .promo_usage import reconcile_promo_usage, set_usage_slots
+from .role_ids import allocate_role_id, reserve_role_id
+from .serializers import RoleWithPermissionsCreateSerializer
+from .zone_batch import NO_ZONE, classify_points
+from .zone_index import (
+    GENERATION_NAME as ZONE_INDEX_GENERATION, MAX_CELLS_PER_ZONE, IndexedZone, ZoneIndex, _index, _rebuilding,
+    build_zone_index, get_zone_index, locate_zone, locate_zone_sql, parse_wkt_polygon, point_in_ring,
+)
+
+
+class RoleIdAllocationTests(TransactionTestCase):
+    """role_id allocation must stay unique when roles are created concurrently"""
+
+    THREADS = 12
+
+    def test_concurrent_role_creation_gets_unique_ids(self):
+        barrier = threading.Barrier(self.THREADS)
+        created_ids = []
+        errors = []
+        lock = threading.Lock()
+
+        def create_role(index):
+            try:
+                serializer = RoleWithPermissionsCreateSerializer(data={
+                    'name': f'Concurrent Role {index}',
+                    'permissions': {'/': {'view': True}},
+                })
+                serializer.is_valid(raise_exception=True)
+                barrier.wait()
+                role = serializer.save()['role']
+                with lock:
+                    created_ids.append(role.role_id)
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=create_role, args=(index,)) for index in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(created_ids), self.THREADS)
+        self.assertEqual(len(set(created_ids)), self.THREADS)
+        self.assertEqual(Role.objects.filter(role_id__in=created_ids).count(), self.THREADS)
+
+    def test_open_role_creation_does_not_block_another(self):
+        """Allocating a role_id takes no lock that lives until the creating transaction commits"""
+        holding = threading.Event()
+        release = threading.Event()
+        errors = []
+
+        def slow_create():
+            try:
+                with transaction.atomic():
+                    serializer = RoleWithPermissionsCreateSerializer(data={
+                        'name': 'Slow Role',
+                        'permissions': {'/': {'view': True}},
+                    })
+                    serializer.is_valid(raise_exception=True)
+                    serializer.save()
+                    holding.set()
+                    release.wait(10)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                holding.set()
+                connection.close()
+
+        thread = threading.Thread(target=slow_create)
+        thread.start()
+        holding.wait(10)
+        try:
+            started = time.monotonic()
+            serializer = RoleWithPermissionsCreateSerializer(data={
+                'name': 'Fast Role',
+                'permissions': {'/': {'view': True}},
+            })
+            serializer.is_valid(raise_exception=True)
+            role = serializer.save()['role']
+            elapsed = time.monotonic() - started
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertLess(elapsed, 5)
+        self.assertEqual(Role.objects.filter(name__in=['Slow Role', 'Fast Role']).count(), 2)
+        self.assertNotEqual(Role.objects.get(name='Slow Role').role_id, role.role_id)
+
+    def test_explicit_role_id_is_never_allocated_again(self):
+        Role.objects.create(role_id='R050', name='Explicit Role')
+        reserve_role_id('R050')
+        self.assertEqual(allocate_role_id(), 'R051')
+        # Reserving a lower id doesn't move the sequence backwards
+        reserve_role_id('R010')
+        self.assertEqual(allocate_role_id(), 'R052')
+
+
+class PromoCodeRedemptionLoadTests(TransactionTestCase):
+    """Concurrent redemptions of one hot code must never exceed max_usage"""
+
+    THREADS = 40
+    ATTEMPTS_PER_THREAD = 50
+    MAX_USAGE = 500
+
+    def setUp(self):
+        now = timezone.now()
+        self.promo_code = PromoCode.objects.create(
+            code='HOTCODE',
+            discount_type=PromoCode.DISCOUNT_TYPE_PERCENTAGE,
+            discount_value=Decimal('20.00'),
+            start_date=now - timedelta(days=1),
+            expire_date=now + timedelta(days=1),
+            max_usage=self.MAX_USAGE,
+        )
+
+    def test_no_overselling_under_concurrent_redemptions(self):
+        barrier = threading.Barrier(self.THREADS)
+        successes = []
+        unexpected = []
+        lock = threading.Lock()
+
+        def redeem():
+            try:
+                barrier.wait()
+                for _ in range(self.ATTEMPTS_PER_THREAD):
+                    try:
+                        result = redeem_promo_code('hotcode', Decimal('100.00'))
+                    except PromoCodeRedemptionError as e:
+                        if e.reason != REASON_EXHAUSTED:
+                            with lock:
+                                unexpected.append(e.reason)
+                        continue
+                    with lock:
+                        successes.append(result['promo_code'].current_usage)
+            except Exception as e:
+                with lock:
+                    unexpected.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=redeem) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.promo_code.refresh_from_db()
+        self.assertEqual(unexpected, [])
+        self.assertEqual(len(successes), self.MAX_USAGE)
+        # Every successful redemption saw a distinct post-increment usage value
+        self.assertEqual(sorted(successes), list(range(1, self.MAX_USAGE + 1)))
+        self.assertEqual(self.promo_code.current_usage, self.MAX_USAGE)
+
+    def test_redeem_returns_discount(self):
+        result = redeem_promo_code('HOTCODE', Decimal('250.00'))
+        self.assertEqual(result['discount'], Decimal('50.00'))
+        self.assertEqual(result['final_amount'], Decimal('200.00'))
+        self.assertEqual(result['promo_code'].current_usage, 1)
+
+
+class StripedPromoCodeUsageTests(TransactionTestCase):
+    """Striped usage counters must never admit more than max_usage, even while reconciling"""
+
+    THREADS = 20
+    ATTEMPTS_PER_THREAD = 20
+    MAX_USAGE = 250
+    SLOTS = 8
+
+    def setUp(self):
+        now = timezone.now()
+        self.promo_code = PromoCode.objects.create(
+            code='STRIPED',
+            discount_type=PromoCode.DISCOUNT_TYPE_FIXED,
+            discount_value=Decimal('30.00'),
+            start_date=now - timedelta(days=1),
+            expire_date=now + timedelta(days=1),
+            max_usage=self.MAX_USAGE,
+            current_usage=10,
+        )
+        set_usage_slots(self.promo_code.id, self.SLOTS)
+
+    def test_no_overselling_with_concurrent_reconciliation(self):
+        barrier = threading.Barrier(self.THREADS)
+        done = threading.Event()
+        successes = []
+        unexpected = []
+        lock = threading.Lock()
+
+        def redeem():
+            try:
+                barrier.wait()
+                for _ in range(self.ATTEMPTS_PER_THREAD):
+                    try:
+                        redeem_promo_code('striped')
+                    except PromoCodeRedemptionError as e:
+                        if e.reason != REASON_EXHAUSTED:
+                            with lock:
+                                unexpected.append(e.reason)
+                        continue
+                    with lock:
+                        successes.append(1)
+            except Exception as e:
+                with lock:
+                    unexpected.append(e)
+            finally:
+                connection.close()
+
+        def reconcile():
+            try:
+                while not done.wait(0.05):
+                    reconcile_promo_usage(self.promo_code.id)
+            finally:
+                connection.close()
+
+        reconciler = threading.Thread(target=reconcile)
+        reconciler.start()
+        threads = [threading.Thread(target=redeem) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        done.set()
+        reconciler.join()
+
+        reconcile_promo_usage(self.promo_code.id)
+        self.promo_code.refresh_from_db()
+        self.assertEqual(unexpected, [])
+        self.assertEqual(len(successes), self.MAX_USAGE - 10)
+        self.assertEqual(self.promo_code.current_usage, self.MAX_USAGE)
+
+    def test_switching_back_to_single_row_keeps_the_count(self):
+        for _ in range(5):
+            redeem_promo_code('STRIPED')
+        set_usage_slots(self.promo_code.id, 0)
+        self.promo_code.refresh_from_db()
+        self.assertEqual(self.promo_code.current_usage, 15)
+        self.assertEqual(self.promo_code.usage_slot_rows.count(), 0)
+        self.assertEqual(redeem_promo_code('STRIPED')['promo_code'].current_usage, 16)
+
+
+class PromoCodeLifecycleTests(TransactionTestCase):
+    """The sweeper, PromoCode.save() and EFFECTIVE_STATUS_SQL must agree on effective_status"""
+
+    def create_promo_code(self, code, start_date, expire_date, **fields):
+        return PromoCode.objects.create(
+            code=code,
+            discount_type=PromoCode.DISCOUNT_TYPE_FIXED,
+            discount_value=Decimal('10.00'),
+            start_date=start_date,
+            expire_date=expire_date,
+            **fields
+        )
+
+    def test_sweeper_deactivates_expired_and_exhausted_codes(self):
+        now = timezone.now()
+        expired = self.create_promo_code('EXPIRED', now - timedelta(days=2), now + timedelta(days=1))
+        exhausted = self.create_promo_code('EXHAUSTED', now - timedelta(days=1), now + timedelta(days=1), max_usage=3)
+        live = self.create_promo_code('LIVE', now - timedelta(days=1), now + timedelta(days=1), max_usage=3)
+        # Time passes / uses are counted without going through save()
+        PromoCode.objects.filter(pk=expired.pk).update(expire_date=now - timedelta(hours=1))
+        PromoCode.objects.filter(pk=exhausted.pk).update(current_usage=3)
+
+        result = sweep_promo_codes()
+
+        self.assertEqual(result['deactivated'], 2)
+        expired.refresh_from_db()
+        exhausted.refresh_from_db()
+        live.refresh_from_db()
+        self.assertEqual(expired.status, PromoCode.STATUS_DEACTIVATE)
+        self.assertEqual(expired.effective_status, PromoCode.EFFECTIVE_STATUS_EXPIRED)
+        self.assertEqual(exhausted.status, PromoCode.STATUS_DEACTIVATE)
+        self.assertEqual(exhausted.effective_status, PromoCode.EFFECTIVE_STATUS_EXHAUSTED)
+        self.assertEqual(live.status, PromoCode.STATUS_ACTIVE)
+        self.assertEqual(live.effective_status, PromoCode.EFFECTIVE_STATUS_ACTIVE)
+
+    def test_sweeper_promotes_scheduled_codes(self):
+        now = timezone.now()
+        scheduled = self.create_promo_code('LATER', now + timedelta(hours=1), now + timedelta(days=1))
+        self.assertEqual(scheduled.effective_status, PromoCode.EFFECTIVE_STATUS_SCHEDULED)
+        PromoCode.objects.filter(pk=scheduled.pk).update(start_date=now - timedelta(minutes=1))
+
+        result = sweep_promo_codes()
+
+        scheduled.refresh_from_db()
+        self.assertEqual(result, {'deactivated': 0, 'updated': 1})
+        self.assertEqual(scheduled.status, PromoCode.STATUS_ACTIVE)
+        self.assertEqual(scheduled.effective_status, PromoCode.EFFECTIVE_STATUS_ACTIVE)
+
+    def test_python_and_sql_effective_status_agree(self):
+        now = timezone.now()
+        windows = {
+            'past': (now - timedelta(days=2), now - timedelta(days=1)),
+            'current': (now - timedelta(days=1), now + timedelta(days=1)),
+            'future': (now + timedelta(days=1), now + timedelta(days=2)),
+        }
+        for status in (PromoCode.STATUS_ACTIVE, PromoCode.STATUS_DEACTIVATE):
+            for window, (start_date, expire_date) in windows.items():
+                for current_usage in (0, 5):
+                    self.create_promo_code(
+                        f'{status[:3]}{window}{current_usage}'.upper(), start_date, expire_date,
+                        status=status, max_usage=5, current_usage=current_usage,
+                    )
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT id, {EFFECTIVE_STATUS_SQL} FROM {PromoCode._meta.db_table}")
+            sql_statuses = dict(cursor.fetchall())
+
+        promo_codes = list(PromoCode.objects.all())
+        self.assertEqual(len(promo_codes), 12)
+        self.assert_effective_status_agrees(promo_codes, sql_statuses)
+
+    def test_swept_exhausted_code_is_relabelled_expired(self):
+        now = timezone.now()
+        promo_code = self.create_promo_code('USEDUP', now - timedelta(days=2), now + timedelta(days=1), max_usage=2)
+        PromoCode.objects.filter(pk=promo_code.pk).update(current_usage=2)
+        sweep_promo_codes()
+        promo_code.refresh_from_db()
+        self.assertEqual(promo_code.status, PromoCode.STATUS_DEACTIVATE)
+        self.assertEqual(promo_code.effective_status, PromoCode.EFFECTIVE_STATUS_EXHAUSTED)
+
+        # Later the date window runs out as well
+        PromoCode.objects.filter(pk=promo_code.pk).update(expire_date=now - timedelta(hours=1))
+        self.assertEqual(sweep_promo_codes(), {'deactivated': 0, 'updated': 1})
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT id, {EFFECTIVE_STATUS_SQL} FROM {PromoCode._meta.db_table}")
+            sql_statuses = dict(cursor.fetchall())
+        promo_code.refresh_from_db()
+        self.assertEqual(promo_code.effective_status, PromoCode.EFFECTIVE_STATUS_EXPIRED)
+        self.assert_effective_status_agrees([promo_code], sql_statuses)
+
+    def assert_effective_status_agrees(self, promo_codes, sql_statuses):
+        """Stored effective_status, compute_effective_status() and EFFECTIVE_STATUS_SQL all match"""
+        for promo_code in promo_codes:
+            self.assertEqual(promo_code.compute_effective_status(), sql_statuses[promo_code.id], promo_code.code)
+            self.assertEqual(promo_code.effective_status, sql_statuses[promo_code.id], promo_code.code)
+
+    def test_save_counts_unreconciled_striped_uses(self):
+        now = timezone.now()
+        promo_code = self.create_promo_code('STRIPEDSAVE', now - timedelta(days=1), now + timedelta(days=1), max_usage=4)
+        set_usage_slots(promo_code.id, 2)
+        for _ in range(4):
+            redeem_promo_code('STRIPEDSAVE')
+
+        promo_code = PromoCode.objects.get(pk=promo_code.pk)
+        self.assertEqual(promo_code.current_usage, 0)
+        promo_code.discount_value = Decimal('12.00')
+        promo_code.save()
+        self.assertEqual(promo_code.effective_status, PromoCode.EFFECTIVE_STATUS_EXHAUSTED)
+
+
+def square(min_lng, min_lat, max_lng, max_lat):
+    return [(min_lng, min_lat), (max_lng, min_lat), (max_lng, max_lat), (min_lng, max_lat), (min_lng, min_lat)]
+
+
+def square_wkt(min_lng, min_lat, max_lng, max_lat):
+    return 'POLYGON((' + ', '.join(f'{lng} {lat}' for lng, lat in square(min_lng, min_lat, max_lng, max_lat)) + '))'
+
+
+def indexed_zones(*specs):
+    """IndexedZones from (zone_id, priority, ring) tuples, ranked the way _active_zone_rows() orders them"""
+    specs = sorted(specs, key=lambda spec: (-spec[1], -spec[0]))
+    return [
+        IndexedZone(zone_id, f'Zone {zone_id}', priority, None, None, None, ring=ring, rank=rank)
+        for rank, (zone_id, priority, ring) in enumerate(specs)
+    ]
+
+
+class ZoneGeometryTests(TransactionTestCase):
+    """WKT parsing, the point-in-polygon test and the in-memory grid index"""
+
+    def test_parse_wkt_polygon(self):
+        self.assertEqual(
+            parse_wkt_polygon(' polygon (( 0 0, 1 0, 1 1 , 0 0, )) '),
+            [(0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 0.0)],
+        )
+        self.assertEqual(parse_wkt_polygon('POLYGON((-1.5 2, 3 2, 3 4.25, -1.5 2))')[2], (3.0, 4.25))
+        for value in (None, '', 'POINT(0 0)', 'POLYGON(0 0, 1 0, 1 1, 0 0)', 'POLYGON((0 0, 1 0 5, 1 1, 0 0))',
+                      'POLYGON((0 0, 1 x, 1 1, 0 0))', 'POLYGON((0 0, 1 0, 0 0))'):
+            with self.assertRaises(ValueError, msg=value):
+                parse_wkt_polygon(value)
+
+    def test_point_in_ring(self):
+        # L shape: the square (0,0)-(2,2) without its top right quarter
+        ring = [(0, 0), (2, 0), (2, 1), (1, 1), (1, 2), (0, 2), (0, 0)]
+        self.assertTrue(point_in_ring(0.5, 0.5, ring))
+        self.assertTrue(point_in_ring(1.5, 0.5, ring))
+        self.assertTrue(point_in_ring(0.5, 1.5, ring))
+        self.assertFalse(point_in_ring(1.5, 1.5, ring))
+        self.assertFalse(point_in_ring(-0.5, 0.5, ring))
+        self.assertFalse(point_in_ring(0.5, 2.5, ring))
+
+    def test_locate_prefers_higher_priority_between_overlapping_zones(self):
+        index = ZoneIndex(indexed_zones(
+            (1, 0, square(0, 0, 0.2, 0.2)),
+            (2, 5, square(0.1, 0.1, 0.3, 0.3)),
+            (3, 5, square(0.15, 0.15, 0.25, 0.25)),
+        ))
+        self.assertFalse(index.large)
+        self.assertEqual(index.locate(0.05, 0.05).zone_id, 1)
+        # Same priority: the newer zone (higher id) wins
+        self.assertEqual(index.locate(0.2, 0.2).zone_id, 3)
+        self.assertEqual(index.locate(0.12, 0.12).zone_id, 2)
+        self.assertEqual(index.locate(0.28, 0.28).zone_id, 2)
+        self.assertIsNone(index.locate(0.5, 0.5))
+
+    def test_large_zones_are_ranked_against_cell_zones(self):
+        country = square(-10, -10, 10, 10)
+        city = square(1, 1, 1.1, 1.1)
+        self.assertGreater((20 / 0.05) ** 2, MAX_CELLS_PER_ZONE)
+
+        # Large zone better than the cell's zone
+        index = ZoneIndex(indexed_zones((1, 9, country), (2, 1, city)))
+        self.assertEqual([zone.zone_id for zone in index.large], [1])
+        self.assertEqual(index.locate(1.05, 1.05).zone_id, 1)
+
+        # Cell zone better than the large one; the large one still answers outside the cell zone
+        index = ZoneIndex(indexed_zones((1, 1, country), (2, 9, city)))
+        self.assertEqual(index.locate(1.05, 1.05).zone_id, 2)
+        self.assertEqual(index.locate(1.2, 1.05).zone_id, 1)
+        self.assertEqual(index.locate(-5, -5).zone_id, 1)
+        self.assertIsNone(index.locate(20, 20))
+
+        # Two large zones and a cell zone ranked between them
+        index = ZoneIndex(indexed_zones((1, 9, square(0.5, 0.5, 20, 20)), (2, 5, city), (3, 1, country)))
+        self.assertEqual([zone.zone_id for zone in index.large], [1, 3])
+        self.assertEqual(index.locate(1.05, 1.05).zone_id, 1)
+        self.assertEqual(index.locate(0.2, 0.2).zone_id, 3)
+
+
+class ZoneBatchTests(TransactionTestCase):
+    """classify_points() must give ZoneIndex.locate()'s answer for every point"""
+
+    def test_classify_points_matches_locate(self):
+        rng = np.random.default_rng(7)
+        specs = [
+            (1, 0, square(-10, -10, 10, 10)),  # large zone, lowest priority
+            (2, 9, square(0.5, 0.5, 20, 20)),  # large zone, highest priority
+            (3, 5, [(0, 0), (0.4, 0), (0.4, 0.2), (0.2, 0.2), (0.2, 0.4), (0, 0.4), (0, 0)]),  # concave
+        ]
+        for zone_id in range(4, 40):
+            min_lng, min_lat = rng.uniform(-1, 1, 2)
+            width, height = rng.uniform(0.01, 0.3, 2)
+            specs.append((zone_id, int(rng.integers(0, 10)), square(min_lng, min_lat, min_lng + width, min_lat + height)))
+        index = ZoneIndex(indexed_zones(*specs))
+        self.assertEqual(len(index.large), 2)
+
+        lat = np.concatenate([rng.uniform(-1.5, 1.5, 20000), rng.uniform(-15, 25, 2000), [0.1, 0.3, 0.05, 0.5, 30]])
+        lng = np.concatenate([rng.uniform(-1.5, 1.5, 20000), rng.uniform(-15, 25, 2000), [0.1, 0.3, 0.1, 0.5, 30]])
+        zone_ids = classify_points(lat, lng, index)
+
+        expected = []
+        for point_lat, point_lng in zip(lat.tolist(), lng.tolist()):
+            zone = index.locate(point_lat, point_lng)
+            expected.append(zone.zone_id if zone is not None else NO_ZONE)
+        self.assertEqual(zone_ids.tolist(), expected)
+        self.assertIn(NO_ZONE, expected)
+        self.assertEqual(len(set(expected)), len(specs) + 1)
+
+    def test_classify_points_without_zones(self):
+        self.assertEqual(classify_points([0.1, 0.2], [0.1, 0.2], ZoneIndex([])).tolist(), [NO_ZONE, NO_ZONE])
+        self.assertEqual(classify_points([], [], ZoneIndex([])).tolist(), [])
+
+    def test_benchmark_rejects_empty_runs(self):
+        Zone.objects.create(zone_name='Benchmark', boundary=square_wkt(0, 0, 1, 1))
+        for options in ({'repeat': 0}, {'points': 0}):
+            with self.assertRaises(CommandError):
+                call_command('benchmark_zone_locate', **options)
+
+
+@override_settings(CACHE_GENERATION_CHECK_INTERVAL=0)
+class ZoneLocateTests(TransactionTestCase):
+    """locate_zone() from the index and from SQL, and index invalidation on zone writes"""
+
+    def setUp(self):
+        _index[0] = None
+        self.overlap_point = (0.15, 0.15)  # (lat, lng) inside both zones
+        self.region = Zone.objects.create(zone_name='Region', priority=1, boundary=square_wkt(0, 0, 0.2, 0.2))
+        self.centre = Zone.objects.create(zone_name='Centre', priority=5, boundary=square_wkt(0.1, 0.1, 0.3, 0.3))
+        Zone.objects.create(zone_name='Disabled', priority=9, status=False, boundary=square_wkt(0, 0, 1, 1))
+        Zone.objects.create(zone_name='No boundary', priority=9)
+
+    def tearDown(self):
+        self.wait_for_rebuild()
+        _index[0] = None
+
+    def wait_for_rebuild(self):
+        deadline = time.monotonic() + 10
+        while _rebuilding[0] and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_index_and_sql_agree(self):
+        index = build_zone_index()
+        self.assertEqual(index.size, 2)
+        points = [self.overlap_point, (0.05, 0.05), (0.25, 0.25), (0.5, 0.5), (0.05, 0.25)]
+        for lat, lng in points:
+            from_index = index.locate(lat, lng)
+            from_sql = locate_zone_sql(lat, lng)
+            self.assertEqual(
+                from_index.zone_id if from_index else None,
+                from_sql.zone_id if from_sql else None,
+                (lat, lng),
+            )
+        self.assertEqual(locate_zone_sql(*self.overlap_point).zone_id, self.centre.zone_id)
+        self.assertEqual(locate_zone_sql(0.05, 0.05).zone_id, self.region.zone_id)
+        self.assertIsNone(locate_zone_sql(0.5, 0.5))
+
+    def test_cold_index_answers_from_sql_and_rebuilds(self):
+        self.assertIsNone(_index[0])
+        self.assertEqual(locate_zone(*self.overlap_point), {
+            'zone_id': self.centre.zone_id,
+            'zone_name': 'Centre',
+            'priority': 5,
+            'country': None,
+            'state': None,
+            'city': None,
+        })
+        self.wait_for_rebuild()
+        self.assertIsNotNone(_index[0])
+        self.assertEqual(_index[0][0], current_generation(ZONE_INDEX_GENERATION))
+        self.assertEqual(get_zone_index().locate(*self.overlap_point).zone_id, self.centre.zone_id)
+
+    def test_zone_detail_update_invalidates_index(self):
+        index = get_zone_index(wait=True)
+        generation = current_generation(ZONE_INDEX_GENERATION)
+        self.assertEqual(index.locate(*self.overlap_point).zone_id, self.centre.zone_id)
+
+        admin = DjangoUser.objects.create_user(username='zone-admin', email='zone-admin@example.com', password='secret')
+        AdminProfile.objects.create(user=admin, role=AdminProfile.ROLE_ADMIN)
+        client = APIClient()
+        client.force_authenticate(user=admin)
+        response = client.put(
+            f'/api/auth/zones/{self.centre.zone_id}/',
+            {'boundary': square_wkt(0.5, 0.5, 0.6, 0.6)},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+
+        self.assertGreater(current_generation(ZONE_INDEX_GENERATION), generation)
+        self.assertIsNone(get_zone_index())  # stale: rebuilding in the background
+        self.assertEqual(locate_zone(*self.overlap_point)['zone_id'], self.region.zone_id)
+        self.wait_for_rebuild()
+        index = get_zone_index()
+        self.assertIsNotNone(index)
+        self.assertEqual(index.locate(*self.overlap_point).zone_id, self.region.zone_id)
+        self.assertEqual(index.locate(0.55, 0.55).zone_id, self.centre.zone_id)
@@ -2,11 +2,11 @@ from django.urls import path
 from .views import (
     ride_user_count, rides_users_list, login_view, admin_login_view,
     admin_logout_view, admin_refresh_token_view,
-    promo_code_create, promo_codes_list, promo_code_detail,
-    zones_list, zone_detail,
+    promo_code_create, promo_codes_generate, promo_code_validate, promo_code_redeem, promo_codes_list, promo_code_detail,
+    zones_list, zones_facets, zones_import, zones_export, zone_detail, zone_locate, zone_locate_batch,
     send_welcome_email,
     user_signup_view, user_login_view,
-    users_list, user_detail,
+    users_list, users_bulk_create, user_detail,
     roles_list, role_detail, roles_basic_list,
     role_with_permissions_create, role_with_permissions_update,
     role_permissions_list, role_permission_detail, role_permission_detail_by_id, role_permissions_by_role,
@@ -25,6 +25,7 @@ urlpatterns = [
     
     # User CRUD endpoints
     path('auth/users/', users_list, name='users-list'),  # GET (list all), POST (create)
+    path('auth/users/bulk/', users_bulk_create, name='users-bulk-create'),  # POST (CSV or JSON array)
     path('auth/users/<int:id>/', user_detail, name='user-detail'),  # GET, PUT, PATCH, DELETE
     
     # Role CRUD endpoints
@@ -61,12 +62,20 @@ urlpatterns = [
     # Promo code endpoints
     path('auth/promo-codes/', promo_codes_list, name='promo-codes-list'),
     path('auth/promo-codes/create/', promo_code_create, name='promo-code-create'),
+    path('auth/promo-codes/generate/', promo_codes_generate, name='promo-codes-generate'),  # POST (bulk generate from a template, CSV response)
     path('auth/promo-code-create/', promo_code_create, name='promo-code-create-alias'),  # Alias for convenience
     path('auth/promo-codes/<int:pk>/', promo_code_detail, name='promo-code-detail'),
+    path('promo-codes/validate/', promo_code_validate, name='promo-code-validate'),  # POST (checkout: quote from the in-memory cache)
+    path('promo-codes/redeem/', promo_code_redeem, name='promo-code-redeem'),  # POST (checkout: consume one use atomically)
     
     # Zone management endpoints (protected)
     path('auth/zones/', zones_list, name='zones-list'),  # GET /api/auth/zones/ - list, POST /api/auth/zones/ - create
+    path('auth/zones/facets/', zones_facets, name='zones-facets'),  # GET country/state/city counts
+    path('auth/zones/import/', zones_import, name='zones-import'),  # POST GeoJSON FeatureCollection / CSV
+    path('auth/zones/export/', zones_export, name='zones-export'),  # GET streamed GeoJSON (?export=csv for CSV)
     path('auth/zones/<int:id>/', zone_detail, name='zone-detail'),  # GET, PUT, DELETE /api/auth/zones/{id}/
+    path('zones/locate/batch/', zone_locate_batch, name='zone-locate-batch'),  # POST many points (JSON or packed float64)
+    path('zones/locate/', zone_locate, name='zone-locate'),  # GET ?lat=&lng= (highest-priority active zone at a point)
     
     # Email endpoints
     path('auth/send-welcome-email/', send_welcome_email, name='send-welcome-email'),
@@ -9,14 +9,30 @@ from django.conf import settings
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
 from django.db import connection
-from django.core.mail import send_mail
-from threading import Thread
+from django.utils import timezone
 from .models import RidesUser, PromoCode, AdminProfile, Zone, User as FrontendUser, Role, RolePermission, UserRole
+from .authentication import FrontendTokenUser, invalidate_user_state
+from .schema_registry import get_rides_user_phone_column
+from .row_counts import get_estimated_count, get_exact_count
+from .email_outbox import enqueue_email, enqueue_emails
+from .password_hashing import PasswordHashingBusy, is_password_hashed, verify_password
+from .promo_cache import invalidate_all_promo_codes, invalidate_promo_code, record_usage, validate_and_quote
+from .promo_generation import PromoCodeSpaceExhausted, generate_promo_codes
+from .zone_index import locate_zone
+from .zone_search import search_zones, zone_facets
+from .promo_redemption import (
+    REASON_EXHAUSTED, REASON_NOT_FOUND, PromoCodeRedemptionError, redeem_promo_code
+)
+from .permission_cache import (
+    bump_role_version, get_permissions_for_roles, get_role_ids_for_users, get_role_name, get_role_names_for_users,
+    is_admin_role, is_superadmin_role, resolve_role_id, role_alias_key, role_permissions_etag
+)
 from django.contrib.auth import get_user_model
 
 User = get_user_model()  # Django's default User model (auth_user)
 from .serializers import (
-    PromoCodeSerializer, PromoCodeCreateSerializer, PromoCodeUpdateSerializer,
+    PromoCodeSerializer, PromoCodeCreateSerializer, PromoCodeUpdateSerializer, PromoCodeGenerateSerializer,
+    PromoCodeRedeemSerializer,
     AdminLoginSerializer, AdminProfileSerializer,
     ZoneSerializer, ZoneCreateSerializer, ZoneUpdateSerializer,
     UserSignupSerializer, UserLoginSerializer, UserLoginRequestSerializer,
@@ -25,9 +41,9 @@ from .serializers import (
     RolePermissionSerializer, RolePermissionCreateSerializer, RolePermissionUpdateSerializer,
     UserRoleSerializer, UserRoleCreateSerializer, UserRoleUpdateSerializer,
     RoleWithPermissionsCreateSerializer, RolePermissionsBulkUpdateSerializer,
-    RoleWithPermissionsUpdateSerializer
+    RoleWithPermissionsUpdateSerializer, RolePermissionsPatchSerializer, PermissionMatrixConflict
 )
-from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth.hashers import make_password
 
 # Use AllowAny in DEBUG mode for easier testing, IsAuthenticated in production
 AUTH_PERMISSION = AllowAny if settings.DEBUG else IsAuthenticated
@@ -113,58 +129,36 @@ def _validate_gmail_credentials():
     return True, None
 
 
-def _send_email_sync(user_id, plain_password, recipient_email):
+def _build_credentials_email(user, plain_password, role_ids=None):
     """
-    Internal function to send email synchronously (called in background thread)
+    Build the subject and body of the credentials email for a user
     
     Args:
-        user_id: User ID to fetch user from database
+        user: FrontendUser instance
         plain_password: Plain text password
-        recipient_email: Email address to send to
+        role_ids: The user's role_ids if already known (bulk callers resolve them in one query)
+    
+    Returns:
+        tuple: (subject: str, body: str)
     """
-    try:
-        # Fetch user from database (needed for thread safety)
-        user = FrontendUser.objects.get(pk=user_id)
-        
-        # Check if using console backend (doesn't need credentials)
-        is_console_backend = settings.EMAIL_BACKEND == 'django.core.mail.backends.console.EmailBackend'
-        
-        # Only check SMTP credentials if not using console backend
-        if not is_console_backend:
-            # Validate email credentials format
-            is_valid, validation_error = _validate_gmail_credentials()
-            if not is_valid:
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.warning(f"Email configuration issue: {validation_error}")
-                # Continue anyway - let SMTP error handling catch it with better messages
-        
-        # Get role name(s) using the get_roles() method
-        roles = user.get_roles()
-        if roles.exists():
-            role_names = ", ".join([role.name for role in roles])
-            role_info = f"{role_names} ({', '.join([role.role_id for role in roles])})"
-        elif user.role_id:
-            # Fallback: try to get role by role_id if get_roles() didn't find it
-            try:
-                from .models import Role
-                role = Role.objects.filter(role_id=str(user.role_id)).first()
-                if role:
-                    role_info = f"{role.name} ({role.role_id})"
-                else:
-                    role_info = f"Role ID: {user.role_id}"
-            except Exception:
-                role_info = f"Role ID: {user.role_id}"
-        else:
-            role_info = "No role assigned"
-        
-        # Create email subject
-        subject = 'Your Account Credentials - Rudra Admin'
-        
-        # Build email body with all user data
-        phone_info = f"\nPhone Number: {user.phone_number}" if user.phone_number else ""
-        
-        email_body = f"""
+    # Role names come from the cached role resolution (no per-email role queries)
+    if role_ids is None:
+        role_ids = get_role_ids_for_users([user]).get(user.id, [])
+    if role_ids:
+        role_names = ", ".join([get_role_name(role_id) or role_id for role_id in role_ids])
+        role_info = f"{role_names} ({', '.join(role_ids)})"
+    elif user.role_id:
+        role_info = f"Role ID: {user.role_id}"
+    else:
+        role_info = "No role assigned"
+    
+    # Create email subject
+    subject = 'Your Account Credentials - Rudra Admin'
+    
+    # Build email body with all user data
+    phone_info = f"\nPhone Number: {user.phone_number}" if user.phone_number else ""
+    
+    email_body = f"""
 Hello {user.name},
 
 Your account has been successfully created. Please find your login credentials below:
@@ -188,75 +182,16 @@ You can now login using your email and password.
 Best regards,
 Rudra Admin Team
         """
-        
-        # Set from_email based on backend type
-        if is_console_backend:
-            from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@rudraadmin.com')
-        else:
-            from_email = settings.DEFAULT_FROM_EMAIL or settings.EMAIL_HOST_USER or 'noreply@rudraadmin.com'
-        
-        # Send email with real-time delivery
-        try:
-            send_mail(
-                subject=subject,
-                message=email_body,
-                from_email=from_email,
-                recipient_list=[recipient_email],
-                fail_silently=False,
-            )
-            
-            import logging
-            logger = logging.getLogger(__name__)
-            if is_console_backend:
-                logger.info(f"Email printed to console for {recipient_email} (user: {user.name})")
-            else:
-                logger.info(f"✅ Email delivered successfully to {recipient_email} for user {user.name}")
-        except Exception as email_error:
-            # Handle Gmail-specific authentication errors with helpful guidance
-            import logging
-            logger = logging.getLogger(__name__)
-            error_str = str(email_error)
-            
-            # Check for Gmail authentication errors
-            if '535' in error_str or 'BadCredentials' in error_str or 'Username and Password not accepted' in error_str:
-                error_msg = (
-                    f"❌ Gmail Authentication Failed for {recipient_email}:\n"
-                    f"   Error: {error_str}\n\n"
-                    f"   SOLUTION:\n"
-                    f"   1. Verify your Gmail App Password is correct:\n"
-                    f"      - Go to: https://myaccount.google.com/apppasswords\n"
-                    f"      - Make sure 2-Step Verification is enabled\n"
-                    f"      - Generate a NEW App Password for 'Mail'\n"
-                    f"      - Copy the 16-character password (no spaces)\n"
-                    f"   2. Update settings.py:\n"
-                    f"      EMAIL_HOST_PASSWORD = 'your-new-app-password'\n"
-                    f"   3. Restart Django server after updating\n"
-                    f"   4. For testing, you can use console backend:\n"
-                    f"      EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'"
-                )
-                logger.error(error_msg)
-            else:
-                logger.error(f"❌ Failed to deliver email to {recipient_email}: {error_str}")
-            raise
-        
-    except FrontendUser.DoesNotExist:
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.error(f"User with ID {user_id} not found when sending email")
-    except Exception as e:
-        # Log error but don't fail
-        import logging
-        logger = logging.getLogger(__name__)
-        error_msg = str(e)
-        logger.error(f"Failed to send email to {recipient_email}: {error_msg}")
+    return subject, email_body
 
 
 def send_user_credentials_email_async(user, plain_password, recipient_email=None):
     """
     Send email with user credentials asynchronously (real-time, non-blocking)
     
-    This function starts a background thread to send the email, allowing the API
-    to respond immediately while the email is sent in the background.
+    The email is written to the database outbox (frontend_email_outbox) and delivered by the
+    SMTP worker pool in email_outbox.py, so the API responds immediately and queued mail
+    survives worker restarts.
     
     Args:
         user: FrontendUser instance
@@ -281,13 +216,9 @@ def send_user_credentials_email_async(user, plain_password, recipient_email=None
         is_console_backend = settings.EMAIL_BACKEND == 'django.core.mail.backends.console.EmailBackend'
         
         if is_console_backend:
-            # Console backend doesn't need credentials, start thread immediately
-            email_thread = Thread(
-                target=_send_email_sync,
-                args=(user.id, plain_password, recipient_email),
-                daemon=True
-            )
-            email_thread.start()
+            # Console backend doesn't need credentials, queue immediately
+            subject, email_body = _build_credentials_email(user, plain_password)
+            enqueue_email(subject, email_body, recipient_email)
             return True, None
         
         # Check if email is configured (for SMTP backend)
@@ -325,65 +256,26 @@ def send_user_credentials_email_async(user, plain_password, recipient_email=None
             logger.warning("Email credentials are placeholder values - email not sent")
             return False, error_msg
         
-        # Start email sending in background thread
-        email_thread = Thread(
-            target=_send_email_sync,
-            args=(user.id, plain_password, recipient_email),
-            daemon=True  # Thread will terminate when main process exits
-        )
-        email_thread.start()
+        # Validate email credentials format (warn only - SMTP errors are logged by the outbox worker)
+        is_valid, validation_error = _validate_gmail_credentials()
+        if not is_valid:
+            import logging
+            logger = logging.getLogger(__name__)
+            logger.warning(f"Email configuration issue: {validation_error}")
+        
+        # Queue the email; the outbox worker pool delivers it in the background
+        subject, email_body = _build_credentials_email(user, plain_password)
+        enqueue_email(subject, email_body, recipient_email)
         
         return True, None
     except Exception as e:
         import logging
         logger = logging.getLogger(__name__)
-        error_msg = f"Failed to start email thread: {str(e)}"
+        error_msg = f"Failed to queue email: {str(e)}"
         logger.error(error_msg)
         return False, error_msg
 
 
-def fix_promo_sequence():
-    """
-    Automatically fix PromoCode ID sequence to ensure sequential IDs.
-    This is called before creating new promo codes to prevent ID gaps.
-    """
-    try:
-        with connection.cursor() as cursor:
-            table_name = PromoCode._meta.db_table
-            
-            # Get maximum ID
-            cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table_name};")
-            max_id = cursor.fetchone()[0]
-            
-            # Get sequence name
-            cursor.execute(f"SELECT pg_get_serial_sequence('{table_name}', 'id');")
-            seq_result = cursor.fetchone()
-            sequence_name = seq_result[0] if seq_result and seq_result[0] else None
-            
-            if not sequence_name:
-                # Try alternative sequence name
-                sequence_name = f'{table_name}_id_seq'
-            
-            if sequence_name:
-                # Remove schema prefix if present
-                seq_for_setval = sequence_name.split('.')[-1] if '.' in sequence_name else sequence_name
-                
-                # Set sequence to max_id with true, so the next nextval() will return max_id + 1
-                # Using true means "use this value", so next nextval() will be max_id + 1
-                # This ensures sequential IDs without gaps
-                cursor.execute(f"SELECT setval('{seq_for_setval}', {max_id}, true);")
-                return True
-                    
-    except Exception as e:
-        # Silently fail - don't break promo code creation if sequence fix fails
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.warning(f"Failed to fix promo sequence: {str(e)}")
-        return False
-    
-    return False
-
-
 class IsAdminUser(BasePermission):
     """
     Custom permission to only allow users with admin or superadmin roles.
@@ -393,6 +285,10 @@ class IsAdminUser(BasePermission):
         if not request.user or not request.user.is_authenticated:
             return False
         
+        # Token-backed users carry the admin flags as claims
+        if isinstance(request.user, FrontendTokenUser):
+            return request.user.is_active and request.user.is_admin
+        
         # Check if user has admin profile
         try:
             admin_profile = request.user.admin_profile
@@ -411,6 +307,10 @@ class IsSuperAdminUser(BasePermission):
         if not request.user or not request.user.is_authenticated:
             return False
         
+        # Token-backed users carry the admin flags as claims
+        if isinstance(request.user, FrontendTokenUser):
+            return request.user.is_active and request.user.is_superadmin
+        
         # Check if user has admin profile and is superadmin
         try:
             admin_profile = request.user.admin_profile
@@ -532,6 +432,26 @@ def login_view(request):
         }, status=status.HTTP_401_UNAUTHORIZED)
 
 
+def _login_busy_response():
+    """503 when the password hashing pool is saturated (PASSWORD_HASH_MAX_QUEUE reached)"""
+    response = Response({
+        'message_type': 'error',
+        'error': 'Too many login attempts in progress. Please try again in a moment.'
+    }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response['Retry-After'] = '1'
+    return response
+
+
+def _password_hashing_busy_response():
+    """503 when a user write can't get its password hashed (pool saturated, see password_hashing.py)"""
+    response = Response({
+        'message_type': 'error',
+        'error': 'Server is busy processing passwords. Please try again in a moment.'
+    }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response['Retry-After'] = '1'
+    return response
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])  # Allow public access to admin login
 def admin_login_view(request):
@@ -607,8 +527,12 @@ def admin_login_view(request):
             'error': 'Your account has been deactivated. Please contact an administrator.'
         }, status=status.HTTP_403_FORBIDDEN)
     
-    # Verify password
-    if not check_password(password, user.password):
+    # Verify password (on the bounded hashing pool; see password_hashing.py)
+    try:
+        password_ok = verify_password(password, user.password, user_id=user.id)
+    except PasswordHashingBusy:
+        return _login_busy_response()
+    if not password_ok:
         # Password doesn't match - provide helpful message
         import logging
         logger = logging.getLogger(__name__)
@@ -624,50 +548,27 @@ def admin_login_view(request):
     is_superadmin = False
     role_name = None
     
-    # Check role_id in frontend_users table
-    # Handle both string (e.g., 'R001', '1') and integer values
+    # Canonicalise role_id once ('1', 'R001', 'r001', 'R1' are the same role) from the cached alias table
     role_id_str = str(user.role_id) if user.role_id is not None else None
-    found_role = None
+    canonical_role_id = resolve_role_id(role_id_str)
+    role_alias = role_alias_key(role_id_str) if role_id_str else None
     
-    if role_id_str in ['1', '2', 1, 2]:
+    if role_alias in ['1', '2']:
         is_admin = True
-        is_superadmin = (role_id_str in ['1', 1])
-        # Get role name from Role table - try multiple lookup methods
-        try:
-            from .models import Role
-            from django.db.models import Q
-            # Try exact match first
-            found_role = Role.objects.filter(role_id=role_id_str).first()
-            # If not found, try "R001", "R002" format
-            if not found_role:
-                if role_id_str == '1':
-                    found_role = Role.objects.filter(Q(role_id__iexact='R001') | Q(role_id='R001')).first()
-                elif role_id_str == '2':
-                    found_role = Role.objects.filter(Q(role_id__iexact='R002') | Q(role_id='R002')).first()
-            # If still not found, try case-insensitive
-            if not found_role:
-                found_role = Role.objects.filter(Q(role_id__iexact=role_id_str) | Q(role_id=role_id_str)).first()
-            
-            if found_role:
-                role_name = found_role.name
-            else:
-                role_name = "Super Admin" if role_id_str in ['1', 1] else "Admin"
-        except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.warning(f"Error looking up role: {str(e)}")
-            role_name = "Super Admin" if role_id_str in ['1', 1] else "Admin"
+        is_superadmin = (role_alias == '1')
+        role_name = get_role_name(canonical_role_id) if canonical_role_id else None
+        if not role_name:
+            role_name = "Super Admin" if is_superadmin else "Admin"
     else:
         # Check UserRole table for admin roles
         try:
-            from .models import UserRole, Role
             user_roles = UserRole.objects.filter(user=user, is_active=True).select_related('role')
             for user_role in user_roles:
                 # Check if role_id indicates admin (1 or 2) or check role name
                 role_obj = user_role.role
-                if role_obj.role_id in ['1', '2', 'R001', 'R002'] or 'admin' in role_obj.name.lower():
+                if role_alias_key(role_obj.role_id) in ['1', '2'] or 'admin' in role_obj.name.lower():
                     is_admin = True
-                    if 'super' in role_obj.name.lower() or role_obj.role_id in ['1', 'R001']:
+                    if 'super' in role_obj.name.lower() or role_alias_key(role_obj.role_id) == '1':
                         is_superadmin = True
                     role_name = role_obj.name
                     break
@@ -699,6 +600,8 @@ def admin_login_view(request):
         refresh['user_type'] = 'frontend_user'
         refresh['is_admin'] = True
         refresh['is_superadmin'] = is_superadmin
+        refresh['is_active'] = user.is_active
+        refresh['role_id'] = user.role_id
         
         access_token = refresh.access_token
         access_token['user_id'] = user.id
@@ -706,6 +609,8 @@ def admin_login_view(request):
         access_token['user_type'] = 'frontend_user'
         access_token['is_admin'] = True
         access_token['is_superadmin'] = is_superadmin
+        access_token['is_active'] = user.is_active
+        access_token['role_id'] = user.role_id
     except Exception as e:
         return Response({
             'message_type': 'error',
@@ -713,128 +618,14 @@ def admin_login_view(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
     # Get user permissions - get all permissions for the user's role(s)
+    # The canonical role's matrix comes from the permission cache (one JOIN query when cold);
+    # UserRole assignments are used when role_id doesn't resolve to a role.
     permissions = {}
     try:
-        from django.db import connection
-        from .models import Role, RolePermission, UserRole
-        import logging
-        logger = logging.getLogger(__name__)
-        
-        role_id_str = str(user.role_id) if user.role_id else None
-        logger.info(f"Fetching permissions for user {user.id} with role_id: {role_id_str}")
-        
-        # Strategy 1: Use raw SQL to get all permissions directly (most reliable)
-        # This ensures we get all 52 permissions regardless of role lookup issues
-        if role_id_str:
-            try:
-                with connection.cursor() as cursor:
-                    # First, find what role_ids exist in the Role table that might match
-                    # This helps us find the correct role_id format
-                    cursor.execute("""
-                        SELECT DISTINCT role_id 
-                        FROM frontend_role 
-                        WHERE role_id = %s OR role_id = %s OR role_id ILIKE %s
-                    """, [role_id_str, f"R{role_id_str.zfill(3)}", f"%{role_id_str}%"])
-                    existing_roles = [row[0] for row in cursor.fetchall()]
-                    
-                    # Build list of role_ids to try
-                    role_ids_to_try = [role_id_str]
-                    
-                    # Add existing roles from database
-                    if existing_roles:
-                        role_ids_to_try.extend(existing_roles)
-                    
-                    # Add common variations
-                    if role_id_str == '1':
-                        role_ids_to_try.extend(['R001', 'R1', 'r001', '1'])
-                    elif role_id_str == '2':
-                        role_ids_to_try.extend(['R002', 'R2', 'r002', '2'])
-                    else:
-                        # For other role_ids, try R### format
-                        try:
-                            num = int(role_id_str)
-                            role_ids_to_try.append(f"R{num:03d}")
-                        except ValueError:
-                            pass
-                    
-                    # Remove duplicates while preserving order
-                    seen = set()
-                    role_ids_to_try = [rid for rid in role_ids_to_try if not (rid in seen or seen.add(rid))]
-                    
-                    logger.info(f"Trying role_ids: {role_ids_to_try}")
-                    
-                    # Try each role_id variation until we find permissions
-                    for rid in role_ids_to_try:
-                        cursor.execute("""
-                            SELECT page_path, permission_type, is_allowed 
-                            FROM frontend_role_permissions 
-                            WHERE role_id = %s
-                        """, [rid])
-                        rows = cursor.fetchall()
-                        
-                        if rows:
-                            # Build permissions dictionary from SQL results
-                            for row in rows:
-                                page_path, permission_type, is_allowed = row
-                                permissions.setdefault(page_path, {})[permission_type] = bool(is_allowed)
-                            
-                            # If we found permissions, log and break
-                            if permissions:
-                                logger.info(f"✅ Found {len(rows)} permissions for role_id: {rid}")
-                                break
-                    
-                    # Log final result
-                    if permissions:
-                        logger.info(f"✅ Total permissions retrieved: {sum(len(perms) for perms in permissions.values())}")
-                    else:
-                        logger.warning(f"❌ No permissions found for any role_id variation. Tried: {role_ids_to_try}")
-                        
-            except Exception as e:
-                logger.error(f"Error fetching permissions via raw SQL: {str(e)}", exc_info=True)
-        
-        # Strategy 2: Fallback to ORM if raw SQL didn't work
-        if not permissions:
-            # First try the user's get_permissions() method
+        if canonical_role_id:
+            permissions = get_permissions_for_roles([canonical_role_id])
+        else:
             permissions = user.get_permissions()
-            
-            # If still no permissions, try ORM lookup
-            if not permissions:
-                roles_to_check = []
-                
-                # Use the found_role if we have it
-                if found_role:
-                    roles_to_check = [found_role]
-                elif role_id_str:
-                    # Try exact match
-                    roles_to_check = list(Role.objects.filter(role_id=role_id_str))
-                    
-                    # If not found, try "R001", "R002" format
-                    if not roles_to_check:
-                        if role_id_str == '1':
-                            roles_to_check = list(Role.objects.filter(role_id__iexact='R001'))
-                        elif role_id_str == '2':
-                            roles_to_check = list(Role.objects.filter(role_id__iexact='R002'))
-                
-                # Get permissions from RolePermission table
-                if roles_to_check:
-                    perms_qs = RolePermission.objects.filter(role__in=roles_to_check)
-                    for rp in perms_qs:
-                        permissions.setdefault(rp.page_path, {})[rp.permission_type] = bool(rp.is_allowed)
-                
-                # Also check UserRole table
-                if not permissions:
-                    try:
-                        user_roles = UserRole.objects.filter(user=user, is_active=True).select_related('role')
-                        for user_role in user_roles:
-                            role_for_perms = user_role.role
-                            perms_qs = RolePermission.objects.filter(role=role_for_perms)
-                            for rp in perms_qs:
-                                permissions.setdefault(rp.page_path, {})[rp.permission_type] = bool(rp.is_allowed)
-                    except Exception as e:
-                        import logging
-                        logger = logging.getLogger(__name__)
-                        logger.warning(f"Error fetching permissions via UserRole: {str(e)}")
-                    
     except Exception as e:
         import logging
         logger = logging.getLogger(__name__)
@@ -1075,7 +866,10 @@ def user_signup_view(request):
                 }, status=status.HTTP_400_BAD_REQUEST)
         
         # Create user (password will be hashed in model's save method)
-        user = serializer.save()
+        try:
+            user = serializer.save()
+        except PasswordHashingBusy:
+            return _password_hashing_busy_response()
         
         # Log the email and role_id after user creation to verify they're saved correctly
         role_id = user.role_id
@@ -1305,7 +1099,7 @@ def user_login_view(request):
             ci = FrontendUser.objects.filter(email__iexact=email).values('email', 'password').first()
             debug['user_found_case_insensitive'] = bool(ci)
             if ci and ci.get('password'):
-                debug['stored_password_hashed'] = str(ci.get('password')).startswith('pbkdf2_')
+                debug['stored_password_hashed'] = is_password_hashed(str(ci.get('password')))
 
         resp = {'message_type': 'error', 'error': 'Invalid email or password'}
         if debug:
@@ -1322,7 +1116,11 @@ def user_login_view(request):
     # Verify password. Support legacy/plaintext stored passwords by
     # checking raw equality and re-hashing on match so future logins use
     # the secure hashed form.
-    if not check_password(password, user.password):
+    try:
+        password_ok = verify_password(password, user.password, user_id=user.id)
+    except PasswordHashingBusy:
+        return _login_busy_response()
+    if not password_ok:
         # Fallback: if stored password is plaintext (legacy), accept it
         # and replace with a hashed password for future requests.
         if user.password == password:
@@ -1334,7 +1132,7 @@ def user_login_view(request):
         else:
             debug = {}
             if settings.DEBUG:
-                debug['stored_password_hashed'] = str(user.password).startswith('pbkdf2_')
+                debug['stored_password_hashed'] = is_password_hashed(str(user.password))
             resp = {'message_type': 'error', 'error': 'Invalid email or password'}
             if debug:
                 resp['debug'] = debug
@@ -1348,12 +1146,16 @@ def user_login_view(request):
         refresh['user_id'] = user.id
         refresh['email'] = user.email
         refresh['user_type'] = 'frontend_user'  # Identifier for custom user
+        refresh['is_active'] = user.is_active
+        refresh['role_id'] = user.role_id
         
         # Generate access token from refresh token
         access_token = refresh.access_token
         access_token['user_id'] = user.id
         access_token['email'] = user.email
         access_token['user_type'] = 'frontend_user'
+        access_token['is_active'] = user.is_active
+        access_token['role_id'] = user.role_id
         
     except Exception as e:
         # Fallback: return user data without JWT tokens
@@ -1461,7 +1263,10 @@ def users_list(request):
                         }, status=status.HTTP_400_BAD_REQUEST)
                 
                 # Create user (password will be hashed in model's save method)
-                user = serializer.save()
+                try:
+                    user = serializer.save()
+                except PasswordHashingBusy:
+                    return _password_hashing_busy_response()
                 
                 # Log warning if role_id was set to NULL due to migration issue (but don't show in response)
                 original_role_id = request.data.get('role_id')
@@ -1546,9 +1351,10 @@ def users_list(request):
                     pass
             
             # Order by created_at descending
-            users = users.order_by('-created_at')
+            users = list(users.order_by('-created_at'))
             
-            serializer = UserSerializer(users, many=True)
+            # Resolve every user's role name in one batched query instead of per row
+            serializer = UserSerializer(users, many=True, context={'role_names': get_role_names_for_users(users)})
             
             return Response({
                 'message_type': 'success',
@@ -1564,6 +1370,306 @@ def users_list(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+USERS_BULK_MAX_ROWS = 10000
+# Rows per INSERT statement / transaction
+USERS_BULK_CHUNK_SIZE = 500
+
+
+def _parse_bulk_users_payload(request):
+    """
+    Return the rows of a bulk user import as a list of dicts.
+    Accepts a CSV file upload (multipart field `file`), a text/csv body,
+    a JSON array, or a JSON object with a `users` array.
+    """
+    import csv
+    import io
+    
+    text = None
+    if request.content_type and request.content_type.startswith('text/csv'):
+        text = request.body.decode('utf-8-sig')
+    elif request.FILES.get('file') is not None:
+        text = request.FILES['file'].read().decode('utf-8-sig')
+    
+    if text is not None:
+        rows = []
+        for row in csv.DictReader(io.StringIO(text)):
+            # Blank CSV cells mean "not provided"
+            rows.append({
+                key.strip(): value.strip()
+                for key, value in row.items()
+                if key and value is not None and value.strip() != ''
+            })
+        return rows
+    
+    data = request.data
+    if isinstance(data, dict):
+        data = data.get('users')
+    if not isinstance(data, list):
+        raise ValueError('Send a JSON array of users, {"users": [...]}, or a CSV file')
+    return data
+
+
+def _create_admin_profiles_bulk(frontend_users):
+    """
+    Batched equivalent of the AdminProfile handling in UserCreateSerializer.create:
+    users with role 1/2 get a Django auth User (is_staff, is_superuser for role 1) and an AdminProfile.
+    """
+    from functools import reduce
+    from operator import or_
+    from django.db.models import Q
+    
+    admin_users = [
+        user for user in frontend_users
+        if is_admin_role(user.role_id)
+    ]
+    if not admin_users:
+        return
+    
+    existing_auth_users = {
+        auth_user.email: auth_user
+        for auth_user in User.objects.filter(email__in=[user.email for user in admin_users])
+    }
+    
+    # Usernames already taken by <base> or <base>_<n>, fetched in one query
+    bases = {user.email.split('@')[0] for user in admin_users if user.email not in existing_auth_users}
+    taken_usernames = set()
+    if bases:
+        taken_usernames = set(User.objects.filter(
+            reduce(or_, [Q(username=base) | Q(username__startswith=f'{base}_') for base in bases])
+        ).values_list('username', flat=True))
+    
+    auth_users_to_update = []
+    auth_users_to_create = []
+    auth_user_by_email = {}
+    for user in admin_users:
+        is_superadmin = is_superadmin_role(user.role_id)
+        auth_user = existing_auth_users.get(user.email)
+        if auth_user is not None:
+            auth_user.password = user.password
+            auth_user.is_active = user.is_active
+            auth_user.is_staff = True
+            auth_user.is_superuser = is_superadmin
+            auth_users_to_update.append(auth_user)
+        else:
+            base_username = user.email.split('@')[0]
+            username = base_username
+            counter = 1
+            while username in taken_usernames:
+                username = f"{base_username}_{counter}"
+                counter += 1
+            taken_usernames.add(username)
+            
+            name_parts = user.name.split() if user.name else []
+            auth_user = User(
+                username=username,
+                email=user.email,
+                first_name=name_parts[0] if len(name_parts) > 0 else '',
+                last_name=' '.join(name_parts[1:]) if len(name_parts) > 1 else '',
+                password=user.password,  # Already hashed
+                is_active=user.is_active,
+                is_staff=True,
+                is_superuser=is_superadmin,
+            )
+            auth_users_to_create.append(auth_user)
+        auth_user_by_email[user.email] = auth_user
+    
+    if auth_users_to_update:
+        User.objects.bulk_update(auth_users_to_update, ['password', 'is_active', 'is_staff', 'is_superuser'])
+    if auth_users_to_create:
+        User.objects.bulk_create(auth_users_to_create)
+    
+    # get_or_create semantics: keep existing profiles untouched
+    auth_user_ids = [auth_user.id for auth_user in auth_user_by_email.values()]
+    existing_profiles = set(
+        AdminProfile.objects.filter(user_id__in=auth_user_ids).values_list('user_id', flat=True)
+    )
+    AdminProfile.objects.bulk_create([
+        AdminProfile(
+            user=auth_user_by_email[user.email],
+            name=user.name,
+            email=user.email,
+            password=user.password,
+            role=AdminProfile.ROLE_SUPERADMIN if is_superadmin_role(user.role_id) else AdminProfile.ROLE_ADMIN,
+            is_active=user.is_active,
+        )
+        for user in admin_users
+        if auth_user_by_email[user.email].id not in existing_profiles
+    ])
+
+
+@api_view(['POST'])
+@permission_classes([AUTH_PERMISSION])  # Require authentication in production
+def users_bulk_create(request):
+    """
+    Bulk import users (e.g. onboarding a new city's staff)
+    
+    Accepts either:
+    - JSON: [{"name", "email", "password", "confirm_password", "phone_number", "role_id", "is_active"}, ...]
+      or {"users": [...], "send_email": true}
+    - CSV: multipart upload in field `file` (or a text/csv body) with the same column names
+    
+    Optional query parameter:
+    - ?send_email=false - Don't queue credential emails (default: true)
+    
+    Rows are validated individually, email uniqueness is checked for the whole batch in one query,
+    passwords are hashed across a process pool and users are inserted with bulk_create in chunks.
+    The response lists the result of every row:
+    {
+        "message_type": "success",
+        "created_count": 2,
+        "failed_count": 1,
+        "results": [
+            {"row": 1, "email": "a@gmail.com", "status": "created", "id": 10},
+            {"row": 2, "email": "b@gmail.com", "status": "error", "errors": {...}},
+            ...
+        ]
+    }
+    """
+    from django.db import IntegrityError, transaction
+    from django.db.models.functions import Lower
+    from .password_hashing import hash_passwords
+    from .serializers import UserBulkCreateRowSerializer
+    import logging
+    logger = logging.getLogger(__name__)
+    
+    try:
+        rows = _parse_bulk_users_payload(request)
+    except (ValueError, UnicodeDecodeError) as e:
+        return Response({
+            'message_type': 'error',
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if not rows:
+        return Response({
+            'message_type': 'error',
+            'error': 'No users provided'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if len(rows) > USERS_BULK_MAX_ROWS:
+        return Response({
+            'message_type': 'error',
+            'error': f'Too many users in one import ({len(rows)}). Maximum is {USERS_BULK_MAX_ROWS}.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    send_email_param = request.query_params.get('send_email')
+    is_csv_body = bool(request.content_type and request.content_type.startswith('text/csv'))
+    if send_email_param is None and not is_csv_body and isinstance(request.data, dict):
+        send_email_param = request.data.get('send_email')
+    send_email = str(send_email_param).lower() not in ('false', '0', 'no') if send_email_param is not None else True
+    
+    results = [None] * len(rows)
+    
+    # 1. Validate every row (no queries per row)
+    valid_rows = []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            results[index] = {'row': index + 1, 'email': None, 'status': 'error', 'errors': 'Each user must be an object'}
+            continue
+        
+        serializer = UserBulkCreateRowSerializer(data=row)
+        if not serializer.is_valid():
+            results[index] = {'row': index + 1, 'email': row.get('email'), 'status': 'error', 'errors': serializer.errors}
+            continue
+        
+        email = serializer.validated_data['email']
+        is_valid, validation_error = _validate_email_address(email)
+        if not is_valid:
+            results[index] = {'row': index + 1, 'email': email, 'status': 'error', 'errors': {'email': [validation_error]}}
+            continue
+        
+        valid_rows.append((index, serializer.validated_data))
+    
+    # 2. Email uniqueness for the whole batch in one query (case-insensitive, like login)
+    existing_emails = set(
+        FrontendUser.objects.annotate(email_lower=Lower('email'))
+        .filter(email_lower__in={data['email'].lower() for _, data in valid_rows})
+        .values_list('email_lower', flat=True)
+    )
+    seen_emails = set()
+    rows_to_create = []
+    for index, data in valid_rows:
+        email_key = data['email'].lower()
+        if email_key in existing_emails:
+            results[index] = {'row': index + 1, 'email': data['email'], 'status': 'error', 'errors': {'email': ['User with this email already exists']}}
+        elif email_key in seen_emails:
+            results[index] = {'row': index + 1, 'email': data['email'], 'status': 'error', 'errors': {'email': ['Duplicate email in this import']}}
+        else:
+            seen_emails.add(email_key)
+            rows_to_create.append((index, data))
+    
+    # 3. Hash passwords in parallel (PBKDF2 is the dominant cost)
+    hashed_passwords = hash_passwords([data['password'] for _, data in rows_to_create])
+    
+    # 4. Insert in chunks
+    created = []  # (index, user, plain_password)
+    for start in range(0, len(rows_to_create), USERS_BULK_CHUNK_SIZE):
+        chunk = rows_to_create[start:start + USERS_BULK_CHUNK_SIZE]
+        chunk_hashes = hashed_passwords[start:start + USERS_BULK_CHUNK_SIZE]
+        users = [
+            FrontendUser(
+                name=data['name'],
+                email=data['email'],
+                phone_number=data.get('phone_number'),
+                password=password_hash,
+                confirm_password=password_hash,
+                role_id=data.get('role_id'),
+                is_active=data.get('is_active', True),
+            )
+            for (index, data), password_hash in zip(chunk, chunk_hashes)
+        ]
+        try:
+            with transaction.atomic():
+                FrontendUser.objects.bulk_create(users)
+            created.extend((index, user, data['password']) for (index, data), user in zip(chunk, users))
+        except IntegrityError:
+            # A concurrent request took one of these emails - fall back to row-by-row for this chunk
+            for (index, data), user in zip(chunk, users):
+                try:
+                    with transaction.atomic():
+                        user.save()  # Password is already hashed, save() won't hash it again
+                    created.append((index, user, data['password']))
+                except IntegrityError:
+                    results[index] = {'row': index + 1, 'email': data['email'], 'status': 'error', 'errors': {'email': ['User with this email already exists']}}
+    
+    for index, user, _ in created:
+        results[index] = {'row': index + 1, 'email': user.email, 'status': 'created', 'id': user.id}
+    
+    created_users = [user for _, user, _ in created]
+    
+    # 5. Admin accounts (role 1/2) get a Django User + AdminProfile, in batches
+    try:
+        _create_admin_profiles_bulk(created_users)
+    except Exception as e:
+        logger.error(f"Bulk import: failed to create admin profiles: {str(e)}", exc_info=True)
+    
+    # 6. Queue credential emails through the outbox in one insert
+    emails_queued = 0
+    if send_email and created:
+        try:
+            # Resolve roles for all new users at once (one query) before building the emails
+            role_ids_by_user = get_role_ids_for_users(created_users)
+            queued = enqueue_emails([
+                (*_build_credentials_email(user, plain_password, role_ids_by_user.get(user.id, [])), user.email)
+                for _, user, plain_password in created
+            ])
+            emails_queued = len(queued)
+        except Exception as e:
+            logger.error(f"Bulk import: failed to queue credential emails: {str(e)}", exc_info=True)
+    
+    failed_count = len(rows) - len(created)
+    logger.info(f"Bulk user import: {len(created)} created, {failed_count} failed")
+    
+    return Response({
+        'message_type': 'success' if created else 'error',
+        'message': f'{len(created)} of {len(rows)} users created.',
+        'created_count': len(created),
+        'failed_count': failed_count,
+        'emails_queued': emails_queued,
+        'results': results
+    }, status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
+
+
 @api_view(['GET', 'PUT', 'PATCH', 'DELETE'])
 @permission_classes([AUTH_PERMISSION])  # Require authentication in production
 def user_detail(request, id):
@@ -1595,6 +1701,8 @@ def user_detail(request, id):
         # Soft delete: Set is_active=False
         user.is_active = False
         user.save()
+        # Drop cached account state so existing tokens stop working immediately
+        invalidate_user_state(user)
         
         response_serializer = UserSerializer(user)
         return Response({
@@ -1619,7 +1727,14 @@ def user_detail(request, id):
                         'error': 'User with this email already exists'
                     }, status=status.HTTP_400_BAD_REQUEST)
             
-            updated_user = serializer.save()
+            previous_state = (user.is_active, user.role_id)
+            try:
+                updated_user = serializer.save()
+            except PasswordHashingBusy:
+                return _password_hashing_busy_response()
+            # Refresh cached account state if the active flag or role changed
+            if (updated_user.is_active, updated_user.role_id) != previous_state:
+                invalidate_user_state(updated_user)
             response_serializer = UserSerializer(updated_user)
             
             return Response({
@@ -2376,8 +2491,11 @@ def role_permissions_by_role(request, role_id):
     """
     Get, update, or delete all permissions for a specific role
     
-    GET: List all permissions for the specified role_id
-    PUT/PATCH: Bulk update permissions for the specified role_id
+    GET: List all permissions for the specified role_id (ETag header = matrix version;
+         If-None-Match with the current ETag returns 304)
+    PUT: Bulk update permissions for the specified role_id
+    PATCH: Diff update - only cells whose value changes are written; returns only those cells
+           plus the new ETag. Optional If-Match header (412 if the matrix changed meanwhile)
     DELETE: Delete all permissions for the specified role_id
     
     Example:
@@ -2385,7 +2503,17 @@ def role_permissions_by_role(request, role_id):
     PUT/PATCH /api/auth/role-permissions/R001/
     DELETE /api/auth/role-permissions/R001/
     
-    PUT/PATCH Request body:
+    PATCH Request body (either or both):
+    {
+        "permissions": { "/users": { "view": true } },
+        "operations": [
+            { "op": "replace", "path": "/~1users/edit", "value": false },
+            { "op": "remove", "page_path": "/users", "permission_type": "delete" }
+        ]
+    }
+    A bare JSON list is treated as "operations".
+    
+    PUT Request body:
     {
         "permissions": {
             "/": {
@@ -2427,6 +2555,13 @@ def role_permissions_by_role(request, role_id):
                 }, status=status.HTTP_404_NOT_FOUND)
         
         if request.method == 'GET':
+            etag = role_permissions_etag(role.role_id, role.permissions_version)
+            if_none_match = request.headers.get('If-None-Match')
+            if if_none_match and etag in [tag.strip() for tag in if_none_match.split(',')]:
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+                response['ETag'] = etag
+                return response
+            
             # Use raw SQL to fetch permissions without id field
             from django.db import connection
             from types import SimpleNamespace
@@ -2455,20 +2590,69 @@ def role_permissions_by_role(request, role_id):
                     permissions.append(perm)
             
             serializer = RolePermissionSerializer(permissions, many=True)
-            return Response({
+            response = Response({
                 'message_type': 'success',
                 'count': len(serializer.data),
                 'role_id': role_id,
                 'role_name': role.name,
                 'data': serializer.data
             })
+            response['ETag'] = etag
+            return response
+        
+        elif request.method == 'PATCH':
+            # Diff update: compare against the stored matrix and write only the changed cells
+            payload = {'operations': request.data} if isinstance(request.data, list) else request.data
+            serializer = RolePermissionsPatchSerializer(
+                role,
+                data=payload,
+                context={'if_match': request.headers.get('If-Match')}
+            )
+            if not serializer.is_valid():
+                return Response({
+                    'message_type': 'error',
+                    'errors': serializer.errors
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            try:
+                result = serializer.save()
+            except PermissionMatrixConflict as e:
+                response = Response({
+                    'message_type': 'error',
+                    'error': 'Permissions for this role were changed by someone else. Reload and try again.',
+                    'etag': e.current_etag
+                }, status=status.HTTP_412_PRECONDITION_FAILED)
+                response['ETag'] = e.current_etag
+                return response
+            
+            changed_permissions = result['changed_permissions']
+            removed_permissions = result['removed_permissions']
+            etag = role_permissions_etag(role.role_id, result['permissions_version'])
+            
+            response = Response({
+                'message_type': 'success',
+                'message': (
+                    f'Permissions updated for role "{result["role"].name}". '
+                    f'Changed: {len(changed_permissions)}, Removed: {len(removed_permissions)}'
+                ),
+                'data': {
+                    'role_id': role.role_id,
+                    'changed': RolePermissionSerializer(changed_permissions, many=True).data,
+                    'removed': removed_permissions,
+                    'changed_count': len(changed_permissions),
+                    'removed_count': len(removed_permissions),
+                    'etag': etag
+                }
+            }, status=status.HTTP_200_OK)
+            response['ETag'] = etag
+            return response
         
-        elif request.method in ['PUT', 'PATCH']:
+        elif request.method == 'PUT':
             # Bulk update permissions for this role
             if 'permissions' not in request.data:
                 return Response({
                     'message_type': 'error',
-                    'error': 'PUT/PATCH requires a "permissions" dictionary in the payload.'
+                    'error': 'PUT requires a "permissions" dictionary in the payload.'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             # Use the bulk update serializer
@@ -2534,6 +2718,7 @@ def role_permissions_by_role(request, role_id):
                 cursor.execute("""
                     DELETE FROM frontend_role_permissions WHERE role_id = %s
                 """, [role_id])
+            bump_role_version(role.role_id)
             
             return Response({
                 'message_type': 'success',
@@ -2672,6 +2857,7 @@ def role_permission_detail(request, role_id, page_path, permission_type):
                 DELETE FROM frontend_role_permissions 
                 WHERE role_id = %s AND page_path = %s AND permission_type = %s
             """, [role.role_id, page_path, permission_type])
+        bump_role_version(role.role_id)
         
         return Response({
             'message_type': 'success',
@@ -2886,12 +3072,35 @@ def user_role_detail(request, id):
 @api_view(['GET'])
 @permission_classes([AUTH_PERMISSION])  # Require authentication in production
 def ride_user_count(request):
-    """Get total count of users from rides_user table"""
+    """
+    Get total count of users from rides_user table
+    
+    Query parameters:
+    - ?approximate=true - Return the planner estimate (pg_class.reltuples) instead of an exact count
+    
+    The exact count is served from cache with an `as_of` timestamp; once it is older than
+    ROW_COUNT_REFRESH_INTERVAL seconds, the next request starts a background recount.
+    """
     try:
-        total_users = RidesUser.objects.count() or 0
+        table_name = RidesUser._meta.db_table
+        approximate = (request.query_params.get('approximate') or '').lower() in ('1', 'true', 'yes')
+        
+        if approximate:
+            estimate = get_estimated_count(table_name)
+            if estimate is not None:
+                return Response({
+                    'message_type': 'success',
+                    'count': estimate,
+                    'approximate': True
+                })
+            # No estimate (table never analyzed) - fall back to the cached exact count
+        
+        exact = get_exact_count(table_name)
         return Response({
             'message_type': 'success',
-            'count': total_users
+            'count': exact['count'] or 0,
+            'approximate': False,
+            'as_of': exact['as_of'].isoformat()
         })
     except Exception as e:
         return Response({
@@ -2900,80 +3109,63 @@ def ride_user_count(request):
         }, status=500)
 
 
+RIDES_USERS_DEFAULT_LIMIT = 100
+RIDES_USERS_MAX_LIMIT = 1000
+# Rows pulled from the server-side cursor per round trip
+RIDES_USERS_FETCH_SIZE = 2000
+
+
 @api_view(['GET'])
 @permission_classes([AUTH_PERMISSION])  # Require authentication in production
 def rides_users_list(request):
-    """Get all users from rides_user table with complete user information"""
+    """
+    Get users from rides_user table with complete user information
+    
+    Query parameters:
+    - ?limit=100 - Keyset pagination: return at most `limit` users (max 1000) ordered by id
+    - ?after_id=123 - Return users with id > after_id (use `next_after_id` from the previous page)
+    - ?export=ndjson|json - Stream every user as NDJSON lines or a JSON array (constant memory)
+    
+    Without any of these the full list is returned (legacy behaviour).
+    """
     try:
-        from django.db import connection
+        export_format = (request.query_params.get('export') or '').lower()
+        after_id = request.query_params.get('after_id')
+        limit = request.query_params.get('limit')
         
-        # Use raw SQL to get phone number with different possible column names
-        with connection.cursor() as cursor:
-            # Try to find phone number column name
-            cursor.execute("""
-                SELECT column_name 
-                FROM information_schema.columns 
-                WHERE table_name = 'rides_user' 
-                AND (column_name LIKE '%phone%' OR column_name LIKE '%mobile%')
-                LIMIT 1;
-            """)
-            phone_col_result = cursor.fetchone()
-            phone_column = phone_col_result[0] if phone_col_result else None
-            
-            # Build query with phone column if found, otherwise use COALESCE to try multiple names
-            if phone_column:
-                phone_select = f'"{phone_column}" as phone_number'
-            else:
-                # Try common column name variations
-                phone_select = """COALESCE(
-                    "phone_number", "phone", "phone_no", "mobile", "mobile_number", 
-                    NULL
-                ) as phone_number"""
-            
-            # Get all users with phone number
-            query = f"""
-                SELECT 
-                    id, name, email, dob, is_active, is_staff, is_superuser,
-                    otp, otp_created_at, custom_user_id, last_login, deleted_at,
-                    {phone_select}
-                FROM rides_user
-                ORDER BY id;
-            """
-            cursor.execute(query)
-            columns = [col[0] for col in cursor.description]
-            rows = cursor.fetchall()
-        
-        # Convert rows to dictionaries
-        users_data = []
-        for row in rows:
-            user_dict = dict(zip(columns, row))
-            # Format dates
-            if user_dict.get('dob'):
-                user_dict['dob'] = user_dict['dob'].isoformat() if hasattr(user_dict['dob'], 'isoformat') else str(user_dict['dob'])
-            if user_dict.get('last_login'):
-                user_dict['last_login'] = user_dict['last_login'].isoformat() if hasattr(user_dict['last_login'], 'isoformat') else str(user_dict['last_login'])
-            if user_dict.get('deleted_at'):
-                user_dict['deleted_at'] = user_dict['deleted_at'].isoformat() if hasattr(user_dict['deleted_at'], 'isoformat') else str(user_dict['deleted_at'])
-            if user_dict.get('otp_created_at'):
-                user_dict['otp_created_at'] = user_dict['otp_created_at'].isoformat() if hasattr(user_dict['otp_created_at'], 'isoformat') else str(user_dict['otp_created_at'])
-            
-            # Add is_deleted
-            user_dict['is_deleted'] = user_dict.get('deleted_at') is not None
-            
-            # Add age if dob exists
-            if user_dict.get('dob'):
-                try:
-                    from datetime import date
-                    dob = user_dict['dob']
-                    if isinstance(dob, str):
-                        from datetime import datetime
-                        dob = datetime.fromisoformat(dob.replace('Z', '+00:00')).date()
-                    today = date.today()
-                    user_dict['age'] = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
-                except:
-                    pass
-            
-            users_data.append(user_dict)
+        try:
+            after_id = int(after_id) if after_id not in (None, '') else None
+            limit = int(limit) if limit not in (None, '') else None
+        except ValueError:
+            return Response({
+                'message_type': 'error',
+                'error': 'after_id and limit must be integers'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if export_format:
+            if export_format not in ('ndjson', 'json'):
+                return Response({
+                    'message_type': 'error',
+                    'error': 'export must be "ndjson" or "json"'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            return _stream_rides_users(export_format, after_id)
+        
+        if limit is not None or after_id is not None:
+            # Keyset pagination on id: cost is independent of how deep the page is
+            limit = max(1, min(limit or RIDES_USERS_DEFAULT_LIMIT, RIDES_USERS_MAX_LIMIT))
+            # Fetch one extra row to know whether another page exists
+            users_data = list(_iter_rides_users(after_id=after_id, limit=limit + 1))
+            has_more = len(users_data) > limit
+            users_data = users_data[:limit]
+            return Response({
+                'message_type': 'success',
+                'count': len(users_data),
+                'users': users_data,
+                'has_more': has_more,
+                'next_after_id': users_data[-1]['id'] if has_more else None
+            })
+        
+        users_data = list(_iter_rides_users())
         
         return Response({
             'message_type': 'success',
@@ -2989,8 +3181,111 @@ def rides_users_list(request):
         }, status=500)
 
 
-@api_view(['POST'])
-@permission_classes([AUTH_PERMISSION])  # Require authentication in production
+def _rides_users_query(after_id=None, limit=None):
+    """Build the rides_user SELECT (keyset-paginated on id when after_id/limit are given)"""
+    # Phone column name comes from the schema registry (resolved once per process, not per request)
+    phone_column = get_rides_user_phone_column()
+    phone_select = f'"{phone_column}" as phone_number' if phone_column else 'NULL as phone_number'
+    
+    where_sql = ''
+    params = []
+    if after_id is not None:
+        where_sql = 'WHERE id > %s'
+        params.append(after_id)
+    limit_sql = ''
+    if limit is not None:
+        limit_sql = 'LIMIT %s'
+        params.append(limit)
+    
+    query = f"""
+        SELECT 
+            id, name, email, dob, is_active, is_staff, is_superuser,
+            otp, otp_created_at, custom_user_id, last_login, deleted_at,
+            {phone_select}
+        FROM rides_user
+        {where_sql}
+        ORDER BY id
+        {limit_sql}
+    """
+    return query, params
+
+
+def _format_rides_user(columns, row, today):
+    """Convert a rides_user row to the API dictionary (ISO dates, is_deleted, age)"""
+    user_dict = dict(zip(columns, row))
+    dob = user_dict.get('dob')
+    
+    # Format dates
+    for field in ('dob', 'last_login', 'deleted_at', 'otp_created_at'):
+        if user_dict.get(field):
+            value = user_dict[field]
+            user_dict[field] = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+    
+    # Add is_deleted
+    user_dict['is_deleted'] = user_dict.get('deleted_at') is not None
+    
+    # Add age if dob exists (from the date object, no re-parsing)
+    if dob and hasattr(dob, 'year'):
+        user_dict['age'] = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+    return user_dict
+
+
+def _iter_rides_users(after_id=None, limit=None):
+    """
+    Yield rides_user rows as dictionaries.
+    Uses a named (server-side) cursor inside a transaction so rows are fetched
+    RIDES_USERS_FETCH_SIZE at a time instead of loading the whole table into memory.
+    """
+    from datetime import date
+    from django.db import transaction
+    
+    query, params = _rides_users_query(after_id=after_id, limit=limit)
+    today = date.today()
+    
+    # A transaction keeps the named cursor valid with PgBouncer (no WITH HOLD cursor)
+    with transaction.atomic():
+        with connection.chunked_cursor() as cursor:
+            cursor.execute(query, params)
+            columns = None
+            while True:
+                rows = cursor.fetchmany(RIDES_USERS_FETCH_SIZE)
+                if not rows:
+                    break
+                if columns is None:
+                    columns = [col[0] for col in cursor.description]
+                for row in rows:
+                    yield _format_rides_user(columns, row, today)
+
+
+def _stream_rides_users(export_format, after_id=None):
+    """Stream all rides users as NDJSON or a JSON array"""
+    import json
+    from django.core.serializers.json import DjangoJSONEncoder
+    from django.http import StreamingHttpResponse
+    
+    def ndjson_rows():
+        for user_dict in _iter_rides_users(after_id=after_id):
+            yield json.dumps(user_dict, cls=DjangoJSONEncoder) + '\n'
+    
+    def json_array_rows():
+        yield '['
+        separator = ''
+        for user_dict in _iter_rides_users(after_id=after_id):
+            yield separator + json.dumps(user_dict, cls=DjangoJSONEncoder)
+            separator = ','
+        yield ']'
+    
+    if export_format == 'ndjson':
+        response = StreamingHttpResponse(ndjson_rows(), content_type='application/x-ndjson')
+        response['Content-Disposition'] = 'attachment; filename="rides_users.ndjson"'
+    else:
+        response = StreamingHttpResponse(json_array_rows(), content_type='application/json')
+        response['Content-Disposition'] = 'attachment; filename="rides_users.json"'
+    return response
+
+
+@api_view(['POST'])
+@permission_classes([AUTH_PERMISSION])  # Require authentication in production
 def promo_code_create(request):
     """
     Create promo code(s) - supports both single and bulk creation
@@ -3027,9 +3322,6 @@ def promo_code_create(request):
     - "fixed": Discount is a fixed amount. Example: 20 = $20 off
     """
     try:
-        # Fix sequence before creating to ensure sequential IDs
-        fix_promo_sequence()
-        
         # Check if request.data is a list (bulk creation)
         if isinstance(request.data, list):
             # Bulk creation
@@ -3078,14 +3370,355 @@ def promo_code_create(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class _CSVEcho:
+    """File-like object for csv.writer that hands each formatted row back instead of buffering it"""
+    def write(self, value):
+        return value
+
+
+@api_view(['POST'])
+@permission_classes([AUTH_PERMISSION])  # Require authentication in production
+def promo_codes_generate(request):
+    """
+    Generate up to 100,000 unique promo codes from a template and stream them back as CSV
+    
+    Request body:
+    {
+        "prefix": "SUMMER",              (optional, letters/digits)
+        "length": 8,                     (optional, random characters after the prefix, default 8)
+        "alphabet": "ABCDEFGHJKMNPQRSTUVWXYZ23456789",  (optional, default: unambiguous A-Z/2-9)
+        "count": 50000,
+        "discount_type": "percentage",
+        "discount_value": 15,
+        "start_date": "2026-06-01T00:00:00Z",
+        "expire_date": "2026-08-31T23:59:59Z",
+        "max_usage": 1,                  (optional, per code, default 1)
+        "status": "active"               (optional)
+    }
+    
+    All codes are created in one transaction (nothing is saved on error).
+    Response: text/csv with columns id, code, discount_type, discount_value, start_date, expire_date, max_usage, status
+    """
+    import csv
+    from django.http import StreamingHttpResponse
+    
+    serializer = PromoCodeGenerateSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({
+            'message_type': 'error',
+            'errors': serializer.errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    template = serializer.validated_data
+    fields = {
+        'discount_type': template['discount_type'],
+        'discount_value': template['discount_value'],
+        'start_date': template['start_date'],
+        'expire_date': template['expire_date'],
+        'max_usage': template['max_usage'],
+        'status': template['status'],
+    }
+    
+    try:
+        created = generate_promo_codes(
+            prefix=template['prefix'],
+            length=template['length'],
+            count=template['count'],
+            fields=fields,
+            alphabet=template['alphabet'],
+        )
+        # New codes may have been cached as unknown by checkout lookups
+        invalidate_all_promo_codes()
+    except PromoCodeSpaceExhausted as e:
+        return Response({
+            'message_type': 'error',
+            'error': str(e)
+        }, status=status.HTTP_409_CONFLICT)
+    except Exception as e:
+        import logging
+        logger = logging.getLogger(__name__)
+        logger.error(f"Promo code generation failed: {str(e)}", exc_info=True)
+        return Response({
+            'message_type': 'error',
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    shared_columns = [
+        fields['discount_type'], fields['discount_value'],
+        fields['start_date'].isoformat(), fields['expire_date'].isoformat(),
+        fields['max_usage'], fields['status'],
+    ]
+    
+    def csv_rows():
+        writer = csv.writer(_CSVEcho())
+        yield writer.writerow([
+            'id', 'code', 'discount_type', 'discount_value', 'start_date', 'expire_date', 'max_usage', 'status'
+        ])
+        for promo_id, code in created:
+            yield writer.writerow([promo_id, code] + shared_columns)
+    
+    response = StreamingHttpResponse(csv_rows(), content_type='text/csv', status=status.HTTP_201_CREATED)
+    filename = f"promo_codes_{template['prefix'] or 'generated'}_{len(created)}.csv"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['X-Generated-Count'] = str(len(created))
+    return response
+
+
+@api_view(['POST'])
+@permission_classes([AUTH_PERMISSION])  # Require authentication in production
+def promo_code_validate(request):
+    """
+    Validate a promo code and quote the discount for a fare, without consuming a use
+    
+    Request body:
+    {
+        "code": "SAVE20",
+        "amount": 250.00   (optional - fare to compute the discount for)
+    }
+    
+    Answered from the in-process promo code cache (see frontend/promo_cache.py), so repeated
+    quotes during checkout don't touch the database. Usage counts may lag by up to
+    PROMO_CODE_CACHE_TTL seconds; the redeem endpoint remains the authoritative check.
+    Invalid codes return 200 with "valid": false and a reason (not_found, inactive,
+    not_started, expired, usage_limit_reached).
+    """
+    serializer = PromoCodeRedeemSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({
+            'message_type': 'error',
+            'errors': serializer.errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    quote = validate_and_quote(serializer.validated_data['code'], serializer.validated_data.get('amount'))
+    return Response({
+        'message_type': 'success',
+        'data': quote
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([AUTH_PERMISSION])  # Require authentication in production
+def promo_code_redeem(request):
+    """
+    Redeem (consume one use of) a promo code atomically and return the discount
+    
+    Request body:
+    {
+        "code": "SAVE20",
+        "amount": 250.00   (optional - fare to compute the discount for)
+    }
+    
+    Validation and the usage increment happen in one conditional UPDATE, so a code can never be
+    redeemed more than max_usage times, however many requests race for it.
+    Errors: 404 not_found, 409 usage_limit_reached, 400 inactive / not_started / expired
+    """
+    serializer = PromoCodeRedeemSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({
+            'message_type': 'error',
+            'errors': serializer.errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        result = redeem_promo_code(serializer.validated_data['code'], serializer.validated_data.get('amount'))
+    except PromoCodeRedemptionError as e:
+        if e.reason == REASON_NOT_FOUND:
+            error_status = status.HTTP_404_NOT_FOUND
+        elif e.reason == REASON_EXHAUSTED:
+            error_status = status.HTTP_409_CONFLICT
+        else:
+            error_status = status.HTTP_400_BAD_REQUEST
+        return Response({
+            'message_type': 'error',
+            'error': str(e),
+            'reason': e.reason
+        }, status=error_status)
+    except Exception as e:
+        return Response({
+            'message_type': 'error',
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    promo_code = result['promo_code']
+    record_usage(promo_code.code, promo_code.current_usage)
+    return Response({
+        'message_type': 'success',
+        'message': f'Promo code {promo_code.code} redeemed successfully.',
+        'data': {
+            'id': promo_code.id,
+            'code': promo_code.code,
+            'discount_type': promo_code.discount_type,
+            'discount_value': promo_code.discount_value,
+            'amount': result['amount'],
+            'discount': result['discount'],
+            'final_amount': result['final_amount'],
+            'current_usage': promo_code.current_usage,
+            'remaining_usage': promo_code.remaining_usage,
+        }
+    }, status=status.HTTP_200_OK)
+
+
+PROMO_CODES_DEFAULT_LIMIT = 50
+PROMO_CODES_MAX_LIMIT = 500
+
+
+def _parse_promo_date(value):
+    """Parse an ISO datetime or date query parameter (dates mean midnight, server timezone)"""
+    from datetime import datetime, time
+    from django.utils.dateparse import parse_date, parse_datetime
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _filter_promo_codes(params):
+    """Apply the promo code list filters; returns (queryset, error message)"""
+    promo_codes = PromoCode.objects.all()
+    
+    if params.get('status'):
+        promo_codes = promo_codes.filter(status=params['status'])
+    if params.get('effective_status'):
+        promo_codes = promo_codes.filter(effective_status=params['effective_status'])
+    if params.get('discount_type'):
+        promo_codes = promo_codes.filter(discount_type=params['discount_type'])
+    if params.get('code'):
+        # Codes are stored upper-case, so a plain prefix match can use the code index
+        promo_codes = promo_codes.filter(code__startswith=params['code'].strip().upper())
+    
+    # Codes whose validity window overlaps [date_from, date_to]
+    try:
+        if params.get('date_from'):
+            promo_codes = promo_codes.filter(expire_date__gte=_parse_promo_date(params['date_from']))
+        if params.get('date_to'):
+            promo_codes = promo_codes.filter(start_date__lte=_parse_promo_date(params['date_to']))
+    except ValueError as e:
+        return None, f'Invalid date: {e}. Use YYYY-MM-DD or an ISO 8601 datetime.'
+    
+    return promo_codes, None
+
+
+def _encode_promo_cursor(promo_code, total):
+    import base64
+    raw = f'{promo_code.created_at.isoformat()}|{promo_code.id}|{promo_code.display_number}|{total}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_promo_cursor(cursor):
+    """Return (created_at, id, display_number, total) of the last row of the previous page"""
+    import base64
+    import binascii
+    from django.utils.dateparse import parse_datetime
+    try:
+        created_at, promo_id, display_number, total = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        created_at = parse_datetime(created_at)
+        if created_at is None:
+            raise ValueError(cursor)
+        return created_at, int(promo_id), int(display_number), int(total)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        raise ValueError('Invalid cursor')
+
+
+def _promo_codes_page(params, promo_codes, fields=None):
+    """
+    Run the (filtered) promo code list as ONE query, newest first.
+    
+    - no limit/offset/cursor: every row (legacy behaviour)
+    - ?limit=&offset=: offset pagination. The page comes with COUNT(*) OVER () for the total and
+      ROW_NUMBER() for display_number, so no separate count query is needed.
+    - ?limit=&cursor=: keyset pagination (pass `next_cursor` from the previous page). The cursor
+      carries the last row's position and the total, so the page is a plain index range scan
+      whose cost does not grow with its depth.
+    """
+    from django.db.models import Q
+    
+    cursor = params.get('cursor')
+    try:
+        limit = params.get('limit')
+        offset = params.get('offset')
+        limit = int(limit) if limit not in (None, '') else None
+        offset = int(offset) if offset not in (None, '') else None
+        after = _decode_promo_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return Response({
+            'message_type': 'error',
+            'error': str(e) if cursor else 'limit and offset must be integers'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    ordering = ('-created_at', '-id')
+    paginated = limit is not None or offset is not None or after is not None
+    if paginated:
+        limit = max(1, min(limit or PROMO_CODES_DEFAULT_LIMIT, PROMO_CODES_MAX_LIMIT))
+        offset = max(0, offset or 0)
+    
+    if after is not None:
+        created_at, promo_id, position, total = after
+        offset = None
+        rows = list(
+            promo_codes.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=promo_id))
+            .order_by(*ordering)[:limit]
+        )
+        for number, row in enumerate(rows, start=position + 1):
+            row.display_number = number
+        # Codes created since the first page shift positions; never report fewer than we've seen
+        if rows:
+            total = max(total, rows[-1].display_number)
+    else:
+        promo_codes = promo_codes.with_display_number().with_total_count().order_by(*ordering)
+        rows = list(promo_codes[offset:offset + limit] if paginated else promo_codes)
+        if rows:
+            total = rows[0].total_count
+        elif offset:
+            # Past the end: no row to carry the window count
+            total = promo_codes.count()
+        else:
+            total = 0
+    
+    data = PromoCodeSerializer(rows, many=True, fields=fields).data
+    if not paginated:
+        return Response({
+            'message_type': 'success',
+            'count': total,
+            'data': data
+        })
+    
+    has_more = len(rows) == limit and rows[-1].display_number < total
+    return Response({
+        'message_type': 'success',
+        'count': total,
+        'limit': limit,
+        'offset': offset,
+        'has_more': has_more,
+        'next_offset': offset + len(rows) if has_more and offset is not None else None,
+        'next_cursor': _encode_promo_cursor(rows[-1], total) if has_more else None,
+        'data': data
+    })
+
+
 @api_view(['GET', 'POST', 'DELETE'])
 @permission_classes([AUTH_PERMISSION])  # Require authentication in production
 def promo_codes_list(request):
     """
     Get all promo codes, create promo code(s), or bulk delete (deactivate) multiple promo codes
     
-    GET: Get all promo codes
-    Optional query parameter: ?status=active to filter only active codes
+    GET: Get all promo codes (newest first, each with display_number)
+    Optional query parameters:
+    - ?status=active to filter by the status set by an admin (expired/exhausted codes are
+      switched to deactivate by the sweep_promo_codes command)
+    - ?effective_status=active|scheduled|expired|exhausted|deactivate to filter by what the code
+      can actually be used for right now (e.g. ?effective_status=active = redeemable codes)
+    - ?code=SAVE - codes starting with this prefix
+    - ?discount_type=percentage|fixed
+    - ?date_from=2026-06-01&date_to=2026-06-30 - codes valid at some point in this range
+    - ?fields=id,code,status - only return these fields (display_number is also a field)
+    - ?limit=50&offset=0 - offset pagination (max 500 per page)
+    - ?limit=50&cursor=... - keyset pagination with `next_cursor` from the previous page
+    Without limit/offset/cursor every matching code is returned (legacy behaviour).
     
     POST: Create promo code(s) - supports both single and bulk creation
     Single Creation (send object {}):
@@ -3105,9 +3738,6 @@ def promo_codes_list(request):
     """
     try:
         if request.method == 'POST':
-            # Fix sequence before creating to ensure sequential IDs
-            fix_promo_sequence()
-            
             # Create promo code(s) - same logic as promo_code_create
             # Check if request.data is a list (bulk creation)
             if isinstance(request.data, list):
@@ -3166,54 +3796,60 @@ def promo_codes_list(request):
                     'error': 'ids must be a list/array. Send {"ids": [1, 2, 3]}'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Get promo codes and deactivate them
-            promo_codes = PromoCode.objects.filter(pk__in=ids)
-            count = promo_codes.count()
+            # Load the promo codes once, deactivate them in one UPDATE and reflect that in memory
+            promo_codes = list(PromoCode.objects.filter(pk__in=ids))
             
-            if count == 0:
+            if not promo_codes:
                 return Response({
                     'message_type': 'error',
                     'error': 'No promo codes found with the provided IDs'
                 }, status=status.HTTP_404_NOT_FOUND)
             
-            # Deactivate all found promo codes
-            promo_codes.update(status=PromoCode.STATUS_DEACTIVATE)
+            deactivated_ids = [promo_code.id for promo_code in promo_codes]
+            PromoCode.objects.filter(pk__in=deactivated_ids).deactivate()
+            # update() sends no signals; drop the checkout lookup cache explicitly
+            invalidate_all_promo_codes()
+            
+            now = timezone.now()
+            for promo_code in promo_codes:
+                promo_code.status = PromoCode.STATUS_DEACTIVATE
+                promo_code.effective_status = promo_code.compute_effective_status(now)
+                promo_code.updated_at = now
             
             # Return updated promo codes
             serializer = PromoCodeSerializer(promo_codes, many=True)
             
             return Response({
                 'message_type': 'success',
-                'count': count,
-                'deactivated_ids': list(promo_codes.values_list('id', flat=True)),
+                'count': len(promo_codes),
+                'deactivated_ids': deactivated_ids,
                 'data': serializer.data
             }, status=status.HTTP_200_OK)
         
         else:
-            # GET: Get all promo codes
-            # Get status filter from query parameters
-            status_filter = request.query_params.get('status', None)
-            
-            promo_codes = PromoCode.objects.all()
-            
-            # Filter by status if provided
-            if status_filter:
-                promo_codes = promo_codes.filter(status=status_filter)
-            
-            promo_codes = promo_codes.order_by('-created_at')
-            serializer = PromoCodeSerializer(promo_codes, many=True)
+            # GET: list promo codes (optionally filtered, projected and paginated)
+            promo_codes, error = _filter_promo_codes(request.query_params)
+            if error:
+                return Response({
+                    'message_type': 'error',
+                    'error': error
+                }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Add sequential display number to each promo code
-            # Convert to list of dicts to ensure modifications work
-            data = [dict(item) for item in serializer.data]
-            for index, item in enumerate(data, start=1):
-                item['display_number'] = index
+            fields = request.query_params.get('fields')
+            if fields:
+                fields = [name.strip() for name in fields.split(',') if name.strip()]
+                allowed = set(PromoCodeSerializer.Meta.fields) | {'display_number'}
+                unknown = [name for name in fields if name not in allowed]
+                if unknown:
+                    return Response({
+                        'message_type': 'error',
+                        'error': f'Unknown fields: {", ".join(unknown)}. Allowed: {", ".join(sorted(allowed))}'
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                promo_codes = promo_codes.only(*PromoCodeSerializer.model_columns_for(fields), 'created_at')
+            else:
+                fields = None
             
-            return Response({
-                'message_type': 'success',
-                'count': promo_codes.count(),
-                'data': data
-            })
+            return _promo_codes_page(request.query_params, promo_codes, fields)
     except Exception as e:
         return Response({
             'message_type': 'error',
@@ -3251,9 +3887,12 @@ def promo_code_detail(request, pk):
         })
     
     elif request.method == 'DELETE':
-        # Soft delete: Set status to deactivate instead of deleting
-        promo_code.status = PromoCode.STATUS_DEACTIVATE
-        promo_code.save()
+        # Soft delete: Set status to deactivate instead of deleting. One UPDATE, so the usage
+        # counters redemptions may have moved since the row was read are left alone
+        PromoCode.objects.filter(pk=promo_code.pk).deactivate()
+        # update() sends no signals; drop the checkout lookup cache explicitly
+        invalidate_promo_code(promo_code.code)
+        promo_code.refresh_from_db()
         
         response_serializer = PromoCodeSerializer(promo_code)
         return Response({
@@ -3290,6 +3929,10 @@ def promo_code_detail(request, pk):
 
 # Zone Management API Views
 
+ZONES_DEFAULT_LIMIT = 50
+ZONES_MAX_LIMIT = 500
+
+
 @api_view(['GET', 'POST'])
 @permission_classes([IsAdminUser])  # Require admin authentication
 def zones_list(request):
@@ -3302,6 +3945,9 @@ def zones_list(request):
     - ?country=CountryName - Filter by country
     - ?state=StateName - Filter by state
     - ?city=CityName - Filter by city
+    - ?q=del - Search zone name, country, state and city at once, best match first (trigram
+      similarity, then priority; see frontend/zone_search.py)
+    - ?limit=50&offset=0 - One page (max 500) instead of every zone; implied by ?q= (default 50)
     
     POST: Create a new zone
     Request body:
@@ -3311,7 +3957,8 @@ def zones_list(request):
         "state": "Delhi",
         "city": "New Delhi",
         "priority": 1,
-        "status": true
+        "status": true,
+        "boundary": "POLYGON((77.1 28.5, 77.3 28.5, 77.3 28.7, 77.1 28.7, 77.1 28.5))"   (optional, lon lat)
     }
     """
     try:
@@ -3336,29 +3983,48 @@ def zones_list(request):
                 }, status=status.HTTP_400_BAD_REQUEST)
         else:
             # GET: List all zones
-            zones = Zone.objects.all()
+            filters = {}
             
             # Filter by status if provided (boolean)
             status_param = request.query_params.get('status')
             if status_param is not None:
                 status_bool = status_param.lower() in ('true', '1', 'yes')
-                zones = zones.filter(status=status_bool)
+                filters['status'] = status_bool
             
-            # Filter by country if provided
-            country_param = request.query_params.get('country')
-            if country_param:
-                zones = zones.filter(country__icontains=country_param)
+            # Filter by country/state/city if provided (served by the trigram indexes)
+            for field in ('country', 'state', 'city'):
+                value = request.query_params.get(field)
+                if value:
+                    filters[f'{field}__icontains'] = value
             
-            # Filter by state if provided
-            state_param = request.query_params.get('state')
-            if state_param:
-                zones = zones.filter(state__icontains=state_param)
-            
-            # Filter by city if provided
-            city_param = request.query_params.get('city')
-            if city_param:
-                zones = zones.filter(city__icontains=city_param)
+            q = request.query_params.get('q', '').strip()
+            limit = request.query_params.get('limit')
+            offset = request.query_params.get('offset')
+            if q or limit not in (None, '') or offset not in (None, ''):
+                try:
+                    limit = int(limit) if limit not in (None, '') else ZONES_DEFAULT_LIMIT
+                    offset = int(offset) if offset not in (None, '') else 0
+                except ValueError:
+                    return Response({
+                        'message_type': 'error',
+                        'error': 'limit and offset must be integers'
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                limit = max(1, min(limit, ZONES_MAX_LIMIT))
+                offset = max(0, offset)
+                
+                page = search_zones(q, filters, limit, offset)
+                has_more = offset + len(page['data']) < page['count']
+                return Response({
+                    'message_type': 'success',
+                    'count': page['count'],
+                    'limit': limit,
+                    'offset': offset,
+                    'has_more': has_more,
+                    'next_offset': offset + len(page['data']) if has_more else None,
+                    'data': page['data']
+                })
             
+            zones = Zone.objects.filter(**filters)
             serializer = ZoneSerializer(zones, many=True)
             
             return Response({
@@ -3375,6 +4041,441 @@ def zones_list(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])  # Require admin authentication
+def zones_facets(request):
+    """
+    Country -> state -> city hierarchy of the zones with active/inactive counts (filter dropdowns)
+    
+    GET /api/auth/zones/facets/
+    {
+        "active": 12, "inactive": 3,
+        "countries": [
+            {"country": "India", "active": 12, "inactive": 3, "states": [
+                {"state": "Delhi", "active": 5, "inactive": 1, "cities": [
+                    {"city": "New Delhi", "active": 4, "inactive": 1}, ...
+                ]}, ...
+            ]}, ...
+        ]
+    }
+    Zones without a country/state/city are counted under null. Cached until zones change.
+    """
+    try:
+        return Response({
+            'message_type': 'success',
+            'data': zone_facets()
+        })
+    except Exception as e:
+        return Response({
+            'message_type': 'error',
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+ZONES_IMPORT_MAX_ROWS = 10000
+# Zones per INSERT during bulk import
+ZONES_IMPORT_CHUNK_SIZE = 500
+# Rows fetched per round trip while streaming an export
+ZONES_EXPORT_FETCH_SIZE = 500
+ZONE_EXPORT_COLUMNS = ['zone_id', 'zone_name', 'country', 'state', 'city', 'priority', 'status', 'boundary']
+
+
+def _geojson_feature_to_zone_row(feature):
+    """Flatten a GeoJSON Polygon feature into a zone row (boundary as WKT; raises ValueError)"""
+    if not isinstance(feature, dict) or feature.get('type') != 'Feature':
+        raise ValueError('Each feature must be a GeoJSON Feature object')
+    row = dict(feature.get('properties') or {})
+    row.pop('zone_id', None)
+    if 'zone_name' not in row and 'name' in row:
+        row['zone_name'] = row.pop('name')
+    
+    geometry = feature.get('geometry')
+    if geometry:
+        if geometry.get('type') != 'Polygon':
+            raise ValueError(f"Unsupported geometry type {geometry.get('type')!r}: only Polygon is supported")
+        rings = geometry.get('coordinates') or []
+        if len(rings) != 1:
+            raise ValueError('Polygon must have exactly one ring (holes are not supported)')
+        try:
+            points = ', '.join(f'{float(lng)!r} {float(lat)!r}' for lng, lat, *_ in rings[0])
+        except (TypeError, ValueError):
+            raise ValueError('Polygon coordinates must be [lng, lat] number pairs')
+        row['boundary'] = f'POLYGON(({points}))'
+    return row
+
+
+def _parse_zone_import_payload(request):
+    """
+    Return the rows of a bulk zone import as a list of (dict or error message).
+    Accepts a GeoJSON FeatureCollection or a CSV, as a file upload (multipart field `file`) or as
+    the body (application/json, application/geo+json or text/csv), or a JSON array of zones.
+    """
+    import csv
+    import io
+    import json
+    
+    content_type = request.content_type or ''
+    text = None
+    if content_type.startswith(('text/csv', 'application/geo+json')):
+        text = request.body.decode('utf-8-sig')
+    elif request.FILES.get('file') is not None:
+        text = request.FILES['file'].read().decode('utf-8-sig')
+    
+    if text is not None and text.lstrip().startswith(('{', '[')):
+        data = json.loads(text)
+    elif text is not None:
+        rows = []
+        for row in csv.DictReader(io.StringIO(text)):
+            # Blank CSV cells mean "not provided"; zone_id (from an export) is ignored
+            rows.append({
+                key.strip(): value.strip()
+                for key, value in row.items()
+                if key and key.strip() != 'zone_id' and value is not None and value.strip() != ''
+            })
+        return rows
+    else:
+        data = request.data
+    
+    if isinstance(data, dict) and data.get('type') == 'FeatureCollection':
+        rows = []
+        for feature in data.get('features') or []:
+            try:
+                rows.append(_geojson_feature_to_zone_row(feature))
+            except ValueError as e:
+                rows.append(str(e))
+        return rows
+    if isinstance(data, dict):
+        data = data.get('zones')
+    if not isinstance(data, list):
+        raise ValueError('Send a GeoJSON FeatureCollection, a CSV file, or a JSON array of zones')
+    return data
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])  # Require admin authentication
+def zones_import(request):
+    """
+    Bulk import zones (e.g. onboarding a new state)
+    
+    Accepts either:
+    - GeoJSON: a FeatureCollection of Polygon features whose properties hold zone_name (or name),
+      country, state, city, priority, status (what GET /api/auth/zones/export/ produces)
+    - CSV: columns zone_name, country, state, city, priority, status, boundary (WKT POLYGON)
+    - JSON: [{"zone_name", ..., "boundary"}, ...] or {"zones": [...]}
+    Large files should be sent as a multipart upload in field `file`.
+    
+    Rows are validated individually, zone name uniqueness (case-insensitive) is checked for the
+    whole batch in one query and zones are inserted with bulk_create in chunks.
+    The response lists the result of every row:
+    {
+        "message_type": "success",
+        "created_count": 2,
+        "failed_count": 1,
+        "results": [
+            {"row": 1, "zone_name": "Dwarka", "status": "created", "zone_id": 10},
+            {"row": 2, "zone_name": "Rohini", "status": "error", "errors": {...}},
+            ...
+        ]
+    }
+    """
+    from django.db import IntegrityError, transaction
+    from django.db.models.functions import Upper
+    from .serializers import ZoneImportRowSerializer
+    from .zone_index import invalidate_zone_index
+    import logging
+    logger = logging.getLogger(__name__)
+    
+    try:
+        rows = _parse_zone_import_payload(request)
+    except (ValueError, UnicodeDecodeError) as e:
+        # json.JSONDecodeError is a ValueError
+        return Response({
+            'message_type': 'error',
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if not rows:
+        return Response({
+            'message_type': 'error',
+            'error': 'No zones provided'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if len(rows) > ZONES_IMPORT_MAX_ROWS:
+        return Response({
+            'message_type': 'error',
+            'error': f'Too many zones in one import ({len(rows)}). Maximum is {ZONES_IMPORT_MAX_ROWS}.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    results = [None] * len(rows)
+    
+    # 1. Validate every row (no queries per row)
+    valid_rows = []
+    for index, row in enumerate(rows):
+        if isinstance(row, str):
+            results[index] = {'row': index + 1, 'zone_name': None, 'status': 'error', 'errors': row}
+            continue
+        if not isinstance(row, dict):
+            results[index] = {'row': index + 1, 'zone_name': None, 'status': 'error', 'errors': 'Each zone must be an object'}
+            continue
+        
+        serializer = ZoneImportRowSerializer(data=row)
+        if not serializer.is_valid():
+            results[index] = {'row': index + 1, 'zone_name': row.get('zone_name'), 'status': 'error', 'errors': serializer.errors}
+            continue
+        
+        valid_rows.append((index, serializer.validated_data))
+    
+    # 2. Name uniqueness for the whole batch in one query (case-insensitive, like single creates)
+    existing_names = set(
+        Zone.objects.annotate(name_upper=Upper('zone_name'))
+        .filter(name_upper__in={data['zone_name'].upper() for _, data in valid_rows})
+        .values_list('name_upper', flat=True)
+    )
+    seen_names = set()
+    rows_to_create = []
+    for index, data in valid_rows:
+        name_key = data['zone_name'].upper()
+        if name_key in existing_names:
+            results[index] = {'row': index + 1, 'zone_name': data['zone_name'], 'status': 'error', 'errors': {'zone_name': ['A zone with this name already exists.']}}
+        elif name_key in seen_names:
+            results[index] = {'row': index + 1, 'zone_name': data['zone_name'], 'status': 'error', 'errors': {'zone_name': ['Duplicate zone name in this import']}}
+        else:
+            seen_names.add(name_key)
+            rows_to_create.append((index, data))
+    
+    # 3. Insert in chunks (bulk_create skips save(), so the bounding boxes are set here)
+    created = []  # (index, zone)
+    for start in range(0, len(rows_to_create), ZONES_IMPORT_CHUNK_SIZE):
+        chunk = rows_to_create[start:start + ZONES_IMPORT_CHUNK_SIZE]
+        zones = [Zone(**data) for _, data in chunk]
+        for zone in zones:
+            zone.set_bounding_box()
+        try:
+            with transaction.atomic():
+                Zone.objects.bulk_create(zones)
+            created.extend((index, zone) for (index, _), zone in zip(chunk, zones))
+        except IntegrityError:
+            # A concurrent request took one of these names - fall back to row-by-row for this chunk
+            for (index, data), zone in zip(chunk, zones):
+                try:
+                    with transaction.atomic():
+                        zone.save()
+                    created.append((index, zone))
+                except IntegrityError:
+                    results[index] = {'row': index + 1, 'zone_name': data['zone_name'], 'status': 'error', 'errors': {'zone_name': ['A zone with this name already exists.']}}
+    
+    for index, zone in created:
+        results[index] = {'row': index + 1, 'zone_name': zone.zone_name, 'status': 'created', 'zone_id': zone.zone_id}
+    
+    # bulk_create sends no post_save: refresh the zone index, search and facets once
+    if created:
+        transaction.on_commit(invalidate_zone_index)
+    
+    failed_count = len(rows) - len(created)
+    logger.info(f"Bulk zone import: {len(created)} created, {failed_count} failed")
+    
+    return Response({
+        'message_type': 'success' if created else 'error',
+        'message': f'{len(created)} of {len(rows)} zones created.',
+        'created_count': len(created),
+        'failed_count': failed_count,
+        'results': results
+    }, status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
+
+
+def _iter_zone_export_rows(zones):
+    """Yield the export columns of `zones` through a server-side cursor"""
+    from django.db import transaction
+    
+    # A transaction keeps the named cursor valid with PgBouncer (no WITH HOLD cursor)
+    with transaction.atomic():
+        yield from zones.values_list(*ZONE_EXPORT_COLUMNS).iterator(chunk_size=ZONES_EXPORT_FETCH_SIZE)
+
+
+def _zone_geojson_feature(row):
+    from .zone_index import parse_wkt_polygon
+    zone_id, zone_name, country, state, city, priority, zone_status, boundary = row
+    geometry = None
+    if boundary:
+        try:
+            geometry = {'type': 'Polygon', 'coordinates': [[list(point) for point in parse_wkt_polygon(boundary)]]}
+        except ValueError:
+            geometry = None
+    return {
+        'type': 'Feature',
+        'id': zone_id,
+        'geometry': geometry,
+        'properties': {
+            'zone_id': zone_id,
+            'zone_name': zone_name,
+            'country': country,
+            'state': state,
+            'city': city,
+            'priority': priority,
+            'status': zone_status,
+        },
+    }
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])  # Require admin authentication
+def zones_export(request):
+    """
+    Stream every zone as a file, without loading the zone table into memory
+    
+    GET /api/auth/zones/export/            - GeoJSON FeatureCollection (Polygon features)
+    GET /api/auth/zones/export/?export=csv - CSV (zone_id, zone_name, country, state, city,
+                                             priority, status, boundary as WKT)
+    Optional: ?status=true/false. Both formats can be imported again through
+    POST /api/auth/zones/import/.
+    """
+    import csv
+    import json
+    from django.http import StreamingHttpResponse
+    
+    export_format = (request.query_params.get('export') or 'geojson').lower()
+    if export_format not in ('geojson', 'csv'):
+        return Response({
+            'message_type': 'error',
+            'error': 'export must be geojson or csv'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    zones = Zone.objects.order_by('zone_id')
+    status_param = request.query_params.get('status')
+    if status_param is not None:
+        zones = zones.filter(status=status_param.lower() in ('true', '1', 'yes'))
+    
+    def geojson_rows():
+        yield '{"type": "FeatureCollection", "features": ['
+        separator = ''
+        for row in _iter_zone_export_rows(zones):
+            yield separator + json.dumps(_zone_geojson_feature(row))
+            separator = ','
+        yield ']}'
+    
+    def csv_rows():
+        writer = csv.writer(_CSVEcho())
+        yield writer.writerow(ZONE_EXPORT_COLUMNS)
+        for row in _iter_zone_export_rows(zones):
+            yield writer.writerow(row)
+    
+    if export_format == 'csv':
+        response = StreamingHttpResponse(csv_rows(), content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="zones.csv"'
+    else:
+        response = StreamingHttpResponse(geojson_rows(), content_type='application/geo+json')
+        response['Content-Disposition'] = 'attachment; filename="zones.geojson"'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([AUTH_PERMISSION])  # Require authentication in production
+def zone_locate(request):
+    """
+    Find the zone a coordinate falls in (for dispatch and pricing)
+    
+    GET /api/zones/locate/?lat=28.61&lng=77.21
+    Returns the highest-priority active zone whose boundary contains the point, answered from an
+    in-process spatial index (see frontend/zone_index.py); 404 if no zone covers it.
+    """
+    try:
+        lat = float(request.query_params.get('lat'))
+        lng = float(request.query_params.get('lng'))
+    except (TypeError, ValueError):
+        return Response({
+            'message_type': 'error',
+            'error': 'lat and lng query parameters are required and must be numbers'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return Response({
+            'message_type': 'error',
+            'error': 'lat must be between -90 and 90 and lng between -180 and 180'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    zone = locate_zone(lat, lng)
+    if zone is None:
+        return Response({
+            'message_type': 'error',
+            'error': 'No active zone covers this location'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response({
+        'message_type': 'success',
+        'data': zone
+    })
+
+
+@api_view(['POST'])
+@permission_classes([AUTH_PERMISSION])  # Require authentication in production
+def zone_locate_batch(request):
+    """
+    Find the zone of many coordinates in one call (vectorised, see frontend/zone_batch.py)
+
+    POST /api/zones/locate/batch/
+    JSON body, either form:
+    {"points": [[28.61, 77.21], [19.07, 72.87], ...]}
+    {"lat": [28.61, 19.07, ...], "lng": [77.21, 72.87, ...]}
+    Returns {"count": N, "zone_ids": [12, null, ...]} (null = no active zone covers the point)
+
+    Content-Type: application/octet-stream
+    Body: little-endian float64 pairs lat, lng, lat, lng, ...
+    Returns little-endian int64 zone_ids in the same order (-1 = no zone)
+
+    At most ZONE_LOCATE_BATCH_MAX_POINTS points per call.
+    """
+    import numpy as np
+    from .zone_batch import classify_points
+
+    max_points = getattr(settings, 'ZONE_LOCATE_BATCH_MAX_POINTS', 100000)
+    binary = request.content_type == 'application/octet-stream'
+
+    def error(message, status_code=status.HTTP_400_BAD_REQUEST):
+        return Response({'message_type': 'error', 'error': message}, status=status_code)
+
+    try:
+        if binary:
+            body = request.body
+            if len(body) % 16:
+                return error('Binary body must be float64 lat/lng pairs (16 bytes per point)')
+            coordinates = np.frombuffer(body, dtype='<f8').reshape(-1, 2)
+            lat, lng = coordinates[:, 0], coordinates[:, 1]
+        elif 'points' in request.data:
+            coordinates = np.asarray(request.data['points'], dtype=np.float64)
+            if coordinates.size == 0:
+                coordinates = coordinates.reshape(0, 2)
+            if coordinates.ndim != 2 or coordinates.shape[1] != 2:
+                return error('points must be a list of [lat, lng] pairs')
+            lat, lng = coordinates[:, 0], coordinates[:, 1]
+        else:
+            lat = np.asarray(request.data.get('lat', []), dtype=np.float64)
+            lng = np.asarray(request.data.get('lng', []), dtype=np.float64)
+            if lat.ndim != 1 or lat.shape != lng.shape:
+                return error('lat and lng must be lists of numbers of the same length')
+    except (TypeError, ValueError):
+        return error('Coordinates must be numbers')
+
+    if lat.shape[0] > max_points:
+        return error(f'At most {max_points} points per request', status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    in_range = (lat >= -90) & (lat <= 90) & (lng >= -180) & (lng <= 180)
+    if not in_range.all():
+        return error(
+            f'Point {int(np.flatnonzero(~in_range)[0])}: lat must be between -90 and 90 '
+            f'and lng between -180 and 180'
+        )
+
+    zone_ids = classify_points(lat, lng)
+
+    if binary:
+        from django.http import HttpResponse
+        return HttpResponse(zone_ids.astype('<i8').tobytes(), content_type='application/octet-stream')
+    return Response({
+        'message_type': 'success',
+        'count': int(zone_ids.shape[0]),
+        'zone_ids': [zone_id if zone_id >= 0 else None for zone_id in zone_ids.tolist()]
+    })
+
+
 @api_view(['GET', 'PUT', 'DELETE'])
 @permission_classes([IsAdminUser])  # Require admin authentication
 def zone_detail(request, id):
@@ -0,0 +1,146 @@
+"""
+Vectorised point-in-zone classification for large coordinate batches
+
+classify_points(lat, lng) returns the zone_id (or -1) of the highest-priority active zone for
+every point, with the same answers as zone_index.locate_zone(). It reuses the zone grid index,
+flattened into arrays once per index build (sorted cell keys plus a CSR list of candidate zones
+per cell, best first, with the large zones merged in):
+
+1. every point's grid cell is found with np.searchsorted;
+2. the (point, candidate zone) pairs are expanded and filtered on the zones' bounding boxes;
+3. the remaining pairs are grouped by zone and run through an even-odd ray casting test over that
+   zone's edges as array operations;
+4. each point takes its first (best-ranked) matching candidate.
+
+Python-level work is per zone, not per point.
+"""
+import numpy as np
+
+from .zone_index import CELL_DEGREES, get_zone_index
+
+NO_ZONE = -1
+
+# Cell coordinates are packed into one int64 key; |cell| stays well below this for valid lng/lat
+_CELL_OFFSET = 1 << 20
+
+_prepared = [None]  # (ZoneIndex, _PreparedIndex)
+
+
+def _cell_keys(cell_x, cell_y):
+    return (cell_x + _CELL_OFFSET) * (2 * _CELL_OFFSET) + (cell_y + _CELL_OFFSET)
+
+
+class _PreparedIndex:
+    """A ZoneIndex flattened into NumPy arrays"""
+
+    def __init__(self, index):
+        zones = {zone.zone_id: zone for zones in index.cells.values() for zone in zones}
+        zones.update({zone.zone_id: zone for zone in index.large})
+        zones = sorted(zones.values(), key=lambda zone: zone.rank)
+        position = {zone.zone_id: i for i, zone in enumerate(zones)}
+
+        self.zone_ids = np.array([zone.zone_id for zone in zones], dtype=np.int64)
+        self.bboxes = np.array([zone.bbox for zone in zones], dtype=np.float64).reshape(-1, 4)
+        self.rings = []
+        for zone in zones:
+            ring = np.asarray(zone.ring, dtype=np.float64)
+            self.rings.append((ring[:, 0], ring[:, 1]))
+
+        large = [position[zone.zone_id] for zone in index.large]
+        keys = sorted(index.cells)
+        self.cell_keys = _cell_keys(
+            np.array([key[0] for key in keys], dtype=np.int64),
+            np.array([key[1] for key in keys], dtype=np.int64),
+        )
+        candidates = []
+        offsets = [0]
+        for key in keys:
+            # Positions follow rank, so sorting merges the cell's zones with the large ones best first
+            candidates.extend(sorted([position[zone.zone_id] for zone in index.cells[key]] + large))
+            offsets.append(len(candidates))
+        # Trailing pseudo-cell for points outside every indexed cell: only the large zones apply
+        candidates.extend(large)
+        offsets.append(len(candidates))
+        self.candidates = np.array(candidates, dtype=np.int64)
+        self.offsets = np.array(offsets, dtype=np.int64)
+
+
+def _prepare(index):
+    entry = _prepared[0]
+    if entry is not None and entry[0] is index:
+        return entry[1]
+    prepared = _PreparedIndex(index)
+    _prepared[0] = (index, prepared)
+    return prepared
+
+
+def _points_in_ring(lng, lat, xs, ys):
+    """Vectorised even-odd test of points against one ring (same arithmetic as point_in_ring)"""
+    inside = np.zeros(lng.shape[0], dtype=bool)
+    x1, y1 = xs[-1], ys[-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for x2, y2 in zip(xs, ys):
+            crosses = (y1 > lat) != (y2 > lat)
+            if crosses.any():
+                inside ^= crosses & (lng < x1 + (lat - y1) * (x2 - x1) / (y2 - y1))
+            x1, y1 = x2, y2
+    return inside
+
+
+def classify_points(lat, lng, index=None):
+    """
+    Classify coordinates (1-D float64 arrays of equal length) and return an int64 array of
+    zone_ids, NO_ZONE (-1) where no active zone covers the point. Uses the current zone index
+    unless a ZoneIndex is passed.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lng = np.asarray(lng, dtype=np.float64)
+    result = np.full(lat.shape[0], NO_ZONE, dtype=np.int64)
+    if lat.shape[0] == 0:
+        return result
+    prepared = _prepare(index if index is not None else get_zone_index(wait=True))
+    if prepared.zone_ids.shape[0] == 0:
+        return result
+
+    # 1. Cell of every point (the trailing pseudo-cell when it isn't indexed)
+    keys = _cell_keys(
+        np.floor(lng / CELL_DEGREES).astype(np.int64),
+        np.floor(lat / CELL_DEGREES).astype(np.int64),
+    )
+    cells = np.searchsorted(prepared.cell_keys, keys)
+    found = cells < prepared.cell_keys.shape[0]
+    found[found] = prepared.cell_keys[cells[found]] == keys[found]
+    cells[~found] = prepared.cell_keys.shape[0]
+
+    # 2. (point, candidate) pairs in point order, best candidate first, within the bounding box
+    starts = prepared.offsets[cells]
+    counts = prepared.offsets[cells + 1] - starts
+    pair_point = np.repeat(np.arange(lat.shape[0]), counts)
+    first_pair = np.cumsum(counts) - counts
+    pair_zone = prepared.candidates[
+        np.repeat(starts - first_pair, counts) + np.arange(pair_point.shape[0])
+    ]
+    bbox = prepared.bboxes[pair_zone]
+    pair_lat, pair_lng = lat[pair_point], lng[pair_point]
+    in_box = (
+        (pair_lng >= bbox[:, 0]) & (pair_lat >= bbox[:, 1])
+        & (pair_lng <= bbox[:, 2]) & (pair_lat <= bbox[:, 3])
+    )
+    pair_point, pair_zone = pair_point[in_box], pair_zone[in_box]
+    pair_lat, pair_lng = pair_lat[in_box], pair_lng[in_box]
+    if pair_point.shape[0] == 0:
+        return result
+
+    # 3. Polygon test, one zone at a time
+    hit = np.zeros(pair_point.shape[0], dtype=bool)
+    by_zone = np.argsort(pair_zone, kind='stable')
+    sorted_zones = pair_zone[by_zone]
+    bounds = np.flatnonzero(np.diff(sorted_zones)) + 1
+    for group in np.split(by_zone, bounds):
+        xs, ys = prepared.rings[pair_zone[group[0]]]
+        hit[group] = _points_in_ring(pair_lng[group], pair_lat[group], xs, ys)
+
+    # 4. First hit per point is its best zone
+    hit_points, first_hit = np.unique(pair_point[hit], return_index=True)
+    result[hit_points] = prepared.zone_ids[pair_zone[hit][first_hit]]
+    return result
@@ -0,0 +1,244 @@
+"""
+Point-in-zone lookups
+
+Zones carry a WKT boundary polygon (outer ring, "lon lat" pairs) plus its bounding box columns.
+locate_zone(lat, lng) returns the highest-priority active zone containing the point:
+
+- from an in-process grid index of all active zone polygons (each grid cell lists the zones whose
+  bounding box touches it, best first), so a lookup is a dict access plus a few point-in-polygon
+  tests - microseconds, no database round trip;
+- from SQL (bounding-box prefilter on idx_zone_bbox, polygon test in Python) while the index is
+  cold or being rebuilt.
+
+Zone writes (post_save/post_delete signals) call invalidate_zone_index(), which bumps the
+'zone_index' generation (generations.py). Each process notices the bump within
+CACHE_GENERATION_CHECK_INTERVAL seconds, rebuilds its index in a background thread and answers
+from SQL meanwhile.
+"""
+import logging
+import math
+import re
+import threading
+
+from django.db import connection
+
+from .generations import bump_generation, current_generation
+from .models import Zone
+
+logger = logging.getLogger(__name__)
+
+GENERATION_NAME = 'zone_index'
+
+# Grid cell size in degrees (~5.5 km of latitude)
+CELL_DEGREES = 0.05
+# Zones spanning more cells than this (state/country-sized) are kept in a short list checked on
+# every lookup instead of being copied into thousands of cells
+MAX_CELLS_PER_ZONE = 4096
+
+_WKT_POLYGON = re.compile(r'POLYGON\s*\(\s*\(\s*([^)]+)\s*\)\s*\)', re.IGNORECASE)
+
+_index = [None]  # (generation, ZoneIndex)
+_rebuild_lock = threading.Lock()
+_rebuilding = [False]
+
+
+def parse_wkt_polygon(value):
+    """
+    Return the outer ring of a WKT POLYGON as [(lng, lat), ...] (raises ValueError).
+    serializers.validate_wkt_polygon() parses with this too, so every boundary it accepts can be indexed.
+    """
+    match = _WKT_POLYGON.match((value or '').strip())
+    if not match:
+        raise ValueError('Invalid POLYGON format. Expected: POLYGON((lon1 lat1, lon2 lat2, ...))')
+    ring = []
+    for pair in match.group(1).split(','):
+        pair = pair.strip()
+        if not pair:
+            # Stray comma, e.g. "0 0, 1 0, 1 1, 0 0,"
+            continue
+        parts = pair.split()
+        if len(parts) != 2:
+            raise ValueError(f"Invalid coordinate pair: {pair}. Expected format: 'lon lat'")
+        try:
+            ring.append((float(parts[0]), float(parts[1])))
+        except ValueError:
+            raise ValueError(f"Invalid coordinate values: {pair}. Must be numeric.")
+    if len(ring) < 4:
+        raise ValueError(f"Polygon must have at least 4 points (3 unique + closing point). Got: {len(ring)}")
+    return ring
+
+
+def ring_bbox(ring):
+    """(min_lng, min_lat, max_lng, max_lat) of a ring"""
+    lngs = [point[0] for point in ring]
+    lats = [point[1] for point in ring]
+    return min(lngs), min(lats), max(lngs), max(lats)
+
+
+def point_in_ring(lng, lat, ring):
+    """Even-odd ray casting test (points on an edge may fall either way)"""
+    inside = False
+    x1, y1 = ring[-1]
+    for x2, y2 in ring:
+        if (y1 > lat) != (y2 > lat):
+            if lng < x1 + (lat - y1) * (x2 - x1) / (y2 - y1):
+                inside = not inside
+        x1, y1 = x2, y2
+    return inside
+
+
+class IndexedZone:
+    __slots__ = ('zone_id', 'zone_name', 'priority', 'country', 'state', 'city', 'ring', 'bbox', 'rank')
+
+    def __init__(self, zone_id, zone_name, priority, country, state, city, ring, rank):
+        self.zone_id = zone_id
+        self.zone_name = zone_name
+        self.priority = priority
+        self.country = country
+        self.state = state
+        self.city = city
+        self.ring = ring
+        self.bbox = ring_bbox(ring)
+        self.rank = rank  # 0 = best (highest priority, then newest)
+
+    def contains(self, lat, lng):
+        min_lng, min_lat, max_lng, max_lat = self.bbox
+        return min_lng <= lng <= max_lng and min_lat <= lat <= max_lat and point_in_ring(lng, lat, self.ring)
+
+    def as_dict(self):
+        return {
+            'zone_id': self.zone_id,
+            'zone_name': self.zone_name,
+            'priority': self.priority,
+            'country': self.country,
+            'state': self.state,
+            'city': self.city,
+        }
+
+
+def _cell(value):
+    return math.floor(value / CELL_DEGREES)
+
+
+class ZoneIndex:
+    """Uniform grid over zone bounding boxes; `zones` must be sorted best first"""
+
+    def __init__(self, zones):
+        self.size = len(zones)
+        self.cells = {}
+        self.large = []
+        for zone in zones:
+            min_lng, min_lat, max_lng, max_lat = zone.bbox
+            xs = range(_cell(min_lng), _cell(max_lng) + 1)
+            ys = range(_cell(min_lat), _cell(max_lat) + 1)
+            if len(xs) * len(ys) > MAX_CELLS_PER_ZONE:
+                self.large.append(zone)
+                continue
+            for x in xs:
+                for y in ys:
+                    self.cells.setdefault((x, y), []).append(zone)
+
+    def locate(self, lat, lng):
+        """Best IndexedZone containing the point, or None"""
+        best = None
+        for zone in self.cells.get((_cell(lng), _cell(lat)), ()):
+            if zone.contains(lat, lng):
+                best = zone
+                break
+        for zone in self.large:
+            if best is not None and zone.rank > best.rank:
+                break
+            if zone.contains(lat, lng):
+                best = zone
+                break
+        return best
+
+
+def _active_zone_rows(cursor, where='', params=()):
+    cursor.execute(f"""
+        SELECT zone_id, zone_name, priority, country, state, city, boundary
+        FROM {Zone._meta.db_table}
+        WHERE status AND boundary IS NOT NULL {where}
+        ORDER BY priority DESC, created_at DESC, zone_id DESC
+    """, params)
+    return cursor.fetchall()
+
+
+def _to_indexed(rows):
+    zones = []
+    for row in rows:
+        try:
+            ring = parse_wkt_polygon(row[6])
+        except ValueError as e:
+            logger.warning(f"Zone {row[0]} has an invalid boundary and is skipped: {str(e)}")
+            continue
+        zones.append(IndexedZone(*row[:6], ring=ring, rank=len(zones)))
+    return zones
+
+
+def build_zone_index():
+    """Load every active zone with a boundary into a new ZoneIndex"""
+    with connection.cursor() as cursor:
+        return ZoneIndex(_to_indexed(_active_zone_rows(cursor)))
+
+
+def _rebuild(generation):
+    try:
+        index = build_zone_index()
+        _index[0] = (generation, index)
+        logger.info(f"Zone index rebuilt with {index.size} zones (generation {generation})")
+    except Exception as e:
+        logger.error(f"Zone index rebuild failed: {str(e)}", exc_info=True)
+    finally:
+        _rebuilding[0] = False
+        connection.close()
+
+
+def _schedule_rebuild(generation):
+    with _rebuild_lock:
+        if _rebuilding[0]:
+            return
+        _rebuilding[0] = True
+    threading.Thread(target=_rebuild, args=(generation,), name='zone-index-rebuild', daemon=True).start()
+
+
+def get_zone_index(wait=False):
+    """Current ZoneIndex, or None while it is cold/stale (a rebuild is started; wait=True builds inline)"""
+    generation = current_generation(GENERATION_NAME)
+    entry = _index[0]
+    if entry is not None and entry[0] == generation:
+        return entry[1]
+    if wait:
+        _index[0] = (generation, build_zone_index())
+        return _index[0][1]
+    _schedule_rebuild(generation)
+    return None
+
+
+def locate_zone_sql(lat, lng):
+    """Same answer as the index, straight from the database"""
+    with connection.cursor() as cursor:
+        rows = _active_zone_rows(
+            cursor,
+            'AND min_lng <= %s AND max_lng >= %s AND min_lat <= %s AND max_lat >= %s',
+            [lng, lng, lat, lat],
+        )
+    for zone in _to_indexed(rows):
+        if zone.contains(lat, lng):
+            return zone
+    return None
+
+
+def locate_zone(lat, lng):
+    """
+    Highest-priority active zone containing (lat, lng) as a dict
+    {'zone_id', 'zone_name', 'priority', 'country', 'state', 'city'}, or None
+    """
+    index = get_zone_index()
+    zone = index.locate(lat, lng) if index is not None else locate_zone_sql(lat, lng)
+    return zone.as_dict() if zone is not None else None
+
+
+def invalidate_zone_index():
+    """Make every process rebuild its zone index within CACHE_GENERATION_CHECK_INTERVAL seconds (called when zones change)"""
+    bump_generation(GENERATION_NAME)
@@ -0,0 +1,123 @@
+"""
+Zone search and facets for the ZoneManagement page
+
+search_zones(q, ...) returns the zones whose name, country, state or city contains `q`
+(case-insensitive), best match first: ranked by pg_trgm similarity to `q`, then priority. The
+ILIKE '%q%' predicates are served by the trigram GIN indexes on those columns (idx_zone_*_trgm)
+instead of a sequential scan, and each page comes with COUNT(*) OVER () so it is a single query.
+
+zone_facets() returns the country -> state -> city hierarchy with active/inactive zone counts at
+every level, from one GROUP BY ROLLUP query, for the filter dropdowns.
+
+Both are cached in the Django cache (search pages are requested again on every keystroke and
+backspace) under the zone index generation: every zone write bumps it (see
+zone_index.invalidate_zone_index), which retires all cached results at once - in other processes
+within CACHE_GENERATION_CHECK_INTERVAL seconds.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Q, Window
+from django.db.models.functions import Greatest
+
+from .generations import current_generation
+from .models import Zone
+from .serializers import ZoneSerializer
+from .zone_index import GENERATION_NAME
+
+SEARCH_FIELDS = ('zone_name', 'country', 'state', 'city')
+
+
+def _cache_ttl():
+    return getattr(settings, 'ZONE_SEARCH_CACHE_TTL', 300)
+
+
+def _cache_key(generation, q, filters, limit, offset):
+    params = repr((q, sorted(filters.items()), limit, offset)).encode('utf-8')
+    return f'zone_search:{generation}:{hashlib.sha1(params).hexdigest()}'
+
+
+def search_zones(q, filters=None, limit=50, offset=0):
+    """
+    One page of zones matching `q` (plus exact `filters` such as {'status': True} or
+    {'country__icontains': 'India'}). Returns {'count': total matches, 'data': serialized zones}.
+    """
+    q = (q or '').strip()
+    filters = filters or {}
+    generation = current_generation(GENERATION_NAME)
+    key = _cache_key(generation, q.lower(), filters, limit, offset)
+    page = cache.get(key)
+    if page is not None:
+        return page
+
+    zones = Zone.objects.filter(**filters)
+    if q:
+        matches = Q()
+        for field in SEARCH_FIELDS:
+            matches |= Q(**{f'{field}__icontains': q})
+        zones = zones.filter(matches).annotate(
+            # NULL columns are ignored by GREATEST
+            rank=Greatest(*(TrigramSimilarity(field, q) for field in SEARCH_FIELDS))
+        ).order_by('-rank', '-priority', '-zone_id')
+    else:
+        zones = zones.order_by('-priority', '-created_at', '-zone_id')
+    zones = zones.annotate(total_count=Window(expression=Count('pk')))
+
+    rows = list(zones[offset:offset + limit])
+    if rows:
+        total = rows[0].total_count
+    elif offset:
+        # Past the end: no row to carry the window count
+        total = zones.count()
+    else:
+        total = 0
+
+    page = {'count': total, 'data': [dict(zone) for zone in ZoneSerializer(rows, many=True).data]}
+    cache.set(key, page, _cache_ttl())
+    return page
+
+
+def zone_facets():
+    """
+    Zone counts per country, state and city:
+    {'active', 'inactive', 'countries': [{'country', 'active', 'inactive',
+        'states': [{'state', 'active', 'inactive', 'cities': [{'city', 'active', 'inactive'}]}]}]}
+    Zones without a country/state/city are counted under None.
+    """
+    key = f'zone_facets:{current_generation(GENERATION_NAME)}'
+    facets = cache.get(key)
+    if facets is not None:
+        return facets
+
+    with connection.cursor() as cursor:
+        # GROUPING() tells the rollup subtotal rows (bit set = column rolled up) from NULL values;
+        # ordering by it puts every parent before its children
+        cursor.execute(f"""
+            SELECT country, state, city, GROUPING(country, state, city) AS level,
+                   COUNT(*) FILTER (WHERE status), COUNT(*) FILTER (WHERE NOT status)
+            FROM {Zone._meta.db_table}
+            GROUP BY ROLLUP (country, state, city)
+            ORDER BY level DESC, country NULLS LAST, state NULLS LAST, city NULLS LAST
+        """)
+        rows = cursor.fetchall()
+
+    facets = {'active': 0, 'inactive': 0, 'countries': []}
+    countries = {}
+    states = {}
+    for country, state, city, grouping, active, inactive in rows:
+        if grouping == 7:
+            facets['active'], facets['inactive'] = active, inactive
+        elif grouping == 3:
+            countries[country] = {'country': country, 'active': active, 'inactive': inactive, 'states': []}
+            facets['countries'].append(countries[country])
+        elif grouping == 1:
+            states[country, state] = {'state': state, 'active': active, 'inactive': inactive, 'cities': []}
+            countries[country]['states'].append(states[country, state])
+        else:
+            states[country, state]['cities'].append({'city': city, 'active': active, 'inactive': inactive})
+
+    cache.set(key, facets, _cache_ttl())
+    return facets
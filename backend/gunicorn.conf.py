@@ -0,0 +1,17 @@
+"""
+Gunicorn settings (used by the Dockerfile and docker-compose.yml: gunicorn -c gunicorn.conf.py ...)
+
+Workers are threaded (gthread): each process serves GUNICORN_THREADS requests at once. Password
+hashing relies on this (see frontend/password_hashing.py): logins wait on a per-process pool of
+PASSWORD_HASH_THREADS, and once PASSWORD_HASH_MAX_QUEUE of them are in flight further logins get
+503, so a login burst can only ever occupy that many of a worker's threads and the rest keep
+serving other endpoints. With the default sync workers a single login would block its whole
+process and the cap could never be reached. Keep PASSWORD_HASH_MAX_QUEUE below GUNICORN_THREADS.
+"""
+import multiprocessing
+import os
+
+worker_class = 'gthread'
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))